@@ -0,0 +1,131 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SOURCE_SUFFIX = ".txt"
+
+
+def collect_sources(sources):
+    """Source files named by `sources`: every .txt file under a directory,
+    or the paths listed one per line in a file list (blank lines and
+    lines starting with # are skipped). Returns (root, paths); outputs are
+    named after each path relative to root."""
+    if os.path.isdir(sources):
+        paths = []
+        for directory, _, files in os.walk(sources):
+            paths.extend(os.path.join(directory, f) for f in files if f.endswith(SOURCE_SUFFIX))
+        return sources, sorted(paths)
+    base = os.path.dirname(sources)
+    with open(sources) as f:
+        paths = [os.path.join(base, line.strip()) for line in f
+                 if line.strip() and not line.lstrip().startswith('#')]
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths]) if paths else base
+    return root, paths
+
+
+class BatchWorker(object):
+    """Per-process compiler state. The lexer and parser tables are module
+    globals of lexer.py and parser.py, built when a worker first imports
+    them; the worker then reuses them for every file it is handed."""
+
+    def __init__(self, root=None, out_dir=None, max_errors=0):
+        from Compiler import Compiler
+        self.compiler = Compiler(max_errors)
+        self.root = root
+        self.out_dir = out_dir
+
+    def output_path(self, path, suffix):
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+        return os.path.join(self.out_dir, os.path.splitext(relative)[0] + suffix)
+
+    def compile(self, path):
+        """Compile one file and write its .ir and .diag outputs; returns
+        the summary entry of the file."""
+        start = time.perf_counter()
+        diagnostics, ir_text = self.diagnose(path)
+        self.write_outputs(path, diagnostics, ir_text)
+        return {
+            "file": path,
+            "ok": not diagnostics,
+            "diagnostics": len(diagnostics),
+            "ir_lines": ir_text.count('\n'),
+            "seconds": time.perf_counter() - start,
+        }
+
+    def write_outputs(self, path, diagnostics, ir_text):
+        os.makedirs(os.path.dirname(self.output_path(path, ".diag")), exist_ok=True)
+        with open(self.output_path(path, ".diag"), "w") as f:
+            f.writelines(f"{phase}: {message}\n" for phase, message in diagnostics)
+        ir_path = self.output_path(path, ".ir")
+        if ir_text:
+            with open(ir_path, "w") as f:
+                f.write(ir_text)
+        elif os.path.exists(ir_path):
+            # drop the IR of an earlier successful build
+            os.remove(ir_path)
+
+    def diagnose(self, path):
+        try:
+            with open(path) as f:
+                source_code = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            return [("read", str(e))], ""
+        return self.diagnose_source(source_code)
+
+    def diagnose_source(self, source_code, instrumentation=None):
+        """Returns ([(phase, message)], ir_text); ir_text is empty unless
+        every phase passed. Phases are timed and counted on
+        `instrumentation` (an Instrumentation.Instrumentation), if given."""
+        result = self.compiler.compile(source_code, instrumentation)
+        return result.errors(), result.ir
+
+
+_worker = None
+
+
+def init_worker(root, out_dir, max_errors=0):
+    global _worker
+    _worker = BatchWorker(root, out_dir, max_errors)
+
+
+def _compile_file(path):
+    return _worker.compile(path)
+
+
+def compile_batch(sources, out_dir, jobs=None, max_errors=0):
+    """Compile every file named by `sources` (see collect_sources) on a
+    pool of `jobs` worker processes (default: one per CPU), stopping each
+    file after `max_errors` diagnostics, if set.
+
+    Each file gets OUT_DIR/<name>.ir and OUT_DIR/<name>.diag. Returns the
+    summary, which is also written to OUT_DIR/summary.json."""
+    root, paths = collect_sources(sources)
+    jobs = jobs or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    if jobs == 1:
+        init_worker(root, out_dir, max_errors)
+        results = [_compile_file(path) for path in paths]
+    else:
+        # fork where available so workers inherit the already-built parser
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        chunksize = max(1, len(paths) // (jobs * 8))
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                 initializer=init_worker, initargs=(root, out_dir, max_errors)) as pool:
+            results = list(pool.map(_compile_file, paths, chunksize=chunksize))
+    seconds = time.perf_counter() - start
+    summary = {
+        "files": len(results),
+        "passed": sum(r["ok"] for r in results),
+        "failed": sum(not r["ok"] for r in results),
+        "jobs": jobs,
+        "seconds": seconds,
+        "files_per_second": len(results) / seconds if seconds else 0,
+        "results": results,
+    }
+    with open(os.path.join(out_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=1)
+    return summary
@@ -0,0 +1,270 @@
+import mmap
+import struct
+from array import array
+
+from IRInterpreter import (
+    IRRuntimeError, DecodedProc, parse_ir, decode_program,
+    MOV, MOVI, ADD, SUB, MUL, DIV, MOD, CMP_LT, CMP_GT, CMP_LE, CMP_GE, CMP_EQ,
+    JZ, JNZ, JMP, CALL, RET, LD, ST, IGET, IPUT, MEM, LENGTH, LIST, EXIT, DCOPY, MGET, MPUT,
+)
+
+# File layout (little-endian):
+#   header     magic, version, then (count, offset) of every section below
+#   constants  u32 offsets[count + 1] into a blob of tagged entries
+#   procs      (name, first instruction, instruction count, nregs) as u32
+#   code       (opcode, a, b, c) as i32, 16 bytes per instruction
+#   args       i32 words: an argument count followed by that many registers
+#              (CALL, and MGET/MPUT, whose b is the table name constant)
+#   data       (name, first word, word count) as u32, then the i64 words
+#   labels     (proc, instruction index, name) as u32, for disassembly only
+MAGIC = b"TSLB"
+SUFFIX = ".tslb"
+VERSION = 1
+HEADER = struct.Struct("<4sHH14I")
+INSTRUCTION = struct.Struct("<iiii")
+PROC = struct.Struct("<IIII")
+DATA = struct.Struct("<III")
+LABEL = struct.Struct("<III")
+CONST_INT, CONST_STR = 0, 1
+# set on MOVI when b indexes the constant pool instead of holding the value
+CONST_OPERAND = 0x100
+INT32_MIN, INT32_MAX = -(1 << 31), (1 << 31) - 1
+
+REGISTER_OPS = {MOV: 'mov', ADD: 'add', SUB: 'sub', MUL: 'mul', DIV: 'div', MOD: 'mod',
+                CMP_LT: 'cmp<', CMP_GT: 'cmp>', CMP_LE: 'cmp<=', CMP_GE: 'cmp>=', CMP_EQ: 'cmp=',
+                LD: 'ld', ST: 'st'}
+BUILTIN_CALLS = {IGET: 'iget', IPUT: 'iput', MEM: 'mem', LENGTH: 'length', LIST: 'list', EXIT: 'exit'}
+MEMO_CALLS = {MGET: 'mget', MPUT: 'mput'}
+
+
+class BytecodeError(Exception):
+    pass
+
+
+class Module(object):
+    """A loaded bytecode module: decoded procs and data blocks ready for
+    IRInterpreter/ClosureEngine, plus the names needed to disassemble."""
+
+    def __init__(self, procs, data, data_names, labels):
+        self.procs = procs            # name -> DecodedProc
+        self.data = data              # list of array('q')
+        self.data_names = data_names  # data label of each block
+        self.labels = labels          # proc name -> {instruction index: [labels]}
+
+
+# --- assembler ---------------------------------------------------------------
+
+class Assembler(object):
+    def __init__(self):
+        self.constants = []
+        self.constant_index = {}
+
+    def constant(self, value):
+        key = (type(value), value)
+        if key not in self.constant_index:
+            self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return self.constant_index[key]
+
+    def assemble(self, ir_text):
+        """Encode IR text (IRGenerator.generate output) as a bytecode module."""
+        program = parse_ir(ir_text)
+        procs, data_blocks = decode_program(program)
+        proc_index = {name: i for i, name in enumerate(procs)}
+        proc_table, code, args, labels = [], [], array('i'), []
+        for i, (name, proc) in enumerate(procs.items()):
+            proc_table.append((self.constant(name), len(code), len(proc.code), proc.nregs))
+            for op, a, b, c in proc.code:
+                if op == MOVI and not (isinstance(b, int) and INT32_MIN <= b <= INT32_MAX):
+                    op, b = MOVI | CONST_OPERAND, self.constant(b)
+                elif op == CALL:
+                    b, c = proc_index[b.name], self.call_args(args, c)
+                elif op in MEMO_CALLS:
+                    b, c = self.constant(b), self.call_args(args, c)
+                code.append((op, a, b, c))
+            for label, index in program.procs[name].labels.items():
+                labels.append((i, index, self.constant(label)))
+        data_table, data_words = [], array('q')
+        for name, block in zip(program.data, data_blocks):
+            data_table.append((self.constant(name), len(data_words), len(block)))
+            data_words.extend(block)
+        return self.layout(proc_table, code, args, data_table, data_words, labels)
+
+    def call_args(self, args, registers):
+        offset = len(args)
+        args.append(len(registers))
+        args.extend(registers)
+        return offset
+
+    def layout(self, proc_table, code, args, data_table, data_words, labels):
+        blob, offsets = bytearray(), array('I')
+        for value in self.constants:
+            offsets.append(len(blob))
+            if isinstance(value, int):
+                blob += bytes([CONST_INT]) + struct.pack("<q", value)
+            else:
+                blob += bytes([CONST_STR]) + value.encode("utf-8")
+        offsets.append(len(blob))
+        sections = [
+            offsets.tobytes() + bytes(blob),
+            b"".join(PROC.pack(*p) for p in proc_table),
+            b"".join(INSTRUCTION.pack(*i) for i in code),
+            args.tobytes(),
+            b"".join(DATA.pack(*d) for d in data_table) + data_words.tobytes(),
+            b"".join(LABEL.pack(*l) for l in labels),
+        ]
+        counts = [len(self.constants), len(proc_table), len(code), len(args), len(data_table), len(labels)]
+        fields, offset = [], HEADER.size
+        for count, section in zip(counts, sections):
+            # keep every section 8-byte aligned so it can be cast in place
+            offset += -offset % 8
+            fields += [count, offset]
+            offset += len(section)
+        out = bytearray(HEADER.pack(MAGIC, VERSION, 0, *fields, 0, 0))
+        for section, section_offset in zip(sections, fields[1::2]):
+            out += bytes(section_offset - len(out))
+            out += section
+        return bytes(out)
+
+
+def assemble(ir_text):
+    return Assembler().assemble(ir_text)
+
+
+def write_module(ir_text, path):
+    with open(path, "wb") as f:
+        f.write(assemble(ir_text))
+    return path
+
+
+# --- loader ------------------------------------------------------------------
+
+def load_bytes(buffer):
+    """Decode a bytecode module from any bytes-like object."""
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise BytecodeError("truncated bytecode header")
+    magic, version, _, *fields = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise BytecodeError("not a TSLANG bytecode module")
+    if version != VERSION:
+        raise BytecodeError(f"unsupported bytecode version {version}")
+    (n_consts, o_consts, n_procs, o_procs, n_code, o_code,
+     n_args, o_args, n_data, o_data, n_labels, o_labels) = fields[:12]
+    sections = [(o_consts, 4 * (n_consts + 1)), (o_procs, PROC.size * n_procs),
+                (o_code, INSTRUCTION.size * n_code), (o_args, 4 * n_args),
+                (o_data, DATA.size * n_data), (o_labels, LABEL.size * n_labels)]
+    if any(offset + size > len(view) for offset, size in sections):
+        raise BytecodeError("truncated bytecode module")
+    try:
+        constants = load_constants(view, n_consts, o_consts)
+        args = view[o_args:o_args + 4 * n_args].cast('i')
+        table = list(PROC.iter_unpack(view[o_procs:o_procs + PROC.size * n_procs]))
+        procs = {constants[name]: DecodedProc(constants[name], [], nregs) for name, _, _, nregs in table}
+        by_index = list(procs.values())
+        code = INSTRUCTION.iter_unpack(view[o_code:o_code + INSTRUCTION.size * n_code])
+        for (_, _, count, _), proc in zip(table, by_index):
+            for _ in range(count):
+                op, a, b, c = next(code, (None,) * 4)
+                if op is None:
+                    raise BytecodeError("code section shorter than the proc table")
+                if op == CALL:
+                    b, c = by_index[b], tuple(args[c + 1:c + 1 + args[c]])
+                elif op in MEMO_CALLS:
+                    b, c = constants[b], tuple(args[c + 1:c + 1 + args[c]])
+                elif op & CONST_OPERAND:
+                    op, b = op & ~CONST_OPERAND, constants[b]
+                proc.code.append((op, a, b, c))
+        data_end = o_data + DATA.size * n_data
+        data, data_names = [], []
+        for name, first, count in DATA.iter_unpack(view[o_data:data_end]):
+            start = data_end + 8 * first
+            block = array('q')
+            block.frombytes(view[start:start + 8 * count])
+            data.append(block)
+            data_names.append(constants[name])
+        labels = {name: {} for name in procs}
+        for proc, index, name in LABEL.iter_unpack(view[o_labels:o_labels + LABEL.size * n_labels]):
+            labels[by_index[proc].name].setdefault(index, []).append(constants[name])
+    except (IndexError, KeyError, struct.error, TypeError, ValueError) as e:
+        raise BytecodeError(f"corrupt bytecode module: {e}")
+    return Module(procs, data, data_names, labels)
+
+
+def load_constants(view, count, offset):
+    offsets = view[offset:offset + 4 * (count + 1)].cast('I')
+    blob = offset + 4 * (count + 1)
+    constants = []
+    for start, end in zip(offsets, offsets[1:]):
+        entry = view[blob + start:blob + end]
+        if entry[0] == CONST_INT:
+            constants.append(struct.unpack_from("<q", entry, 1)[0])
+        else:
+            constants.append(bytes(entry[1:]).decode("utf-8"))
+    return constants
+
+
+def load(path):
+    """Memory-map the module at `path` and decode it."""
+    error = None
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise BytecodeError("empty bytecode module")
+        with mapped:
+            try:
+                return load_bytes(mapped)
+            except BytecodeError as e:
+                # the traceback pins slices of the map; drop it before closing
+                error = str(e)
+    raise BytecodeError(error)
+
+
+# --- disassembler ------------------------------------------------------------
+
+def disassemble(module):
+    """Textual IR for a loaded module, in the syntax parse_ir reads."""
+    lines = [f"data {name}, {', '.join(map(str, block))}" for block, name in zip(module.data, module.data_names)]
+    for name, proc in module.procs.items():
+        lines.append(f"proc {name}")
+        labels = module.labels.get(name, {})
+        # the last instruction is the ret decode_program appends
+        for index, instruction in enumerate(proc.code[:-1]):
+            lines.extend(f"{label}:" for label in labels.get(index, ()))
+            lines.append(format_instruction(instruction, labels, module))
+        lines.extend(f"{label}:" for label in labels.get(len(proc.code) - 1, ()))
+    return '\n'.join(lines) + '\n'
+
+
+def format_instruction(instruction, labels, module):
+    op, a, b, c = instruction
+
+    def label(index):
+        if index not in labels:
+            raise BytecodeError(f"jump to unlabelled instruction {index}")
+        return labels[index][0]
+
+    if op == MOVI:
+        return f"mov r{a}, {b if isinstance(b, int) else repr(b)}"
+    if op in (ADD, SUB, MUL, DIV, MOD, CMP_LT, CMP_GT, CMP_LE, CMP_GE, CMP_EQ):
+        return f"{REGISTER_OPS[op]} r{a}, r{b}, r{c}"
+    if op in REGISTER_OPS:
+        return f"{REGISTER_OPS[op]} r{a}, r{b}"
+    if op in (JZ, JNZ):
+        return f"{'jz' if op == JZ else 'jnz'} r{a}, {label(b)}"
+    if op == JMP:
+        return f"jmp {label(a)}"
+    if op == RET:
+        return "ret"
+    if op == CALL:
+        return f"call {b.name}, r{a}" + ''.join(f", r{r}" for r in c)
+    if op in (LENGTH, LIST):
+        return f"call {BUILTIN_CALLS[op]}, r{a}, r{b}"
+    if op in BUILTIN_CALLS:
+        return f"call {BUILTIN_CALLS[op]}, r{a}"
+    if op == DCOPY:
+        return f"call dcopy, r{a}, {module.data_names[b]}"
+    if op in MEMO_CALLS:
+        return f"call {MEMO_CALLS[op]}, r{a}, {b}" + ''.join(f", r{r}" for r in c)
+    raise IRRuntimeError(f"unknown opcode {op}")
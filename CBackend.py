@@ -0,0 +1,454 @@
+import ctypes
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from IRInterpreter import (
+    IRRuntimeError, MEMO_ENTRIES, parse_ir, is_register, register_index, parse_immediate,
+)
+
+C_COMPARE = {'cmp<': '<', 'cmp>': '>', 'cmp<=': '<=', 'cmp>=': '>=', 'cmp=': '=='}
+C_ARITHMETIC = {'add': 'tsl_add', 'sub': 'tsl_sub', 'mul': 'tsl_mul'}
+# C stack the procs of one tsl_run may use (half the usual 8 MB main
+# thread stack), and what a frame takes beyond its registers: return
+# address, saved registers and alignment.
+STACK_BYTES = 4 << 20
+FRAME_OVERHEAD = 64
+
+RUNTIME = r'''
+#include <setjmp.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+typedef void (*tsl_put_fn)(int64_t);
+typedef int (*tsl_get_fn)(int64_t *);
+
+static int64_t *tsl_heap;
+static int64_t tsl_heap_words, tsl_heap_cap;
+static jmp_buf tsl_escape;
+static int64_t tsl_exit_code;
+static int64_t tsl_depth;
+static char tsl_message[128];
+
+static void tsl_default_put(int64_t v) { printf("%lld\n", (long long)v); }
+static int tsl_default_get(int64_t *out) {
+    long long v;
+    if (scanf("%lld", &v) != 1) return 1;
+    *out = v;
+    return 0;
+}
+static tsl_put_fn tsl_put = tsl_default_put;
+static tsl_get_fn tsl_get = tsl_default_get;
+
+void tsl_set_io(tsl_put_fn put, tsl_get_fn get) {
+    tsl_put = put ? put : tsl_default_put;
+    tsl_get = get ? get : tsl_default_get;
+}
+
+const char *tsl_error(void) { return tsl_message; }
+
+static void tsl_fail(const char *message) {
+    snprintf(tsl_message, sizeof tsl_message, "%s", message);
+    longjmp(tsl_escape, 2);
+}
+
+static void tsl_exit(int64_t code) {
+    tsl_exit_code = code;
+    longjmp(tsl_escape, 1);
+}
+
+/* every block is preceded by a header word holding its length in words */
+static int64_t tsl_mem(int64_t bytes) {
+    int64_t words = bytes > 0 ? bytes / 8 : 0;
+    if (tsl_heap_words + words + 1 > tsl_heap_cap) {
+        int64_t cap = tsl_heap_cap ? tsl_heap_cap : 1024;
+        while (cap < tsl_heap_words + words + 1) cap *= 2;
+        int64_t *heap = realloc(tsl_heap, cap * sizeof *heap);
+        if (!heap) tsl_fail("out of memory");
+        tsl_heap = heap;
+        tsl_heap_cap = cap;
+    }
+    tsl_heap[tsl_heap_words] = words;
+    memset(tsl_heap + tsl_heap_words + 1, 0, words * sizeof *tsl_heap);
+    tsl_heap_words += words + 1;
+    return (tsl_heap_words - words) * 8;
+}
+
+static inline int64_t *tsl_word(int64_t address) {
+    int64_t index = address >> 3;
+    if (index <= 0 || index >= tsl_heap_words) tsl_fail("invalid memory access");
+    return tsl_heap + index;
+}
+
+static int64_t tsl_length(int64_t address) {
+    int64_t header = (address >> 3) - 1;
+    if (header <= 0 || header >= tsl_heap_words) tsl_fail("invalid memory access");
+    return tsl_heap[header];
+}
+
+static void tsl_copy(int64_t address, const int64_t *data, int64_t words) {
+    if (words) {
+        tsl_word(address + (words - 1) * 8);
+        memcpy(tsl_word(address), data, words * sizeof *data);
+    }
+}
+
+static int64_t tsl_iget(void) {
+    int64_t v;
+    if (tsl_get(&v)) tsl_fail("iget: end of input");
+    return v;
+}
+
+/* a result outside 64 bits is an error, as on IRInterpreter */
+static inline int64_t tsl_add(int64_t a, int64_t b) {
+    int64_t r;
+    if (__builtin_add_overflow(a, b, &r)) tsl_fail("integer overflow");
+    return r;
+}
+
+static inline int64_t tsl_sub(int64_t a, int64_t b) {
+    int64_t r;
+    if (__builtin_sub_overflow(a, b, &r)) tsl_fail("integer overflow");
+    return r;
+}
+
+static inline int64_t tsl_mul(int64_t a, int64_t b) {
+    int64_t r;
+    if (__builtin_mul_overflow(a, b, &r)) tsl_fail("integer overflow");
+    return r;
+}
+
+/* INT64_MIN / -1 overflows (SIGFPE on x86); INT64_MIN % -1 is 0 */
+static inline int64_t tsl_div(int64_t a, int64_t b) {
+    if (!b) tsl_fail("division by zero");
+    if (b == -1 && a == INT64_MIN) tsl_fail("integer overflow");
+    return a / b;
+}
+
+static inline int64_t tsl_mod(int64_t a, int64_t b) {
+    if (!b) tsl_fail("division by zero");
+    if (b == -1) return 0;
+    return a % b;
+}
+
+/* procs recurse natively, so the depth is bounded before the C stack of
+   the host process overflows */
+static inline void tsl_enter(void) {
+    if (++tsl_depth > TSL_MAX_DEPTH) tsl_fail("maximum recursion depth exceeded");
+}
+
+/* a memo table is direct-mapped: TSL_MEMO_SLOTS slots of (run, result,
+   key words), each key hashed to one slot that a later key may take over;
+   slots written by an earlier tsl_run are stale */
+static int64_t tsl_memo_run;
+
+static inline int64_t *tsl_memo_slot(int64_t *table, const int64_t *key, int n) {
+    uint64_t h = 14695981039346656037ULL;
+    for (int i = 0; i < n; i++) h = (h ^ (uint64_t)key[i]) * 1099511628211ULL;
+    h ^= h >> 29;
+    return table + (h & (TSL_MEMO_SLOTS - 1)) * (n + 2);
+}
+
+static inline int64_t tsl_memo_get(int64_t *table, const int64_t *key, int n, int64_t *result) {
+    int64_t *slot = tsl_memo_slot(table, key, n);
+    if (slot[0] != tsl_memo_run || memcmp(slot + 2, key, n * sizeof *key)) return 0;
+    *result = slot[1];
+    return 1;
+}
+
+static inline void tsl_memo_put(int64_t *table, const int64_t *key, int n, int64_t result) {
+    int64_t *slot = tsl_memo_slot(table, key, n);
+    slot[0] = tsl_memo_run;
+    slot[1] = result;
+    memcpy(slot + 2, key, n * sizeof *key);
+}
+'''
+
+ENTRY = r'''
+/* 0: main returned, 1: exit() was called, 2: runtime error (see tsl_error) */
+int tsl_run(int64_t *result) {
+    int status;
+    tsl_heap_words = 1; /* word 0 stays unused so address 0 is never valid */
+    tsl_depth = 0;
+    tsl_message[0] = 0;
+    tsl_memo_run++;
+    status = setjmp(tsl_escape);
+    if (status == 0) {
+        *result = p_main();
+        return 0;
+    }
+    *result = tsl_exit_code;
+    return status == 1 ? 0 : 2;
+}
+
+#ifndef TSL_LIBRARY
+int main(void) {
+    int64_t result;
+    if (tsl_run(&result)) {
+        fprintf(stderr, "Runtime error: %s\n", tsl_error());
+        return 2;
+    }
+    return (int)result;
+}
+#endif
+'''
+
+
+class CBackendError(Exception):
+    pass
+
+
+class CBackend:
+    """Translates the IR returned by IRGenerator.generate into C.
+
+    Each proc becomes a C function whose registers are int64_t locals and
+    whose labels are goto targets; vectors live in a growable int64_t heap
+    managed by the small runtime emitted with the program. Strings cannot
+    be represented in int64_t registers and are rejected. The memo table
+    of a memoized proc is a static direct-mapped array of MEMO_ENTRIES
+    slots, emptied by every tsl_run. Procs call each other natively, so
+    the call depth is limited to what fits in STACK_BYTES of C stack,
+    estimated from the largest frame (see max_depth).
+    """
+
+    def generate(self, ir_text):
+        program = parse_ir(ir_text)
+        if 'main' not in program.procs:
+            raise CBackendError("no proc 'main' to compile")
+        self.arity = self.proc_arities(program)
+        lines = [f"#define TSL_MEMO_SLOTS {MEMO_ENTRIES}", f"#define TSL_MAX_DEPTH {self.max_depth(program)}", RUNTIME]
+        for label, values in program.data.items():
+            lines.append(f"static const int64_t D_{label}[] = {{{', '.join(map(str, values)) or '0'}}};")
+        for name, width in self.memo_tables(program).items():
+            lines.append(f"static int64_t M_{name}[TSL_MEMO_SLOTS * {width + 2}];")
+        for name in program.procs:
+            lines.append(self.signature(name) + ";")
+        lines.append("")
+        for proc in program.procs.values():
+            lines.extend(self.proc(proc, program))
+        lines.append(ENTRY)
+        return '\n'.join(lines)
+
+    def proc_arities(self, program):
+        arity = {name: 0 for name in program.procs}
+        for proc in program.procs.values():
+            for op, operands in proc.instructions:
+                if op == 'call' and operands[0] in arity:
+                    arity[operands[0]] = max(arity[operands[0]], len(operands) - 2)
+        return arity
+
+    def max_depth(self, program):
+        """Calls that fit in STACK_BYTES when every frame is as large as
+        the largest proc's: a word per register plus FRAME_OVERHEAD."""
+        frame = max(8 * len(self.registers(proc)) + FRAME_OVERHEAD for proc in program.procs.values())
+        return max(STACK_BYTES // frame, 1)
+
+    def registers(self, proc):
+        registers = {0}
+        for _, operands in proc.instructions:
+            registers.update(register_index(o) for o in operands if is_register(o))
+        return registers
+
+    def memo_tables(self, program):
+        """Key width of the memo table of every proc that mget/mput name."""
+        tables = {}
+        for proc in program.procs.values():
+            for op, operands in proc.instructions:
+                if op == 'call' and operands[0] in ('mget', 'mput'):
+                    tables[operands[2]] = len(operands) - 3
+        return tables
+
+    def signature(self, name):
+        params = ', '.join(f"int64_t r{i}" for i in range(1, self.arity[name] + 1))
+        return f"static int64_t p_{name}({params or 'void'})"
+
+    def proc(self, proc, program):
+        locals_ = sorted(r for r in self.registers(proc) if r == 0 or r > self.arity[proc.name])
+        lines = [self.signature(proc.name) + " {"]
+        lines.append(f"    int64_t {', '.join(f'r{r} = 0' for r in locals_)};")
+        lines.append("    tsl_enter();")
+        labels_at = {}
+        for label, index in proc.labels.items():
+            labels_at.setdefault(index, []).append(label)
+        for i, (op, operands) in enumerate(proc.instructions):
+            for label in labels_at.get(i, ()):
+                lines.append(f"L_{label}:;")
+            lines.append("    " + self.instruction(op, operands, program))
+        for label in labels_at.get(len(proc.instructions), ()):
+            lines.append(f"L_{label}:;")
+        lines.append("    tsl_depth--;")
+        lines.append("    return r0;")
+        lines.append("}")
+        lines.append("")
+        return lines
+
+    def instruction(self, op, operands, program):
+        if op == 'mov':
+            dst, src = operands
+            if not is_register(src):
+                value = parse_immediate(src)
+                if not isinstance(value, int):
+                    raise CBackendError("string values are not supported by the C backend")
+                return f"{dst} = {value}LL;"
+            return f"{dst} = {src};"
+        if op in C_ARITHMETIC:
+            dst, left, right = operands
+            return f"{dst} = {C_ARITHMETIC[op]}({left}, {right});"
+        if op == 'div':
+            return f"{operands[0]} = tsl_div({operands[1]}, {operands[2]});"
+        if op == 'mod':
+            return f"{operands[0]} = tsl_mod({operands[1]}, {operands[2]});"
+        if op in C_COMPARE:
+            dst, left, right = operands
+            return f"{dst} = {left} {C_COMPARE[op]} {right};"
+        if op == 'jz':
+            return f"if (!{operands[0]}) goto L_{operands[1]};"
+        if op == 'jnz':
+            return f"if ({operands[0]}) goto L_{operands[1]};"
+        if op == 'jmp':
+            return f"goto L_{operands[0]};"
+        if op == 'ret':
+            return "tsl_depth--; return r0;"
+        if op == 'ld':
+            return f"{operands[0]} = *tsl_word({operands[1]});"
+        if op == 'st':
+            return f"*tsl_word({operands[1]}) = {operands[0]};"
+        if op == 'call':
+            return self.call(operands, program)
+        raise CBackendError(f"unknown IR instruction '{op}'")
+
+    def call(self, operands, program):
+        callee, args = operands[0], operands[1:]
+        if callee == 'iget':
+            return f"{args[0]} = tsl_iget();"
+        if callee == 'iput':
+            return f"tsl_put({args[0]});"
+        if callee == 'mem':
+            return f"{args[0]} = tsl_mem({args[0]});"
+        if callee == 'list':
+            return f"{args[0]} = tsl_mem({args[1]} * 8);"
+        if callee == 'length':
+            return f"{args[0]} = tsl_length({args[1]});"
+        if callee == 'exit':
+            return f"tsl_exit({args[-1]});"
+        if callee == 'dcopy':
+            words = len(program.data[args[1]])
+            return f"tsl_copy({args[0]}, D_{args[1]}, {words});"
+        if callee in ('mget', 'mput'):
+            key = args[2:]
+            words = ', '.join(key) or '0'
+            if callee == 'mget':
+                access = f"{args[0]} = tsl_memo_get(M_{args[1]}, k, {len(key)}, &r0);"
+            else:
+                access = f"tsl_memo_put(M_{args[1]}, k, {len(key)}, {args[0]});"
+            return f"{{ const int64_t k[] = {{{words}}}; {access} }}"
+        if callee not in program.procs:
+            raise CBackendError(f"call to undefined proc '{callee}'")
+        return f"{args[0]} = p_{callee}({', '.join(args[1:])});"
+
+
+def build(c_source, output, shared=False, cc=None, flags=("-O2",)):
+    """Compile `c_source` with the system C compiler into an executable
+    or, with shared=True, a shared object loadable with ctypes."""
+    compiler = cc or os.environ.get("CC", "cc")
+    if shutil.which(compiler) is None:
+        raise CBackendError(f"C compiler '{compiler}' not found")
+    with tempfile.NamedTemporaryFile("w", suffix=".c", delete=False) as f:
+        f.write(c_source)
+        source_path = f.name
+    command = [compiler, *flags, "-o", output, source_path]
+    if shared:
+        command[1:1] = ["-shared", "-fPIC", "-DTSL_LIBRARY"]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True)
+    finally:
+        os.unlink(source_path)
+    if result.returncode:
+        raise CBackendError(f"C compilation failed:\n{result.stderr}")
+    return output
+
+
+def build_executable(ir_text, output):
+    return build(CBackend().generate(ir_text), output)
+
+
+PUT_FN = ctypes.CFUNCTYPE(None, ctypes.c_int64)
+GET_FN = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(ctypes.c_int64))
+
+
+def cache_dir():
+    """The per-user directory shared objects are cached in,
+    $XDG_CACHE_HOME/tslator (~/.cache/tslator), created with mode 0700."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    path = os.path.join(base, "tslator")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    check_private(path)
+    return path
+
+
+def check_private(path):
+    """Refuse to load code from `path` unless the current user owns it and
+    nobody else can write to it (it is loaded into this process)."""
+    info = os.lstat(path)
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise CBackendError(f"'{path}' is not owned by the current user")
+    if info.st_mode & 0o022:
+        raise CBackendError(f"'{path}' is writable by other users")
+
+
+class CProgram(object):
+    """Builds the IR as a shared object (cached by source hash in
+    cache_dir()) and runs it through ctypes with the same scan/print/exit
+    behaviour as IRInterpreter."""
+
+    def __init__(self, ir_text, stdin=None, stdout=None):
+        source = CBackend().generate(ir_text)
+        digest = hashlib.sha256(source.encode()).hexdigest()[:16]
+        directory = cache_dir()
+        path = os.path.join(directory, f"tsl_{digest}.so")
+        if not os.path.exists(path):
+            # a unique name per build, so concurrent builds of one program
+            # never write the same file; the rename is atomic
+            fd, temp_path = tempfile.mkstemp(suffix=".so", dir=directory)
+            os.close(fd)
+            try:
+                build(source, temp_path, shared=True)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        check_private(path)
+        self.library = ctypes.CDLL(path)
+        self.library.tsl_run.argtypes = [ctypes.POINTER(ctypes.c_int64)]
+        self.library.tsl_error.restype = ctypes.c_char_p
+        self.stdin = iter(stdin) if stdin is not None else None
+        self.stdout = stdout if stdout is not None else sys.stdout
+        # keep references: ctypes callbacks must outlive the calls into C
+        self.put = PUT_FN(self.write)
+        self.get = GET_FN(self.read_int)
+
+    def write(self, value):
+        self.stdout.write(f"{value}\n")
+
+    def read_int(self, out):
+        if self.stdin is None:
+            self.stdin = iter(sys.stdin.read().split())
+        try:
+            out[0] = int(next(self.stdin))
+        except (StopIteration, ValueError):
+            return 1
+        return 0
+
+    def run(self, entry='main'):
+        if entry != 'main':
+            raise IRRuntimeError("the C backend can only run 'main'")
+        self.library.tsl_set_io(self.put, self.get)
+        result = ctypes.c_int64()
+        if self.library.tsl_run(ctypes.byref(result)):
+            raise IRRuntimeError(self.library.tsl_error().decode())
+        return result.value
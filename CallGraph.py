@@ -0,0 +1,62 @@
+import AST
+from IRGenerator import ast_nodes
+
+
+def program_functions(ast):
+    """The FunctionDef nodes of a parsed program, in source order."""
+    functions = []
+    while ast is not None:
+        if getattr(ast, 'func', None):
+            functions.append(ast.func)
+        ast = getattr(ast, 'prog', None)
+    return functions
+
+
+class CallGraph(object):
+    """Which function calls which, from the FunctionCall nodes of every
+    function body. `calls` maps a function to the functions of the
+    program it calls (builtins left out) and `sizes` to the number of AST
+    nodes of its body."""
+
+    def __init__(self, ast):
+        self.functions = program_functions(ast)
+        names = {f.name for f in self.functions}
+        self.calls = {}
+        self.sizes = {}
+        for function in self.functions:
+            callees, size = set(), 0
+            for node in ast_nodes(function.body):
+                size += 1
+                if isinstance(node, AST.FunctionCall) and node.id in names:
+                    callees.add(node.id)
+            self.calls[function.name] = callees
+            self.sizes[function.name] = self.sizes.get(function.name, 0) + size
+
+    def reachable(self, root="main"):
+        """Names of the functions `root` may call, directly or not, and
+        root itself."""
+        if root not in self.calls:
+            return set()
+        seen, stack = {root}, [root]
+        while stack:
+            for callee in self.calls[stack.pop()]:
+                if callee not in seen:
+                    seen.add(callee)
+                    stack.append(callee)
+        return seen
+
+    def unreachable(self, root="main"):
+        """Names of the functions `root` can never call, in source order;
+        none when the program has no `root`, as a file of library
+        functions does."""
+        if root not in self.calls:
+            return []
+        live = self.reachable(root)
+        return [f.name for f in self.functions if f.name not in live]
+
+    def share(self, names):
+        """The AST nodes of `names` per AST node of the other functions,
+        to estimate the time that leaving them out saves."""
+        dead = sum(self.sizes[name] for name in set(names))
+        live = sum(self.sizes.values()) - dead
+        return dead / live if live else 0.0
@@ -0,0 +1,320 @@
+import operator
+import sys
+
+from IRInterpreter import (
+    IRInterpreter, IRRuntimeError, ProgramExit, WORD_BYTES, INT64_MIN, INT64_MAX, c_div, c_mod,
+    MOV, MOVI, ADD, SUB, MUL, DIV, MOD, CMP_LT, CMP_GT, CMP_LE, CMP_GE, CMP_EQ,
+    JZ, JNZ, JMP, CALL, RET, LD, ST, IGET, IPUT, MEM, LENGTH, LIST, EXIT, DCOPY, MGET, MPUT,
+)
+
+COMPARE = {
+    CMP_LT: operator.lt,
+    CMP_GT: operator.gt,
+    CMP_LE: operator.le,
+    CMP_GE: operator.ge,
+    CMP_EQ: operator.eq,
+}
+
+
+class ClosureEngine(IRInterpreter):
+    """Executes the IR by compiling each proc once into a chain of closures.
+
+    Every instruction becomes a closure `step(regs) -> next_step` with its
+    operands bound at compile time; jumps return the closure of their
+    target and `ret` returns None. A `cmp*` directly followed by `jz`/`jnz`
+    on its result is fused into one closure. Each TSLANG call runs its
+    callee's chain in a nested Python frame.
+    """
+
+    def __init__(self, ir_text, stdin=None, stdout=None, check_bounds=False):
+        super().__init__(ir_text, stdin=stdin, stdout=stdout, check_bounds=check_bounds)
+        self.entries = {}
+        self.patches = []
+        for name, proc in self.procs.items():
+            self.entries[name] = self.compile_proc(proc)
+        for link, target in self.patches:
+            link(target())
+        self.patches = []
+
+    def run(self, entry='main'):
+        # every TSLANG call nests one Python frame
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 100000))
+        try:
+            return super().run(entry)
+        finally:
+            sys.setrecursionlimit(limit)
+
+    def execute(self, proc, args=()):
+        regs = [0] * max(proc.nregs, len(args) + 1)
+        regs[1:len(args) + 1] = args
+        step = self.entries[proc.name]
+        try:
+            while step is not None:
+                step = step(regs)
+        except IndexError as e:
+            raise IRRuntimeError(f"invalid memory access in proc '{proc.name}': {e}")
+        except (TypeError, ValueError) as e:
+            raise IRRuntimeError(f"invalid operand in proc '{proc.name}': {e}")
+        return regs[0]
+
+    # --- compilation ---------------------------------------------------------
+
+    def compile_proc(self, proc):
+        code = proc.code
+        steps = [None] * (len(code) + 1)
+        # compiled back to front so every fall-through successor already exists
+        for i in range(len(code) - 1, -1, -1):
+            instr = code[i]
+            following = code[i + 1] if i + 1 < len(code) else None
+            if (instr[0] in COMPARE and following is not None
+                    and following[0] in (JZ, JNZ) and following[1] == instr[1]):
+                steps[i] = self.compile_compare_branch(instr, following, steps[i + 2], steps)
+            else:
+                steps[i] = self.compile_instruction(instr, steps[i + 1], steps)
+        return steps[0]
+
+    def compile_compare_branch(self, cmp_instr, branch, fall, steps):
+        op, a, b, c = cmp_instr
+        compare = COMPARE[op]
+        target = None
+
+        def link(step):
+            nonlocal target
+            target = step
+        self.patches.append((link, lambda: steps[branch[2]]))
+
+        if branch[0] == JZ:
+            def step(regs):
+                if compare(regs[b], regs[c]):
+                    regs[a] = 1
+                    return fall
+                regs[a] = 0
+                return target
+        else:
+            def step(regs):
+                if compare(regs[b], regs[c]):
+                    regs[a] = 1
+                    return target
+                regs[a] = 0
+                return fall
+        return step
+
+    def compile_instruction(self, instr, nxt, steps):
+        op, a, b, c = instr
+        # the heap replaces its view when it grows, so look it up on each access
+        heap = self.heap
+        if op == MOV:
+            def step(regs):
+                regs[a] = regs[b]
+                return nxt
+        elif op == MOVI:
+            def step(regs):
+                regs[a] = b
+                return nxt
+        elif op == ADD:
+            def step(regs):
+                regs[a] = value = regs[b] + regs[c]
+                if value.bit_length() > 63 and value != INT64_MIN:
+                    raise IRRuntimeError("integer overflow")
+                return nxt
+        elif op == SUB:
+            def step(regs):
+                regs[a] = value = regs[b] - regs[c]
+                if value.bit_length() > 63 and value != INT64_MIN:
+                    raise IRRuntimeError("integer overflow")
+                return nxt
+        elif op == MUL:
+            def step(regs):
+                regs[a] = value = regs[b] * regs[c]
+                if value.bit_length() > 63 and value != INT64_MIN:
+                    raise IRRuntimeError("integer overflow")
+                return nxt
+        elif op == DIV:
+            def step(regs):
+                regs[a] = value = c_div(regs[b], regs[c])
+                if value > INT64_MAX:
+                    raise IRRuntimeError("integer overflow")
+                return nxt
+        elif op == MOD:
+            def step(regs):
+                regs[a] = c_mod(regs[b], regs[c])
+                return nxt
+        elif op == CMP_LT:
+            def step(regs):
+                regs[a] = 1 if regs[b] < regs[c] else 0
+                return nxt
+        elif op == CMP_GT:
+            def step(regs):
+                regs[a] = 1 if regs[b] > regs[c] else 0
+                return nxt
+        elif op == CMP_LE:
+            def step(regs):
+                regs[a] = 1 if regs[b] <= regs[c] else 0
+                return nxt
+        elif op == CMP_GE:
+            def step(regs):
+                regs[a] = 1 if regs[b] >= regs[c] else 0
+                return nxt
+        elif op == CMP_EQ:
+            def step(regs):
+                regs[a] = 1 if regs[b] == regs[c] else 0
+                return nxt
+        elif op in (JZ, JNZ, JMP):
+            return self.compile_jump(op, a, b, nxt, steps)
+        elif op == LD:
+            def step(regs):
+                regs[a] = heap.view[regs[b] >> 3]
+                return nxt
+        elif op == ST:
+            def step(regs):
+                heap.view[regs[b] >> 3] = regs[a]
+                return nxt
+        elif op == CALL:
+            return self.compile_call(a, b, c, nxt)
+        elif op == RET:
+            def step(regs):
+                return None
+        elif op in (MGET, MPUT):
+            return self.compile_memo(op, a, self.memo[b], c, nxt)
+        else:
+            return self.compile_builtin(op, a, b, nxt)
+        return step
+
+    def compile_jump(self, op, a, b, nxt, steps):
+        target = None
+
+        def link(step):
+            nonlocal target
+            target = step
+        self.patches.append((link, lambda: steps[a if op == JMP else b]))
+
+        if op == JMP:
+            def step(regs):
+                return target
+        elif op == JZ:
+            def step(regs):
+                return nxt if regs[a] else target
+        else:
+            def step(regs):
+                return target if regs[a] else nxt
+        return step
+
+    def compile_call(self, dst, callee, args, nxt):
+        entries = self.entries
+        nregs = callee.nregs
+        name = callee.name
+        entry = None
+
+        def link(step):
+            nonlocal entry
+            entry = step
+        self.patches.append((link, lambda: entries[name]))
+
+        if len(args) == 1:
+            arg0, = args
+
+            def step(regs):
+                callee_regs = [0] * nregs
+                callee_regs[1] = regs[arg0]
+                s = entry
+                while s is not None:
+                    s = s(callee_regs)
+                regs[dst] = callee_regs[0]
+                return nxt
+        elif len(args) == 2:
+            arg0, arg1 = args
+
+            def step(regs):
+                callee_regs = [0] * nregs
+                callee_regs[1] = regs[arg0]
+                callee_regs[2] = regs[arg1]
+                s = entry
+                while s is not None:
+                    s = s(callee_regs)
+                regs[dst] = callee_regs[0]
+                return nxt
+        else:
+            padding = [0] * (nregs - len(args) - 1)
+
+            def step(regs):
+                callee_regs = [0]
+                callee_regs.extend([regs[r] for r in args])
+                callee_regs.extend(padding)
+                s = entry
+                while s is not None:
+                    s = s(callee_regs)
+                regs[dst] = callee_regs[0]
+                return nxt
+        return step
+
+    def compile_memo(self, op, a, table, key, nxt):
+        results = table.results
+        if op == MPUT:
+            put = table.put
+
+            def step(regs):
+                put(tuple([regs[r] for r in key]), regs[a])
+                return nxt
+        else:
+            def step(regs):
+                result = results.get(tuple([regs[r] for r in key]))
+                if result is None:
+                    table.misses += 1
+                    regs[a] = 0
+                else:
+                    table.hits += 1
+                    regs[0] = result
+                    regs[a] = 1
+                return nxt
+        return step
+
+    def compile_builtin(self, op, a, b, nxt):
+        if op == IGET:
+            read_int = self.read_int
+
+            def step(regs):
+                regs[a] = read_int()
+                return nxt
+        elif op == IPUT:
+            write = self.write
+
+            def step(regs):
+                write(regs[a])
+                return nxt
+        elif op == MEM:
+            allocate = self.heap.allocate
+
+            def step(regs):
+                regs[a] = allocate(regs[a])
+                return nxt
+        elif op == LIST:
+            allocate = self.heap.allocate
+
+            def step(regs):
+                regs[a] = allocate(regs[b] * WORD_BYTES)
+                return nxt
+        elif op == LENGTH:
+            length = self.heap.length
+
+            def step(regs):
+                regs[a] = length(regs[b])
+                return nxt
+        elif op == DCOPY:
+            block = self.data[b]
+            copy = self.heap.copy
+
+            def step(regs):
+                copy(regs[a], block)
+                return nxt
+        elif op == EXIT:
+            def step(regs):
+                raise ProgramExit(regs[a])
+        else:
+            raise IRRuntimeError(f"cannot compile opcode {op}")
+        return step
+
+
+def run_ir(ir_text, stdin=None, stdout=None, entry='main'):
+    engine = ClosureEngine(ir_text, stdin=stdin, stdout=stdout)
+    return engine.run(entry)
@@ -0,0 +1,195 @@
+import time
+
+from lexer import new_lexer, remove_comments, tokenize
+from parser import new_parser
+from SemanticAnalyzer import semanticChecker
+from IRGenerator import IRGenerator
+from Diagnostics import Diagnostics, DiagnosticLimitReached
+from Instrumentation import Instrumentation
+from CallGraph import CallGraph
+from Purity import Purity
+from PartialEvaluator import PartialEvaluator, FOLD_SECONDS
+
+
+def parse_program(processed_text, diagnostics=None):
+    """Returns (ast, syntax error messages). Syntax errors are reported to
+    `diagnostics`, if given; the AST is None when parsing failed or the
+    error limit was reached."""
+    diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+    ast = None
+    lexer = new_lexer(diagnostics)
+    try:
+        ast = new_parser(lexer).parse(processed_text, lexer=lexer, tracking=True)
+    except DiagnosticLimitReached:
+        pass
+    except Exception as e:
+        diagnostics.add("syntax", "exception", f"Parser exception: {str(e)}")
+    return ast, diagnostics.messages("syntax")
+
+
+def check_semantics(ast, diagnostics, externals=None, signature_only=()):
+    """Returns the symbol table, or None when the checker failed or stopped
+    at the error limit; errors are reported to `diagnostics`. `externals`
+    is a SymbolTable of functions defined in other files; the bodies of
+    the functions named in `signature_only` are not checked."""
+    try:
+        return semanticChecker(diagnostics, externals, signature_only).analyze(ast)
+    except DiagnosticLimitReached:
+        return None
+    except Exception as e:
+        diagnostics.add("semantic", "exception", f"Semantic analysis exception: {e}")
+        return None
+
+
+class CompilationResult(object):
+    """What one compilation produced. Phases after the first failing one
+    do not run, so their results stay empty: `ast` and `symbol_table` may
+    be None, and `ir` is "" unless every phase passed. `source_lines`
+    holds the TSLANG line of every IR line. `functions` names every
+    function in source order when dead functions were looked for, and
+    `eliminated` those main never calls, which got no IR; `saved_seconds`
+    estimates the time that saved. `pure` names the pure functions, in
+    source order, and `memoized` those whose results are kept in memo
+    tables; both stay empty without memoize. `folded` records every call
+    with constant arguments that was evaluated at compile time: its
+    function, line, call, value, or the reason it was left alone."""
+
+    def __init__(self, source, diagnostics):
+        self.source = source
+        self.diagnostics = diagnostics
+        self.tokens = []
+        self.ast = None
+        self.symbol_table = None
+        self.ir = ""
+        self.source_lines = []
+        self.functions = []
+        self.eliminated = []
+        self.saved_seconds = 0.0
+        self.pure = []
+        self.memoized = []
+        self.folded = []
+
+    @property
+    def ok(self):
+        return not self.diagnostics and bool(self.ir)
+
+    def errors(self):
+        """[(phase, message)] of every diagnostic, in report order."""
+        return [(d.phase, str(d)) for d in self.diagnostics]
+
+
+class Compiler(object):
+    """Compiles TSLANG source to IR without touching module-level state.
+
+    Every compile() gets its own lexer (lexer.new_lexer), parser
+    (parser.new_parser), semantic checker, IR generator and Diagnostics,
+    so one Compiler can serve threads concurrently. The options apply to
+    every compilation: stop after `max_errors` diagnostics (0: no limit),
+    guide IR generation with a Profiler.ExecutionProfile, and leave out
+    the functions main cannot reach (`eliminate_dead`). With `fast`, the
+    bodies of those functions are not even checked, only their
+    signatures. With `memoize`, the pure functions that call functions
+    or loop remember their results (see Purity). With `fold_steps` (for
+    instance PartialEvaluator.FOLD_STEPS), calls of pure functions with
+    constant arguments are evaluated at compile time within that many IR
+    instructions per call and, if set, `fold_seconds` in all; the default
+    0 does not fold, which spares every compilation the purity analysis
+    and the evaluator's own IR. The IR of
+    the functions is generated on `jobs` worker processes."""
+
+    def __init__(self, max_errors=0, profile=None, eliminate_dead=True, fast=False, memoize=False,
+                 fold_steps=0, fold_seconds=FOLD_SECONDS, jobs=1):
+        self.max_errors = max_errors
+        self.profile = profile
+        self.eliminate_dead = eliminate_dead
+        self.fast = fast
+        self.memoize = memoize
+        self.fold_steps = fold_steps
+        self.fold_seconds = fold_seconds
+        self.jobs = jobs
+
+    def compile(self, source, instrumentation=None, externals=None):
+        """Returns a CompilationResult. Phases are timed and counted on
+        `instrumentation`, if given; an Instrumentation must not be shared
+        between threads. `externals` is a SymbolTable of the functions of
+        other files that the source may call (see Linker)."""
+        instrumentation = instrumentation or Instrumentation(enabled=False)
+        return self.finish(self.parse(source, instrumentation), instrumentation, externals)
+
+    def parse(self, source, instrumentation=None):
+        """Preprocess, lex and parse `source`; returns a CompilationResult
+        to hand to finish(); its AST is None if lexing or parsing failed."""
+        instrumentation = instrumentation or Instrumentation(enabled=False)
+        diagnostics = Diagnostics(self.max_errors)
+        result = CompilationResult(source, diagnostics)
+        with instrumentation.phase("preprocess"):
+            processed = remove_comments(source)
+
+        with instrumentation.phase("lexical"):
+            try:
+                result.tokens, _ = tokenize(processed, preprocessed=True, instance=new_lexer(diagnostics))
+            except DiagnosticLimitReached:
+                pass
+            except Exception as e:
+                diagnostics.add("lexical", "exception", f"Lexical analysis exception: {e}")
+        instrumentation.count_tokens(result.tokens)
+        if diagnostics:
+            return result
+
+        with instrumentation.phase("syntax"):
+            result.ast, _ = parse_program(processed, diagnostics)
+        instrumentation.count_ast(result.ast)
+        return result
+
+    def finish(self, result, instrumentation=None, externals=None):
+        """Check and generate IR for a result of parse(). With `externals`
+        the source is one file of a larger program, whose functions may be
+        called from the other files, so none is eliminated."""
+        instrumentation = instrumentation or Instrumentation(enabled=False)
+        diagnostics = result.diagnostics
+        if result.ast is None or diagnostics.truncated:
+            return result
+        graph = None
+        if self.eliminate_dead and externals is None:
+            graph = CallGraph(result.ast)
+            result.functions = [f.name for f in graph.functions]
+            result.eliminated = graph.unreachable()
+
+        with instrumentation.phase("semantic"):
+            start = time.perf_counter()
+            signature_only = result.eliminated if self.fast else ()
+            result.symbol_table = check_semantics(result.ast, diagnostics, externals, signature_only)
+            semantic_seconds = time.perf_counter() - start
+        instrumentation.count_symbols(result.symbol_table)
+        if diagnostics:
+            return result
+        purity = Purity(result.ast, graph) if self.memoize or self.fold_steps else None
+        if self.memoize:
+            result.pure = [f.name for f in purity.graph.functions if f.name in purity.pure]
+            result.memoized = purity.memoizable(result.eliminated)
+        evaluator = None
+        if self.fold_steps:
+            # eliminated functions are out of reach of every call that is folded
+            evaluator = PartialEvaluator(result.ast, result.symbol_table, purity.pure - set(result.eliminated),
+                                         purity.reasons, self.fold_steps, self.fold_seconds)
+
+        with instrumentation.phase("ir"):
+            start = time.perf_counter()
+            try:
+                generator = IRGenerator()
+                generator.symbol_table = result.symbol_table
+                ir = generator.generate(result.ast, result.symbol_table, jobs=self.jobs, profile=self.profile,
+                                        skip=result.eliminated, memoize=result.memoized, evaluator=evaluator)
+            except Exception as e:
+                diagnostics.add("ir", "exception", f"IR Generation exception: {str(e)}")
+                return result
+            instrumentation.count("dead_functions", len(result.eliminated))
+            instrumentation.count("memoized_functions", len(result.memoized))
+            instrumentation.count("folded_calls", sum(f["value"] is not None for f in generator.folded))
+            skipped_seconds = time.perf_counter() - start + (semantic_seconds if self.fast else 0)
+        if graph is not None:
+            result.saved_seconds = graph.share(result.eliminated) * skipped_seconds
+        result.ir, result.source_lines = ir, generator.source_lines
+        result.folded = generator.folded
+        instrumentation.count_ir(result.ir)
+        return result
@@ -0,0 +1,95 @@
+FORMATS = {
+    "lexical": "{message} at line {line}",
+    "syntax": "Syntax error at line {line}: {message}",
+    "semantic": "Semantic error at line {line}: {message}",
+}
+
+
+class Diagnostic(object):
+    """One problem found by a compiler phase. `code` is a short stable
+    identifier such as "undefined-variable"; line and column are 1-based
+    and may be None. str() gives the message as the phase has always
+    printed it."""
+
+    __slots__ = ("phase", "code", "line", "column", "message")
+
+    def __init__(self, phase, code, message, line=None, column=None):
+        self.phase = phase
+        self.code = code
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def key(self):
+        return self.phase, self.code, self.line, self.column, self.message
+
+    def __eq__(self, other):
+        return isinstance(other, Diagnostic) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __str__(self):
+        if self.line is None:
+            return self.message
+        return FORMATS.get(self.phase, "{message}").format(message=self.message, line=self.line)
+
+    def __repr__(self):
+        return f"Diagnostic({self.phase!r}, {self.code!r}, {self.message!r}, line={self.line!r}, column={self.column!r})"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class DiagnosticLimitReached(Exception):
+    """Raised by Diagnostics.report() when the error cap is reached; the
+    phase that reported stops and the pipeline skips the later phases."""
+
+
+class Diagnostics(object):
+    """The diagnostics of one compilation in the order they were reported.
+
+    A diagnostic equal to one already present is ignored, which is checked
+    in constant time. With a `limit`, the report that brings the count to
+    the limit raises DiagnosticLimitReached and sets `truncated`; anything
+    reported after that is dropped."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.truncated = False
+        self.items = {}
+
+    def add(self, phase, code, message, line=None, column=None):
+        """Record a diagnostic without checking the limit; for failures of
+        the compiler itself, which end their phase anyway."""
+        diagnostic = Diagnostic(phase, code, message, line, column)
+        self.items.setdefault(diagnostic, None)
+        return diagnostic
+
+    def report(self, phase, code, message, line=None, column=None):
+        if self.truncated:
+            return None
+        count = len(self.items)
+        diagnostic = self.add(phase, code, message, line, column)
+        if self.limit and len(self.items) > count and len(self.items) >= self.limit:
+            self.truncated = True
+            raise DiagnosticLimitReached(f"stopped after {len(self.items)} errors")
+        return diagnostic
+
+    def by_phase(self, phase):
+        return [d for d in self.items if d.phase == phase]
+
+    def messages(self, phase):
+        return [str(d) for d in self.items if d.phase == phase]
+
+    def __contains__(self, diagnostic):
+        return diagnostic in self.items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def to_list(self):
+        return [d.to_dict() for d in self.items]
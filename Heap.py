@@ -0,0 +1,111 @@
+import bisect
+
+WORD_BYTES = 8
+INITIAL_WORDS = 1024
+
+
+class HeapError(IndexError):
+    """An invalid vector address, or with check_bounds, an access outside
+    every live vector."""
+
+
+class CheckedWords(object):
+    """Stands in for Heap.words when bounds checking is on: every index must
+    fall inside a live vector."""
+
+    def __init__(self, heap):
+        self.heap = heap
+
+    def __getitem__(self, index):
+        self.heap.check(index)
+        return self.heap.words[index]
+
+    def __setitem__(self, index, value):
+        self.heap.check(index)
+        self.heap.words[index] = value
+
+
+class Heap(object):
+    """Vector memory of the IR engines: 64-bit words in one growable
+    bytearray, read and written through a memoryview cast to 'q'.
+
+    Addresses are byte addresses and `ld`/`st` index `view` with
+    address >> 3. Every block is preceded by a header word holding the
+    vector's length in words, which is what `length` returns. Word 0 is
+    never allocated, so address 0 is never valid. The IR never frees a
+    vector, so blocks are bump-allocated one after the other.
+
+    Growing the bytearray replaces `words` and `view`; callers that keep
+    a reference must fetch it again after allocate().
+    """
+
+    def __init__(self, capacity_words=INITIAL_WORDS, check_bounds=False):
+        self.buffer = bytearray(max(capacity_words, 2) * WORD_BYTES)
+        self.words = memoryview(self.buffer).cast('q')
+        self.top = 1          # first word the bump allocator has not handed out
+        self.check_bounds = check_bounds
+        self.blocks = []      # sorted first words of live blocks (check_bounds only)
+        self.view = CheckedWords(self) if check_bounds else self.words
+
+    def grow(self, needed_words):
+        capacity = len(self.words)
+        while capacity < needed_words:
+            capacity *= 2
+        # a bytearray cannot be resized while a view of it exists
+        self.words.release()
+        self.buffer.extend(bytes(capacity * WORD_BYTES - len(self.buffer)))
+        self.words = memoryview(self.buffer).cast('q')
+        if not self.check_bounds:
+            self.view = self.words
+
+    # --- allocation ----------------------------------------------------------
+
+    def allocate(self, size_bytes):
+        """Address of a new zeroed vector of size_bytes // 8 words (`call mem`)."""
+        words = max(0, size_bytes) // WORD_BYTES
+        start = self.top + 1
+        # empty vectors still take a word so every vector has its own address
+        self.top = start + max(words, 1)
+        if self.top > len(self.words):
+            self.grow(self.top)
+        self.words[start - 1] = words
+        if self.check_bounds:
+            bisect.insort(self.blocks, start)
+        return start * WORD_BYTES
+
+    # --- access --------------------------------------------------------------
+
+    def block_start(self, address):
+        start = address >> 3
+        if start <= 0 or start >= self.top or address & (WORD_BYTES - 1):
+            raise HeapError(f"invalid vector address {address}")
+        if self.check_bounds:
+            i = bisect.bisect_left(self.blocks, start)
+            if i == len(self.blocks) or self.blocks[i] != start:
+                raise HeapError(f"no live vector at address {address}")
+        return start
+
+    def length(self, address):
+        """Length in words of the vector at `address` (`call length`)."""
+        return self.words[self.block_start(address) - 1]
+
+    def check(self, index):
+        """Raise HeapError unless word `index` lies inside a live vector."""
+        i = bisect.bisect_right(self.blocks, index) - 1
+        if i < 0 or index >= self.blocks[i] + self.words[self.blocks[i] - 1]:
+            raise HeapError(f"address {index * WORD_BYTES} is outside every vector")
+
+    def check_range(self, index, count):
+        if self.check_bounds and count:
+            self.check(index)
+            self.check(index + count - 1)
+            if bisect.bisect_right(self.blocks, index) != bisect.bisect_right(self.blocks, index + count - 1):
+                raise HeapError(f"range at address {index * WORD_BYTES} spans several vectors")
+
+    # --- bulk copy (call dcopy) ----------------------------------------------
+
+    def copy(self, address, values):
+        """Store the words of `values` (an array('q')) from `address` on."""
+        start = address >> 3
+        self.check_range(start, len(values))
+        self.words[start:start + len(values)] = values
@@ -1,20 +1,68 @@
+import multiprocessing
+import operator
+from concurrent.futures import ProcessPoolExecutor
+
 import AST
 import SymbolTable
 from ply.lex import LexToken
+from IRInterpreter import IRRuntimeError, c_div, int64
+
+# Control transfers end a basic block; nothing computed before them is reused.
+BLOCK_ENDS = {"jmp", "jz", "jnz", "ret"}
+# Operand order does not matter for these when looking up an available value.
+COMMUTATIVE = {"add", "mul", "cmp="}
+# Builtins that never write vector memory, so loaded values survive them.
+MEMORY_SAFE_CALLS = {"iget", "iput", "mem", "length", "mget", "mput"}
+
+# Profile-guided optimization (IRGenerator.generate(profile=...)): executions
+# after which a call site, if-else or loop counts as hot, and the largest
+# callee body, in statements, that is inlined at a hot call site.
+PGO_HOT_COUNT = 64
+PGO_INLINE_STATEMENTS = 8
+STATEMENTS = (AST.VariableDecl, AST.Assignment, AST.FunctionCall, AST.ReturnInstruction,
+              AST.IfOrIfElseInstruction, AST.WhileInstruction, AST.ForInstruction)
+
+# Operators a constant argument of a folded call may use (see fold_call).
+CONSTANT_OPS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': c_div}
+
+BINARY_OPS = {
+    '+': "add",
+    '-': "sub",
+    '*': "mul",
+    '/': "div",
+    '%': "mod",
+    '<': "cmp<",
+    '>': "cmp>",
+    '<=': "cmp<=",
+    '>=': "cmp>=",
+    '==': "cmp=",
+    '=': "cmp=",
+}
 
 
 class IRGenerator:
     def __init__(self):
         self.code = []
+        self.data = []
+        self.lines = []         # source line of each entry of self.code
+        self.source_line = None
         self.current_register = 1
         self.label_counter = 0
         self.function_registers = {}
         self.current_function = None
         self.loop_stack = []
         self.variable_registers = {}
-        # NEW: constants cache + word size
-        self.const_regs = {}
         self.word_bytes_str = "8"
+        self.profile = None
+        self.functions = {}
+        self.profile_function = None  # function whose source is being generated
+        self.ordinals = {}  # function -> {id(node): construct_ordinal}
+        self.inline_stack = []        # (callee, result register, end label)
+        self.cold_blocks = []         # (code, lines) placed after the function's ret
+        self.memoize = set()
+        self.evaluator = None
+        self.folds = {}               # id of a folded call -> fold record
+        self.reset_values()
 
     # --- utils ---------------------------------------------------------------
 
@@ -24,13 +72,16 @@ class IRGenerator:
         return f"r{reg}"
 
     def get_next_label(self, prefix="L"):
-        label = f"{prefix}{self.label_counter}"
+        # suffixed with the function name so procs can be generated apart
+        label = f"{prefix}{self.label_counter}_{self.current_function}"
         self.label_counter += 1
         return label
 
     def emit(self, op, *args):
         instruction = f"{op} {', '.join(str(arg) for arg in args)}" if args else op
         self.code.append(instruction)
+        self.lines.append(self.source_line)
+        self.track_effects(op, args)
 
     def emit_label(self, label):
         # procs: no colon; control-flow labels: colon
@@ -38,38 +89,166 @@ class IRGenerator:
             self.code.append(label)
         else:
             self.code.append(f"{label}:")
+        self.lines.append(self.source_line)
+        # a label starts a new basic block
+        self.reset_values()
+
+    def mark_line(self, node):
+        """Attribute the code emitted from now on to the source line of `node`."""
+        pos = getattr(node, 'pos', None)
+        # inlined code keeps the line of its call site
+        if isinstance(pos, int) and not self.inline_stack:
+            self.source_line = pos
 
     def get_const_reg(self, value: str):
         """Return a register holding the numeric constant `value` (string)."""
-        if value not in self.const_regs:
-            r = self.get_next_register()
-            self.emit("mov", r, value)
-            self.const_regs[value] = r
-        return self.const_regs[value]
+        return self.emit_pure("mov", str(value))
+
+    # --- local value numbering -----------------------------------------------
+
+    def reset_values(self):
+        """Forget every available value (basic-block boundary)."""
+        self.values = {}
+        self.value_uses = {}
+        self.load_values = set()
+
+    def kill_register(self, reg):
+        """`reg` was overwritten: drop every value computed from or held in it."""
+        for key in self.value_uses.pop(reg, ()):
+            if self.values.get(key) == reg or reg in key:
+                # a key killed and computed again is listed twice
+                self.values.pop(key, None)
+                self.load_values.discard(key)
+
+    def kill_loads(self):
+        """Vector memory changed: loaded values can no longer be reused."""
+        for key in self.load_values:
+            self.values.pop(key, None)
+        self.load_values = set()
+
+    def track_effects(self, op, args):
+        if op in BLOCK_ENDS:
+            self.reset_values()
+        elif op == "st":
+            self.kill_loads()
+        elif op == "call":
+            if args[0] not in MEMORY_SAFE_CALLS:
+                self.kill_loads()
+            if args[0] != "iput" and len(args) > 1:
+                self.kill_register(args[1])
+        elif args:
+            self.kill_register(args[0])
+
+    def emit_pure(self, op, *operands):
+        """Emit `op dst, *operands` into a fresh register, or return the register
+        already holding that value in the current basic block.
+
+        For `call`, the first operand is the callee (`call length, dst, v`)."""
+        key_operands = tuple(sorted(operands)) if op in COMMUTATIVE else operands
+        key = (op,) + key_operands
+        if key in self.values:
+            return self.values[key]
+        reg = self.get_next_register()
+        if op == "call":
+            self.emit(op, operands[0], reg, *operands[1:])
+        else:
+            self.emit(op, reg, *operands)
+        self.values[key] = reg
+        for r in {reg, *operands}:
+            self.value_uses.setdefault(r, []).append(key)
+        if op == "ld":
+            self.load_values.add(key)
+        return reg
 
     # --- driver --------------------------------------------------------------
 
-    def generate(self, ast, symbol_table):
+    def generate(self, ast, symbol_table, jobs=1, profile=None, skip=(), memoize=(), evaluator=None):
+        """Generate IR for every function of `ast` not named in `skip`
+        (see CallGraph.unreachable).
+
+        With jobs > 1 the functions are generated on a process pool; the
+        output is merged in source order and is identical to jobs=1.
+
+        `profile` is a Profiler.ExecutionProfile of an earlier run: hot
+        calls to small functions are inlined, the hotter arm of an if-else
+        falls through while the colder one moves after the function's ret,
+        and hot loops are rotated to test their condition at the bottom.
+
+        The functions named in `memoize` (see Purity.memoizable) keep
+        their results in a memo table keyed by their arguments: they start
+        with `call mget`, which returns the cached result if there is one,
+        and end with `call mput`, which stores the result.
+
+        `evaluator` is a PartialEvaluator: calls of pure functions whose
+        arguments are constants are run at compile time and replaced by
+        their value. `folded` lists every attempt, with the value or why
+        the call was left alone."""
         self.symbol_table = symbol_table
+        self.jobs = jobs
+        self.profile = profile
+        self.skip = skip
+        self.memoize = set(memoize)
+        self.evaluator = evaluator
         if hasattr(ast, 'accept'):
             ast.accept(self)
+        self.folded = list(self.folds.values())
+        # source line of every line of the returned text (None for data lines)
+        self.source_lines = [None] * len(self.data) + self.lines
         # IMPORTANT: keep a newline at EOF so the last instruction is parsed
-        return '\n'.join(self.code) + '\n'
+        return '\n'.join(self.data + self.code) + '\n'
+
+    def generate_function(self, node):
+        """Generate one function on a fresh generator; returns (data, code,
+        lines, folds)."""
+        generator = IRGenerator()
+        generator.symbol_table = self.symbol_table
+        generator.profile = self.profile
+        generator.functions = self.functions
+        generator.memoize = self.memoize
+        generator.evaluator = self.evaluator
+        node.accept(generator)
+        return generator.data, generator.code, generator.lines, generator.folds
+
+    def generate_functions(self, functions):
+        jobs = getattr(self, 'jobs', 1)
+        if jobs <= 1 or len(functions) < 2 or 'fork' not in multiprocessing.get_all_start_methods():
+            return [self.generate_function(f) for f in functions]
+        # Workers are forked, so they inherit the AST and symbol tables and
+        # only function indices and the generated text cross processes.
+        global _parallel_job
+        _parallel_job = (self, functions)
+        try:
+            context = multiprocessing.get_context('fork')
+            chunksize = max(1, len(functions) // (jobs * 4))
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+                return list(pool.map(_generate_nth, range(len(functions)), chunksize=chunksize))
+        finally:
+            _parallel_job = None
 
     # --- visitors ------------------------------------------------------------
 
     def visit_Program(self, node, symbol_table=None):
+        functions = []
         current = node
         while current:
             if hasattr(current, 'func') and current.func:
-                current.func.accept(self)
+                functions.append(current.func)
             current = current.prog if hasattr(current, 'prog') else None
+        self.functions = {f.name: f for f in functions}
+        skip = getattr(self, 'skip', ())
+        for data, code, lines, folds in self.generate_functions([f for f in functions if f.name not in skip]):
+            self.data.extend(data)
+            self.code.extend(code)
+            self.lines.extend(lines)
+            self.folds.update(folds)
 
     def visit_FunctionDef(self, node, symbol_table=None):
         self.current_function = node.name
         self.current_register = 1
         self.variable_registers = {}
-        self.const_regs = {}  # reset per function
+        self.profile_function = node.name
+        self.cold_blocks = []
+        self.mark_line(node)
 
         func_symbol = self.symbol_table.get(node.name)
         if hasattr(func_symbol, 'scope'):
@@ -93,13 +272,60 @@ class IRGenerator:
 
         self.function_registers[node.name] = param_registers
         self.current_register = max_param_reg_num + 1
+        memo_key = self.emit_memo_lookup(node) if node.name in self.memoize else None
+        body_start = len(self.code)
 
         if hasattr(node, 'body') and node.body:
             node.body.accept(self)
 
         if node.name != "main" and (not self.code or not self.code[-1].strip().endswith('ret')):
+            self.mark_line(node)
             self.emit("mov", "r0", "0")
             self.emit("ret")
+        if self.cold_blocks:
+            if not self.code[-1].strip().endswith('ret'):
+                self.emit("ret")
+            for code, lines in self.cold_blocks:
+                self.code.extend(code)
+                self.lines.extend(lines)
+        if memo_key is not None:
+            self.emit_memo_store(node, memo_key, body_start)
+
+    def emit_memo_lookup(self, node):
+        """Return the cached result of `node` for these arguments, if any.
+        Parameters the body assigns are copied first so the result is
+        stored under the arguments of the call; returns the key registers."""
+        assigned = {assigned_name(n) for n in ast_nodes(node.body)}
+        key = []
+        for param in node.fmlparams.parameters:
+            reg = self.variable_registers[param.id]
+            if param.id in assigned:
+                copy = self.get_next_register()
+                self.emit("mov", copy, reg)
+                reg = copy
+            key.append(reg)
+        hit_reg = self.get_next_register()
+        miss_label = self.get_next_label("MISS")
+        self.emit("call", "mget", hit_reg, node.name, *key)
+        self.emit("jz", hit_reg, miss_label)
+        self.emit("ret")
+        self.emit_label(miss_label)
+        return key
+
+    def emit_memo_store(self, node, key, start):
+        """Send every ret of the body from `start` on through one `mput`."""
+        store_label = self.get_next_label("STORE")
+        if self.code[-1] == "ret":
+            # the last ret falls through to the store
+            self.code.pop()
+            self.lines.pop()
+        for i in range(start, len(self.code)):
+            if self.code[i] == "ret":
+                self.code[i] = f"jmp {store_label}"
+        self.mark_line(node)
+        self.emit_label(store_label)
+        self.emit("call", "mput", "r0", node.name, *key)
+        self.emit("ret")
 
     def visit_Body(self, node, symbol_table=None):
         if hasattr(node, 'statement') and node.statement:
@@ -107,16 +333,21 @@ class IRGenerator:
         if hasattr(node, 'body') and node.body:
             node.body.accept(self)
 
-    def visit_VariableDecl(self, node, symbol_table=None):
-        varname = node.id
-        symbol = self.symbol_table.get(varname)
-        if not symbol:
-            return
+    def get_variable_register(self, varname):
+        """Register of `varname`, allocated on first use. Variables of nested
+        scopes (declared in a for body) are not in the function's table, so
+        the symbol is optional."""
         if varname not in self.variable_registers:
             var_reg = self.get_next_register()
             self.variable_registers[varname] = var_reg
-            symbol.set_register(var_reg)
-        var_reg = self.variable_registers[varname]
+            symbol = self.symbol_table.get(varname)
+            if symbol:
+                symbol.set_register(var_reg)
+        return self.variable_registers[varname]
+
+    def visit_VariableDecl(self, node, symbol_table=None):
+        self.mark_line(node)
+        var_reg = self.get_variable_register(node.id)
 
         if hasattr(node, 'expr') and node.expr:
             expr_reg = self.visit_expression(node.expr)
@@ -124,17 +355,14 @@ class IRGenerator:
                 self.emit("mov", var_reg, expr_reg)
 
     def visit_Assignment(self, node, symbol_table=None):
-        varname = node.id if isinstance(node.id, str) else node.id.value
-        symbol = self.symbol_table.get(varname)
-        if not symbol:
+        self.mark_line(node)
+        if isinstance(node.id, AST.OperationOnList):
+            addr_reg = self.visit_element_address(node.id)
+            expr_reg = self.visit_expression(node.expr)
+            self.emit("st", expr_reg, addr_reg)
             return
-
-        if varname not in self.variable_registers:
-            var_reg = self.get_next_register()
-            self.variable_registers[varname] = var_reg
-            symbol.set_register(var_reg)
-        else:
-            var_reg = self.variable_registers[varname]
+        varname = node.id if isinstance(node.id, str) else node.id.value
+        var_reg = self.get_variable_register(varname)
 
         expr_reg = self.visit_expression(node.expr)
         if expr_reg != var_reg:
@@ -154,25 +382,18 @@ class IRGenerator:
         elif isinstance(expr, AST.ExprList):
             return self.visit_ExprList(expr)
         else:
-            result_reg = self.get_next_register()
-            self.emit("mov", result_reg, "0")
-            return result_reg
+            return self.get_const_reg("0")
 
     def visit_token(self, token):
         if token.type == 'NUMBER':
-            result_reg = self.get_next_register()
-            self.emit("mov", result_reg, token.value)
-            return result_reg
+            return self.get_const_reg(token.value)
         elif token.type == 'STRING':
             # TSVM is integer-only; strings would need separate handling.
             result_reg = self.get_next_register()
             self.emit("mov", result_reg, f'"{token.value}"')
             return result_reg
         elif token.type == 'BOOL':
-            result_reg = self.get_next_register()
-            value = "1" if token.value.lower() == 'true' else "0"
-            self.emit("mov", result_reg, value)
-            return result_reg
+            return self.get_const_reg("1" if token.value.lower() == 'true' else "0")
         elif token.type == 'ID':
             varname = token.value
             if varname in self.variable_registers:
@@ -182,52 +403,58 @@ class IRGenerator:
                   varname in self.function_registers[self.current_function]):
                 return self.function_registers[self.current_function][varname]
             else:
-                result_reg = self.get_next_register()
-                self.emit("mov", result_reg, "0")
-                return result_reg
-        result_reg = self.get_next_register()
-        self.emit("mov", result_reg, "0")
-        return result_reg
+                return self.get_const_reg("0")
+        return self.get_const_reg("0")
 
-    def visit_BinExpr(self, node):
+    def visit_BinExpr(self, node, symbol_table=None):
+        if node.op in ('&&', '||'):
+            return self.visit_logical(node)
         left_reg = self.visit_expression(node.left)
         right_reg = self.visit_expression(node.right)
-        result_reg = self.get_next_register()
-        if node.op == '+':
-            self.emit("add", result_reg, left_reg, right_reg)
-        elif node.op == '-':
-            self.emit("sub", result_reg, left_reg, right_reg)
-        elif node.op == '*':
-            self.emit("mul", result_reg, left_reg, right_reg)
-        elif node.op == '/':
-            self.emit("div", result_reg, left_reg, right_reg)
-        elif node.op == '%':
-            self.emit("mod", result_reg, left_reg, right_reg)
-        elif node.op == '<':
-            self.emit("cmp<", result_reg, left_reg, right_reg)
-        elif node.op == '>':
-            self.emit("cmp>", result_reg, left_reg, right_reg)
-        elif node.op == '<=':
-            self.emit("cmp<=", result_reg, left_reg, right_reg)
-        elif node.op == '>=':
-            self.emit("cmp>=", result_reg, left_reg, right_reg)
-        elif node.op == '==' or node.op == '=':
-            self.emit("cmp=", result_reg, left_reg, right_reg)
+        if node.op in BINARY_OPS:
+            return self.emit_pure(BINARY_OPS[node.op], left_reg, right_reg)
         elif node.op == '!=':
-            temp_reg = self.get_next_register()
-            self.emit("cmp=", temp_reg, left_reg, right_reg)
+            temp_reg = self.emit_pure("cmp=", left_reg, right_reg)
             one = self.get_const_reg("1")
-            self.emit("sub", result_reg, one, temp_reg)
-        elif node.op == '&&':
-            self.emit("mul", result_reg, left_reg, right_reg)
-        elif node.op == '||':
-            temp_reg = self.get_next_register()
-            self.emit("add", temp_reg, left_reg, right_reg)
-            zero = self.get_const_reg("0")
-            self.emit("cmp>", result_reg, temp_reg, zero)
+            return self.emit_pure("sub", one, temp_reg)
+        return self.get_const_reg("0")
+
+    def visit_logical(self, node):
+        """Materialize `&&` / `||` as 0/1 without evaluating the right side
+        when the left side already decides the result."""
+        result_reg = self.get_next_register()
+        end_label = self.get_next_label("LOGIC")
+        self.emit("mov", result_reg, "0")
+        self.emit_branch(node, end_label, False)
+        self.emit("mov", result_reg, "1")
+        self.emit_label(end_label)
         return result_reg
 
+    def emit_branch(self, expr, label, jump_if):
+        """Jump to `label` when `expr` evaluates to `jump_if`, fall through
+        otherwise. `&&` and `||` short-circuit into jumps instead of
+        producing a boolean register."""
+        if isinstance(expr, AST.BinExpr) and expr.op in ('&&', '||'):
+            if (expr.op == '&&') != jump_if:
+                # a false operand of && (true operand of ||) decides alone
+                self.emit_branch(expr.left, label, jump_if)
+                self.emit_branch(expr.right, label, jump_if)
+            else:
+                skip_label = self.get_next_label("SKIP")
+                self.emit_branch(expr.left, skip_label, not jump_if)
+                self.emit_branch(expr.right, label, jump_if)
+                self.emit_label(skip_label)
+        elif isinstance(expr, AST.BinExpr) and expr.op == '!=':
+            left_reg = self.visit_expression(expr.left)
+            right_reg = self.visit_expression(expr.right)
+            eq_reg = self.emit_pure("cmp=", left_reg, right_reg)
+            self.emit("jz" if jump_if else "jnz", eq_reg, label)
+        else:
+            cond_reg = self.visit_expression(expr)
+            self.emit("jnz" if jump_if else "jz", cond_reg, label)
+
     def visit_FunctionCall(self, node, symbol_table=None):
+        self.mark_line(node)
         if node.id == 'scan':
             result_reg = self.get_next_register()
             self.emit("call", "iget", result_reg)
@@ -238,33 +465,179 @@ class IRGenerator:
                 self.emit("call", "iput", arg_reg)
             return None
         else:
-            result_reg = self.get_next_register()
+            value = self.fold_call(node)
+            if value is not None:
+                return self.get_const_reg(str(value))
             args = []
             if node.args and hasattr(node.args, 'exprs'):
                 for arg_expr in node.args.exprs:
                     arg_reg = self.visit_expression(arg_expr)
                     args.append(arg_reg)
+            if node.id == 'length':
+                # a vector never changes size, so its length is a pure value
+                return self.emit_pure("call", node.id, *args)
+            callee = self.inline_candidate(node)
+            if callee is not None:
+                return self.inline_call(callee, args)
+            result_reg = self.get_next_register()
             self.emit("call", node.id, result_reg, *args)
             return result_reg
 
-    def visit_OperationOnList(self, node):
+    # --- partial evaluation --------------------------------------------------
+
+    def fold_call(self, node):
+        """The value of call `node` if the evaluator computes it at compile
+        time, else None. Each call is tried once and recorded in folds."""
+        if id(node) in self.folds:
+            return self.folds[id(node)]["value"]
+        evaluator = self.evaluator
+        if evaluator is None or (node.id not in evaluator.pure and node.id not in evaluator.reasons):
+            return None
+        exprs = node.args.exprs if node.args and hasattr(node.args, 'exprs') else []
+        args = [self.constant_value(e) for e in exprs]
+        if None in args:
+            return None
+        value, reason = evaluator.evaluate(node.id, args)
+        self.folds[id(node)] = {"function": self.current_function, "line": node.pos,
+                                "call": f"{node.id}({', '.join(map(str, args))})",
+                                "value": value, "reason": reason}
+        return value
+
+    def constant_value(self, expr):
+        """The int `expr` always evaluates to, if it is built from integer
+        literals, + - * / and calls that fold and every step stays within
+        64 bits; else None."""
+        if isinstance(expr, LexToken):
+            if expr.type != 'NUMBER':
+                return None
+            try:
+                return int64(int(expr.value))
+            except IRRuntimeError:
+                return None
+        if isinstance(expr, AST.BinExpr) and expr.op in CONSTANT_OPS:
+            left, right = self.constant_value(expr.left), self.constant_value(expr.right)
+            if left is None or right is None:
+                return None
+            try:
+                return int64(CONSTANT_OPS[expr.op](left, right))
+            except IRRuntimeError:
+                return None
+        if isinstance(expr, AST.FunctionCall):
+            return self.fold_call(expr)
+        return None
+
+    # --- profile-guided optimization -----------------------------------------
+
+    def profile_lookup(self, method, node, *args):
+        """Look `node` up in the profile by its line offset from the start of
+        the function being generated, and for an if-else or loop also by
+        its ordinal among those on the same line."""
+        function = self.functions.get(self.profile_function)
+        if (self.profile is None or function is None or not isinstance(getattr(node, 'pos', None), int)
+                or not isinstance(function.pos, int)):
+            return None
+        offset = node.pos - function.pos
+        if isinstance(node, AST.FunctionCall):
+            return getattr(self.profile, method)(self.profile_function, offset, *args)
+        return getattr(self.profile, method)(self.profile_function, offset, self.construct_ordinal(function, node))
+
+    def construct_ordinal(self, function, node):
+        """How many if-else statements (or loops, for a loop) come before
+        `node` on its line of `function`, in source order."""
+        if function.name not in self.ordinals:
+            ordinals, seen = {}, {}
+            for n in ast_nodes(function.body):
+                kind = profile_kind(n)
+                if kind:
+                    ordinals[id(n)] = seen.get((n.pos, kind), 0)
+                    seen[(n.pos, kind)] = ordinals[id(n)] + 1
+            self.ordinals[function.name] = ordinals
+        return self.ordinals[function.name].get(id(node), 0)
+
+    def inline_candidate(self, node):
+        """The FunctionDef to inline for call `node`, or None."""
+        callee = self.functions.get(node.id)
+        if (callee is None or node.id in ('main', self.current_function)
+                or node.id in self.memoize  # inlining would bypass the memo table
+                or any(node.id == name for name, _, _ in self.inline_stack)
+                or (self.profile_lookup('call_count', node, node.id) or 0) < PGO_HOT_COUNT):
+            return None
+        nodes = list(ast_nodes(callee.body))
+        if (sum(isinstance(n, STATEMENTS) for n in nodes) > PGO_INLINE_STATEMENTS
+                or any(isinstance(n, AST.FunctionCall) and n.id == node.id for n in nodes)):
+            return None
+        return callee
+
+    def inline_call(self, callee, arg_regs):
+        """Generate the body of `callee` in place of a call; its returns
+        move their value into the result register and jump past the body.
+        A body whose only return is its last statement needs neither."""
+        nodes = list(ast_nodes(callee.body))
+        returns = [n for n in nodes if isinstance(n, AST.ReturnInstruction)]
+        single_return = len(returns) == 1 and last_statement(callee.body) is returns[0]
+        result_reg = None if single_return else self.get_next_register()
+        end_label = None if single_return else self.get_next_label("INLINE")
+        outer = (self.symbol_table, self.variable_registers, self.loop_stack, self.profile_function)
+        self.symbol_table = self.symbol_table.get(callee.name).scope
+        self.variable_registers = {}
+        for param, arg_reg in zip(callee.fmlparams.parameters, arg_regs):
+            if any(assigned_name(n) == param.id for n in nodes):
+                # the callee changes its copy of the argument
+                param_reg = self.get_next_register()
+                self.emit("mov", param_reg, arg_reg)
+                arg_reg = param_reg
+            self.variable_registers[param.id] = arg_reg
+        self.loop_stack = []
+        self.profile_function = callee.name
+        frame = [callee.name, result_reg, end_label]
+        self.inline_stack.append(frame)
+        try:
+            if callee.body:
+                callee.body.accept(self)
+        finally:
+            self.inline_stack.pop()
+            self.symbol_table, self.variable_registers, self.loop_stack, self.profile_function = outer
+        if single_return:
+            return frame[1]
+        if self.code[-1] == f"jmp {end_label}":
+            # the body ends in a return: fall through to the continuation
+            self.code.pop()
+            self.lines.pop()
+        else:
+            self.emit("mov", result_reg, "0")
+        self.emit_label(end_label)
+        return result_reg
+
+    def emit_cold(self, label, statement, resume_label):
+        """Generate `statement` out of line: it starts at `label`, jumps back
+        to `resume_label` and is placed after the function's final ret."""
+        code, lines = self.code, self.lines
+        self.code, self.lines = [], []
+        try:
+            self.emit_label(label)
+            statement.accept(self)
+            self.emit("jmp", resume_label)
+            self.cold_blocks.append((self.code, self.lines))
+        finally:
+            self.code, self.lines = code, lines
+        self.reset_values()
+
+    def visit_element_address(self, node):
         base_reg = self.visit_expression(node.expr)
         index_reg = self.visit_expression(node.index_expr)
-        result_reg = self.get_next_register()
-        addr_reg = self.get_next_register()
-        temp_reg = self.get_next_register()
         word_bytes = self.get_const_reg(self.word_bytes_str)
-        self.emit("mul", temp_reg, index_reg, word_bytes)
-        self.emit("add", addr_reg, base_reg, temp_reg)
-        self.emit("ld", result_reg, addr_reg)
-        return result_reg
+        offset_reg = self.emit_pure("mul", index_reg, word_bytes)
+        return self.emit_pure("add", base_reg, offset_reg)
+
+    def visit_OperationOnList(self, node, symbol_table=None):
+        addr_reg = self.visit_element_address(node)
+        return self.emit_pure("ld", addr_reg)
 
-    def visit_TernaryExpr(self, node):
-        cond_reg = self.visit_expression(node.cond)
+    def visit_TernaryExpr(self, node, symbol_table=None):
         result_reg = self.get_next_register()
         false_label = self.get_next_label("FALSE")
         end_label = self.get_next_label("END")
-        self.emit("jz", cond_reg, false_label)
+        self.emit_branch(node.cond, false_label, False)
         true_reg = self.visit_expression(node.first_expr)
         self.emit("mov", result_reg, true_reg)
         self.emit("jmp", end_label)
@@ -274,22 +647,43 @@ class IRGenerator:
         self.emit_label(end_label)
         return result_reg
 
-    def visit_ExprList(self, node):
+    def visit_ExprList(self, node, symbol_table=None):
         result_reg = self.get_next_register()
         size = len(node.exprs)
         bytes_needed = size * int(self.word_bytes_str)
         self.emit("mov", result_reg, bytes_needed)
         self.emit("call", "mem", result_reg)
+        if not size:
+            return result_reg
+        if all(isinstance(e, LexToken) and e.type == 'NUMBER' for e in node.exprs):
+            # constant literal: one data block, copied in bulk at runtime
+            data_label = self.get_next_label("D")
+            self.data.append(f"data {data_label}, {', '.join(e.value for e in node.exprs)}")
+            self.emit("call", "dcopy", result_reg, data_label)
+            return result_reg
+        ptr_reg = self.get_next_register()
+        self.emit("mov", ptr_reg, result_reg)
         for i, expr in enumerate(node.exprs):
             expr_reg = self.visit_expression(expr)
-            offset_reg = self.get_next_register()
-            addr_reg = self.get_next_register()
-            self.emit("mov", offset_reg, str(i * int(self.word_bytes_str)))
-            self.emit("add", addr_reg, result_reg, offset_reg)
-            self.emit("st", expr_reg, addr_reg)
+            if i:
+                word_bytes = self.get_const_reg(self.word_bytes_str)
+                self.emit("add", ptr_reg, ptr_reg, word_bytes)
+            self.emit("st", expr_reg, ptr_reg)
         return result_reg
 
     def visit_ReturnInstruction(self, node, symbol_table=None):
+        self.mark_line(node)
+        if self.inline_stack:
+            frame = self.inline_stack[-1]
+            _, result_reg, end_label = frame
+            value_reg = self.visit_expression(node.expr) if node.expr else self.get_const_reg("0")
+            if end_label is None:
+                # the only return, at the end of the inlined body
+                frame[1] = value_reg
+                return
+            self.emit("mov", result_reg, value_reg)
+            self.emit("jmp", end_label)
+            return
         if node.expr and isinstance(node.expr, AST.BinExpr):
             left_reg = self.visit_expression(node.expr.left)
             right_reg = self.visit_expression(node.expr.right)
@@ -317,35 +711,79 @@ class IRGenerator:
         self.emit("ret")
 
     def visit_IfOrIfElseInstruction(self, node, symbol_table=None):
-        cond_reg = self.visit_expression(node.cond)
+        self.mark_line(node)
         if node.else_statement:
+            then_label = self.get_next_label("THEN")
             else_label = self.get_next_label("ELSE")
             end_label = self.get_next_label("ENDIF")
-            self.emit("jz", cond_reg, else_label)
+            arms = self.profile_lookup('arm_counts', node)
+            if arms and sum(arms) >= PGO_HOT_COUNT and arms[0] != arms[1]:
+                self.emit_if_else_by_profile(node, arms, then_label, else_label, end_label)
+                return
+            self.emit_branch(node.cond, else_label, False)
+            self.emit_label(then_label)
             node.if_statement.accept(self)
+            self.mark_line(node)
             self.emit("jmp", end_label)
             self.emit_label(else_label)
             node.else_statement.accept(self)
+            self.mark_line(node)
             self.emit_label(end_label)
         else:
             end_label = self.get_next_label("ENDIF")
-            self.emit("jz", cond_reg, end_label)
+            self.emit_branch(node.cond, end_label, False)
             node.if_statement.accept(self)
+            self.mark_line(node)
             self.emit_label(end_label)
 
-    def visit_WhileInstruction(self, node):
+    def emit_if_else_by_profile(self, node, arms, then_label, else_label, end_label):
+        """The hotter arm falls through from the condition and needs no jump
+        to the end; the colder one is moved out of line."""
+        if arms[0] > arms[1]:
+            self.emit_branch(node.cond, else_label, False)
+            self.emit_label(then_label)
+            node.if_statement.accept(self)
+            self.mark_line(node)
+            self.emit_cold(else_label, node.else_statement, end_label)
+        else:
+            self.emit_branch(node.cond, then_label, True)
+            self.emit_label(else_label)
+            node.else_statement.accept(self)
+            self.mark_line(node)
+            self.emit_cold(then_label, node.if_statement, end_label)
+        self.emit_label(end_label)
+
+    def hot_loop(self, node):
+        trips = self.profile_lookup('loop_counts', node)
+        return trips is not None and trips[1] >= PGO_HOT_COUNT
+
+    def visit_WhileInstruction(self, node, symbol_table=None):
         loop_label = self.get_next_label("WHILE")
+        body_label = self.get_next_label("BODY")
         end_label = self.get_next_label("ENDWHILE")
         self.loop_stack.append((loop_label, end_label))
-        self.emit_label(loop_label)
-        cond_reg = self.visit_expression(node.cond)
-        self.emit("jz", cond_reg, end_label)
-        node.while_statement.accept(self)
-        self.emit("jmp", loop_label)
+        self.mark_line(node)
+        if self.hot_loop(node):
+            # rotated: the condition is tested again at the bottom, which
+            # saves the jump back to the top on every iteration
+            self.emit_branch(node.cond, end_label, False)
+            self.emit_label(body_label)
+            node.while_statement.accept(self)
+            self.mark_line(node)
+            self.emit_label(loop_label)
+            self.emit_branch(node.cond, body_label, True)
+        else:
+            self.emit_label(loop_label)
+            self.emit_branch(node.cond, end_label, False)
+            self.emit_label(body_label)
+            node.while_statement.accept(self)
+            self.mark_line(node)
+            self.emit("jmp", loop_label)
         self.emit_label(end_label)
         self.loop_stack.pop()
 
     def visit_ForInstruction(self, node, symbol_table=None):
+        self.mark_line(node)
         loop_var_reg = self.get_next_register()
         start_reg = self.visit_expression(node.start_expr)
         end_reg = self.visit_expression(node.end_expr)
@@ -358,14 +796,18 @@ class IRGenerator:
         self.emit("mov", loop_var_reg, start_reg)
 
         loop_label = self.get_next_label("FOR")
+        body_label = self.get_next_label("BODY")
         end_label = self.get_next_label("ENDFOR")
         self.loop_stack.append((loop_label, end_label))
-        self.emit_label(loop_label)
+        rotate = self.hot_loop(node)
+        if not rotate:
+            self.emit_label(loop_label)
 
         cond_reg = self.get_next_register()
         # Stop when i >= end (non-inclusive upper bound)
         self.emit("cmp>=", cond_reg, loop_var_reg, end_reg)
         self.emit("jnz", cond_reg, end_label)
+        self.emit_label(body_label)
 
         if hasattr(node.for_statement, 'accept'):
             node.for_statement.accept(self)
@@ -374,9 +816,16 @@ class IRGenerator:
                 if hasattr(stmt, 'accept'):
                     stmt.accept(self)
 
+        self.mark_line(node)
         one = self.get_const_reg("1")
         self.emit("add", loop_var_reg, loop_var_reg, one)
-        self.emit("jmp", loop_label)
+        if rotate:
+            # continue re-tests without stepping, as in the unrotated loop
+            self.emit_label(loop_label)
+            self.emit("cmp>=", cond_reg, loop_var_reg, end_reg)
+            self.emit("jz", cond_reg, body_label)
+        else:
+            self.emit("jmp", loop_label)
         self.emit_label(end_label)
         self.loop_stack.pop()
 
@@ -393,3 +842,55 @@ class IRGenerator:
         if self.loop_stack:
             _, end_label = self.loop_stack[-1]
             self.emit("jmp", end_label)
+
+
+def ast_nodes(node):
+    """Every AST node in the subtree rooted at `node`, parents first.
+
+    Iterative: statement lists are chains of Body nodes, which nested
+    generators would walk in time quadratic in their length."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, AST.Node):
+            yield node
+            stack.extend(reversed([v for v in node.__dict__.values() if isinstance(v, (AST.Node, list))]))
+
+
+def profile_kind(node):
+    """Which profile table an if-else or loop node is counted in, else None."""
+    if isinstance(node, AST.IfOrIfElseInstruction) and node.else_statement:
+        return "if"
+    if isinstance(node, (AST.WhileInstruction, AST.ForInstruction)):
+        return "loop"
+    return None
+
+
+def assigned_name(node):
+    """Name of the variable that statement `node` assigns, if any."""
+    if isinstance(node, AST.Assignment):
+        return node.id if isinstance(node.id, str) else getattr(node.id, 'value', None)
+    if isinstance(node, (AST.ForInstruction, AST.VariableDecl)):
+        return node.id
+    return None
+
+
+def last_statement(node):
+    """The statement a function body ends with."""
+    while True:
+        if isinstance(node, AST.Body):
+            node = node.body if node.body else node.statement
+        elif isinstance(node, AST.Block):
+            node = node.body
+        else:
+            return node
+
+
+_parallel_job = None
+
+
+def _generate_nth(index):
+    generator, functions = _parallel_job
+    return generator.generate_function(functions[index])
@@ -0,0 +1,484 @@
+import ast
+import sys
+from array import array
+
+from Heap import Heap
+
+# Opcodes of the decoded instruction tuples (opcode, a, b, c).
+(MOV, MOVI, ADD, SUB, MUL, DIV, MOD,
+ CMP_LT, CMP_GT, CMP_LE, CMP_GE, CMP_EQ,
+ JZ, JNZ, JMP, CALL, RET, LD, ST,
+ IGET, IPUT, MEM, LENGTH, LIST, EXIT, DCOPY, MGET, MPUT,
+ JZ_STEPPED, JNZ_STEPPED, JMP_STEPPED,
+ COUNT, JZ_COUNTED, JNZ_COUNTED, CALL_COUNTED, RET_COUNTED) = range(36)
+
+ARITHMETIC = {
+    'add': ADD, 'sub': SUB, 'mul': MUL, 'div': DIV, 'mod': MOD,
+    'cmp<': CMP_LT, 'cmp>': CMP_GT, 'cmp<=': CMP_LE, 'cmp>=': CMP_GE, 'cmp=': CMP_EQ,
+}
+BUILTINS = {'iget', 'iput', 'mem', 'length', 'list', 'exit', 'dcopy', 'mget', 'mput'}
+# With max_steps, the jumps run as these, which check the step count.
+STEPPED = {JZ: JZ_STEPPED, JNZ: JNZ_STEPPED, JMP: JMP_STEPPED}
+# Profiler runs these instead, which also count (see Profiler.count_code).
+COUNTED = {JZ: JZ_COUNTED, JNZ: JNZ_COUNTED, CALL: CALL_COUNTED, RET: RET_COUNTED}
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+WORD_BYTES = 8
+# Results a memo table holds before it is emptied (see MemoTable).
+MEMO_ENTRIES = 1 << 16
+
+
+class IRRuntimeError(Exception):
+    pass
+
+
+class StepLimitExceeded(IRRuntimeError):
+    pass
+
+
+class ProgramExit(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class MemoTable(object):
+    """Results of a memoized proc by argument tuple (IRGenerator.generate
+    with memoize=...). `call mget, rH, proc, args...` sets rH to 1 and r0
+    to the result if the table holds `args`, else rH to 0; `call mput,
+    r0, proc, args...` stores r0. A full table is emptied rather than
+    grown, which bounds its memory and keeps every put O(1)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, key, value):
+        if len(self.results) >= MEMO_ENTRIES:
+            self.results.clear()
+        self.results[key] = value
+
+    def stats(self):
+        calls = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.results),
+                "hit_rate": self.hits / calls if calls else 0.0}
+
+
+def memo_tables(procs):
+    """A MemoTable for every proc name that an mget or mput of `procs`
+    (DecodedProcs) names."""
+    return {b: MemoTable(b) for proc in procs.values() for op, a, b, c in proc.code if op in (MGET, MPUT)}
+
+
+class IRProc(object):
+    def __init__(self, name, line=None):
+        self.name = name
+        self.line = line        # IR text line number of the proc header
+        self.instructions = []  # (op, operands) as written in the IR text
+        self.labels = {}        # label -> index of the next instruction
+        self.lines = []         # IR text line number of each instruction
+        self.label_lines = {}   # label -> IR text line number
+
+
+class IRProgram(object):
+    def __init__(self):
+        self.procs = {}
+        self.data = {}
+
+
+def split_operands(op, rest):
+    if not rest:
+        return []
+    if op == 'mov':
+        # the source may be a string literal containing ", "
+        dst, _, src = rest.partition(', ')
+        return [dst, src]
+    return rest.split(', ')
+
+
+def parse_ir(text):
+    """Parse the IR text produced by IRGenerator.generate into an IRProgram."""
+    program = IRProgram()
+    proc = None
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('proc '):
+            proc = IRProc(line[5:].strip(), lineno)
+            program.procs[proc.name] = proc
+            continue
+        op, _, rest = line.partition(' ')
+        operands = split_operands(op, rest.strip())
+        if op == 'data':
+            program.data[operands[0]] = [int(v) for v in operands[1:]]
+        elif proc is None:
+            raise IRRuntimeError(f"IR line {lineno}: '{line}' outside of a proc")
+        elif line.endswith(':') and not operands:
+            proc.labels[line[:-1]] = len(proc.instructions)
+            proc.label_lines[line[:-1]] = lineno
+        else:
+            proc.instructions.append((op, operands))
+            proc.lines.append(lineno)
+    return program
+
+
+def is_register(operand):
+    return operand[:1] == 'r' and operand[1:].isdigit()
+
+
+def register_index(operand):
+    if not is_register(operand):
+        raise IRRuntimeError(f"expected a register, got '{operand}'")
+    return int(operand[1:])
+
+
+def parse_immediate(operand):
+    try:
+        return int(operand)
+    except ValueError:
+        pass
+    # strings: IRGenerator wraps the quoted token value in another pair of quotes
+    text = operand
+    while len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+        try:
+            text = ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            text = text[1:-1]
+    return text
+
+
+class DecodedProc(object):
+    def __init__(self, name, code, nregs):
+        self.name = name
+        self.code = code
+        self.nregs = nregs
+
+
+def decode_program(program):
+    """Pre-decode every proc into (opcode, a, b, c) integer tuples with
+    registers as indices, labels as instruction indices and callees as
+    DecodedProc references."""
+    decoded = {name: DecodedProc(name, [], 1) for name in program.procs}
+    data_blocks = list(program.data.values())
+    data_index = {label: i for i, label in enumerate(program.data)}
+    for name, proc in program.procs.items():
+        target = decoded[name]
+        nregs = 1
+        for op, operands in proc.instructions:
+            regs = [register_index(o) for o in operands if is_register(o)]
+            if regs:
+                nregs = max(nregs, max(regs) + 1)
+            target.code.append(decode_instruction(op, operands, proc, decoded, data_index))
+        target.code.append((RET, 0, 0, 0))  # falling off the end returns r0
+        target.nregs = max(target.nregs, nregs)
+    return decoded, data_blocks
+
+
+def decode_instruction(op, operands, proc, decoded, data_index):
+    if op == 'mov':
+        dst, src = operands
+        if is_register(src):
+            return MOV, register_index(dst), register_index(src), 0
+        return MOVI, register_index(dst), parse_immediate(src), 0
+    if op in ARITHMETIC:
+        dst, left, right = (register_index(o) for o in operands)
+        return ARITHMETIC[op], dst, left, right
+    if op in ('jz', 'jnz'):
+        return (JZ if op == 'jz' else JNZ), register_index(operands[0]), resolve_label(proc, operands[1]), 0
+    if op == 'jmp':
+        return JMP, resolve_label(proc, operands[0]), 0, 0
+    if op == 'ret':
+        return RET, 0, 0, 0
+    if op == 'ld':
+        return LD, register_index(operands[0]), register_index(operands[1]), 0
+    if op == 'st':
+        return ST, register_index(operands[0]), register_index(operands[1]), 0
+    if op == 'call':
+        return decode_call(operands, decoded, data_index)
+    raise IRRuntimeError(f"unknown IR instruction '{op}'")
+
+
+def decode_call(operands, decoded, data_index):
+    callee, args = operands[0], operands[1:]
+    if callee == 'iget':
+        return IGET, register_index(args[0]), 0, 0
+    if callee == 'iput':
+        return IPUT, register_index(args[0]), 0, 0
+    if callee == 'mem':
+        return MEM, register_index(args[0]), 0, 0
+    if callee == 'length':
+        return LENGTH, register_index(args[0]), register_index(args[1]), 0
+    if callee == 'list':
+        return LIST, register_index(args[0]), register_index(args[1]), 0
+    if callee == 'exit':
+        return EXIT, register_index(args[-1]), 0, 0
+    if callee == 'dcopy':
+        return DCOPY, register_index(args[0]), data_index[args[1]], 0
+    if callee in ('mget', 'mput'):
+        # the memo table goes by the name of the memoized proc
+        op = MGET if callee == 'mget' else MPUT
+        return op, register_index(args[0]), args[1], tuple(register_index(a) for a in args[2:])
+    if callee not in decoded:
+        raise IRRuntimeError(f"call to undefined proc '{callee}'")
+    # parameters the callee never reads still need a register to land in
+    decoded[callee].nregs = max(decoded[callee].nregs, len(args))
+    return CALL, register_index(args[0]), decoded[callee], tuple(register_index(a) for a in args[1:])
+
+
+def resolve_label(proc, label):
+    if label not in proc.labels:
+        raise IRRuntimeError(f"proc '{proc.name}': undefined label '{label}'")
+    return proc.labels[label]
+
+
+def c_div(x, y):
+    if y == 0:
+        raise IRRuntimeError("division by zero")
+    q = abs(x) // abs(y)
+    return q if (x < 0) == (y < 0) else -q
+
+
+def c_mod(x, y):
+    return x - y * c_div(x, y)
+
+
+def int64(value):
+    if not INT64_MIN <= value <= INT64_MAX:
+        raise IRRuntimeError("integer overflow")
+    return value
+
+
+class IRInterpreter(object):
+    """Executes the IR text returned by IRGenerator.generate, or a
+    Bytecode.Module already decoded from a .tslb file.
+
+    Vectors live in a Heap; with check_bounds=True every ld/st must fall
+    inside a live vector instead of just inside the heap. Registers hold
+    64-bit integers: an add, sub, mul or div whose result does not fit is
+    an "integer overflow" runtime error.
+
+    With `max_steps` a call of execute that runs more instructions raises
+    StepLimitExceeded (checked at taken jumps and at calls, which every
+    loop and recursion goes through). The jumps then run as the variants
+    in STEPPED, so that without it the dispatch loop does no extra work.
+    Profiler likewise sets `counting` and swaps in the COUNTED opcodes and
+    a COUNT before every instruction; see there for the enter and leave
+    hooks they call."""
+
+    counting = False
+
+    def __init__(self, ir_text, stdin=None, stdout=None, check_bounds=False, max_steps=None):
+        if isinstance(ir_text, str):
+            self.program = parse_ir(ir_text)
+            self.procs, data = decode_program(self.program)
+        else:
+            # a loaded module carries no IR text, so no line information
+            self.program = None
+            self.procs, data = ir_text.procs, ir_text.data
+        self.data = [array('q', block) for block in data]
+        self.check_bounds = check_bounds
+        self.max_steps = max_steps
+        if max_steps is not None:
+            for proc in self.procs.values():
+                proc.code[:] = [(STEPPED.get(op, op), a, b, c) for op, a, b, c in proc.code]
+        self.stdin = iter(stdin) if stdin is not None else None
+        self.stdout = stdout if stdout is not None else sys.stdout
+        self.steps = 0
+        self.memo = memo_tables(self.procs)
+        self.reset_memory()
+
+    # --- runtime support -----------------------------------------------------
+
+    def reset_memory(self):
+        self.heap = Heap(check_bounds=self.check_bounds)
+
+    def read_int(self):
+        if self.stdin is None:
+            self.stdin = iter(sys.stdin.read().split())
+        try:
+            return int(next(self.stdin))
+        except StopIteration:
+            raise IRRuntimeError("iget: end of input")
+
+    def write(self, value):
+        self.stdout.write(f"{value}\n")
+
+    def memo_stats(self):
+        """Hits, misses, entries and hit rate of every memo table, by proc."""
+        return {name: table.stats() for name, table in self.memo.items()}
+
+    # --- execution -----------------------------------------------------------
+
+    def run(self, entry='main'):
+        """Run `entry` and return its r0 (or the code passed to exit)."""
+        if entry not in self.procs:
+            raise IRRuntimeError(f"no proc '{entry}' to run")
+        try:
+            return self.execute(self.procs[entry])
+        except ProgramExit as e:
+            return e.code
+
+    def execute(self, proc, args=()):
+        heap = self.heap
+        memory = heap.view
+        memo = self.memo
+        code = proc.code
+        regs = [0] * max(proc.nregs, len(args) + 1)
+        regs[1:len(args) + 1] = args
+        max_steps = self.max_steps if self.max_steps is not None else sys.maxsize
+        # bit_length() > 63 is the cheap test for leaving the 64-bit range;
+        # it also holds for INT64_MIN itself, which is in range
+        low, high = INT64_MIN, INT64_MAX
+        pc = 0
+        steps = 0
+        stack = []
+        counts = taken = None
+        if self.counting:
+            counts, taken = self.enter(proc, 0)
+        try:
+            while True:
+                op, a, b, c = code[pc]
+                pc += 1
+                steps += 1
+                if op == MOV:
+                    regs[a] = regs[b]
+                elif op == MOVI:
+                    regs[a] = b
+                elif op == ADD:
+                    regs[a] = value = regs[b] + regs[c]
+                    if value.bit_length() > 63 and value != low:
+                        raise IRRuntimeError("integer overflow")
+                elif op == JZ:
+                    if not regs[a]:
+                        pc = b
+                elif op == JNZ:
+                    if regs[a]:
+                        pc = b
+                elif op == JMP:
+                    pc = a
+                elif op == LD:
+                    regs[a] = memory[regs[b] >> 3]
+                elif op == ST:
+                    memory[regs[b] >> 3] = regs[a]
+                elif op == SUB:
+                    regs[a] = value = regs[b] - regs[c]
+                    if value.bit_length() > 63 and value != low:
+                        raise IRRuntimeError("integer overflow")
+                elif op == MUL:
+                    regs[a] = value = regs[b] * regs[c]
+                    if value.bit_length() > 63 and value != low:
+                        raise IRRuntimeError("integer overflow")
+                elif op == CMP_LT:
+                    regs[a] = 1 if regs[b] < regs[c] else 0
+                elif op == CMP_GT:
+                    regs[a] = 1 if regs[b] > regs[c] else 0
+                elif op == CMP_LE:
+                    regs[a] = 1 if regs[b] <= regs[c] else 0
+                elif op == CMP_GE:
+                    regs[a] = 1 if regs[b] >= regs[c] else 0
+                elif op == CMP_EQ:
+                    regs[a] = 1 if regs[b] == regs[c] else 0
+                elif op == CALL:
+                    if steps > max_steps:
+                        raise StepLimitExceeded(f"step limit of {max_steps} exceeded")
+                    stack.append((code, regs, pc, a))
+                    callee_regs = [0] * b.nregs
+                    for i, arg in enumerate(c, 1):
+                        callee_regs[i] = regs[arg]
+                    code, regs, pc = b.code, callee_regs, 0
+                elif op == RET:
+                    if not stack:
+                        return regs[0]
+                    result = regs[0]
+                    code, regs, pc, dst = stack.pop()
+                    regs[dst] = result
+                elif op == DIV:
+                    # only INT64_MIN / -1 leaves the range
+                    regs[a] = value = c_div(regs[b], regs[c])
+                    if value > high:
+                        raise IRRuntimeError("integer overflow")
+                elif op == MOD:
+                    regs[a] = c_mod(regs[b], regs[c])
+                elif op == IGET:
+                    regs[a] = self.read_int()
+                elif op == IPUT:
+                    self.write(regs[a])
+                elif op == MEM:
+                    regs[a] = heap.allocate(regs[a])
+                    memory = heap.view
+                elif op == LIST:
+                    regs[a] = heap.allocate(regs[b] * WORD_BYTES)
+                    memory = heap.view
+                elif op == LENGTH:
+                    regs[a] = heap.length(regs[b])
+                elif op == DCOPY:
+                    heap.copy(regs[a], self.data[b])
+                elif op == EXIT:
+                    raise ProgramExit(regs[a])
+                elif op == MGET:
+                    table = memo[b]
+                    result = table.results.get(tuple([regs[r] for r in c]))
+                    if result is None:
+                        table.misses += 1
+                        regs[a] = 0
+                    else:
+                        table.hits += 1
+                        regs[0] = result
+                        regs[a] = 1
+                elif op == MPUT:
+                    memo[b].put(tuple([regs[r] for r in c]), regs[a])
+                elif op == JZ_STEPPED:
+                    if not regs[a]:
+                        if steps > max_steps:
+                            raise StepLimitExceeded(f"step limit of {max_steps} exceeded")
+                        pc = b
+                elif op == JNZ_STEPPED:
+                    if regs[a]:
+                        if steps > max_steps:
+                            raise StepLimitExceeded(f"step limit of {max_steps} exceeded")
+                        pc = b
+                elif op == JMP_STEPPED:
+                    if steps > max_steps:
+                        raise StepLimitExceeded(f"step limit of {max_steps} exceeded")
+                    pc = a
+                elif op == COUNT:
+                    # a is the index of the next instruction in the IR, and
+                    # COUNT is not one of its instructions
+                    counts[a] += 1
+                    steps -= 1
+                elif op == JZ_COUNTED:
+                    if not regs[a]:
+                        taken[c] += 1
+                        pc = b
+                elif op == JNZ_COUNTED:
+                    if regs[a]:
+                        taken[c] += 1
+                        pc = b
+                elif op == CALL_COUNTED:
+                    stack.append((code, regs, pc, a))
+                    callee_regs = [0] * b.nregs
+                    for i, arg in enumerate(c, 1):
+                        callee_regs[i] = regs[arg]
+                    code, regs, pc = b.code, callee_regs, 0
+                    counts, taken = self.enter(b, steps)
+                elif op == RET_COUNTED:
+                    if not stack:
+                        return regs[0]
+                    result = regs[0]
+                    code, regs, pc, dst = stack.pop()
+                    regs[dst] = result
+                    counts, taken = self.leave(steps)
+        except IndexError as e:
+            raise IRRuntimeError(f"invalid memory access at instruction {pc - 1}: {e}")
+        except (TypeError, ValueError) as e:
+            # only 64-bit integers fit in a vector word
+            raise IRRuntimeError(f"invalid operand at instruction {pc - 1}: {e}")
+        finally:
+            self.steps += steps
+
+
+def run_ir(ir_text, stdin=None, stdout=None, entry='main'):
+    interpreter = IRInterpreter(ir_text, stdin=stdin, stdout=stdout)
+    return interpreter.run(entry)
@@ -0,0 +1,130 @@
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from IRGenerator import ast_nodes
+from IRInterpreter import parse_ir, decode_program
+
+VERSION = 1
+
+
+class Instrumentation(object):
+    """Wall time, CPU time, peak traced memory and counts for each phase of
+    a compilation.
+
+    Wrap each phase in `with instrumentation.phase(name):` and attach
+    counts with count(). Hooks added with add_hook() are called as
+    hook(event, name, record) with event "start" (record is None) or
+    "end". With trace_memory, tracemalloc runs for the whole compilation
+    and every record carries the peak bytes allocated during its phase.
+    tracemalloc slows Python code down noticeably, so the wall and CPU
+    times of a memory-traced run are inflated.
+
+    A disabled instance measures and counts nothing, so the pipeline can
+    be instrumented unconditionally."""
+
+    def __init__(self, trace_memory=False, enabled=True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.phases = []
+        self.functions = {}
+        self.hooks = []
+        self.current = None
+        self.started_tracing = False
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def emit(self, event, name, record=None):
+        for hook in self.hooks:
+            hook(event, name, record)
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield None
+            return
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        record = {"name": name, "counts": {}}
+        outer, self.current = self.current, record
+        self.emit("start", name)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall
+            record["cpu_seconds"] = time.process_time() - cpu
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record["peak_bytes"] = peak - base
+                record["retained_bytes"] = current - base
+            self.current = outer
+            self.phases.append(record)
+            self.emit("end", name, record)
+
+    def count(self, name, value):
+        """Attach a count to the phase being measured, or else to the one
+        that finished last (so counting does not add to its time)."""
+        record = self.current or (self.phases[-1] if self.phases else None)
+        if record is not None:
+            record["counts"][name] = value
+
+    def count_tokens(self, tokens):
+        if self.enabled:
+            self.count("tokens", len(tokens))
+
+    def count_ast(self, ast):
+        if self.enabled and ast is not None:
+            self.count("ast_nodes", sum(1 for _ in ast_nodes(ast)))
+
+    def count_symbols(self, symbol_table):
+        if not self.enabled or symbol_table is None:
+            return
+        scopes = [symbol_table] + [s.scope for s in symbol_table.table.values() if getattr(s, "scope", None)]
+        self.count("symbols", sum(len(scope.table) for scope in scopes))
+
+    def count_ir(self, ir_text):
+        """IR instructions and registers of every proc in `ir_text`."""
+        if not self.enabled or not ir_text:
+            return
+        procs, _ = decode_program(parse_ir(ir_text))
+        # decode_program appends a ret to every proc
+        functions = {name: {"instructions": len(proc.code) - 1, "registers": proc.nregs}
+                     for name, proc in procs.items()}
+        self.functions.update(functions)
+        self.count("ir_instructions", sum(f["instructions"] for f in functions.values()))
+        self.count("functions", len(functions))
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def to_dict(self, **metadata):
+        totals = {"wall_seconds": sum(p["wall_seconds"] for p in self.phases),
+                  "cpu_seconds": sum(p["cpu_seconds"] for p in self.phases)}
+        if self.trace_memory:
+            totals["peak_bytes"] = max((p["peak_bytes"] for p in self.phases), default=0)
+        return dict(version=VERSION, **metadata,
+                    python=platform.python_version(), trace_memory=self.trace_memory,
+                    phases=self.phases, totals=totals, functions=self.functions)
+
+    def save(self, path, stream=None, **metadata):
+        """Write the JSON record to `path` ("-" for `stream`, by default
+        standard output)."""
+        text = json.dumps(self.to_dict(**metadata), indent=1) + "\n"
+        if path == "-":
+            (stream or sys.stdout).write(text)
+        else:
+            with open(path, "w") as f:
+                f.write(text)
+        return path
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import time
+
+import AST
+import SymbolTable
+from Batch import collect_sources
+from CallGraph import program_functions
+from Diagnostics import Diagnostics
+from IRGenerator import ast_nodes
+
+OBJECT_SUFFIX = ".tso"
+PROGRAM_NAME = "program.ir"
+VERSION = 1
+
+
+def signature(symbol):
+    """(return type, parameter types) of a FunctionSymbol; parameter names
+    do not take part in linking."""
+    return str(symbol.rettype), tuple(p.type for p in symbol.params.parameters)
+
+
+def format_signature(name, sig):
+    rettype, params = sig
+    return f"{name}({', '.join(params)}) <{rettype}>"
+
+
+class ObjectFile(object):
+    """The compiled form of one source file: the signatures of the
+    functions it defines (exports) and calls from other files (imports),
+    and its IR, split into data lines and procs. Data names and labels
+    carry their function's name, so the IR of objects whose function
+    names do not clash can simply be concatenated."""
+
+    def __init__(self, source, source_hash, exports, imports, data, code):
+        self.source = source
+        self.source_hash = source_hash
+        self.exports = exports        # name -> (rettype, [[type, id], ...])
+        self.imports = imports        # name -> (rettype, (types, ...))
+        self.data = data
+        self.code = code
+
+    @classmethod
+    def from_result(cls, source, source_hash, result, externals=None):
+        """The object of a successful Compiler result; calls to functions
+        found in `externals` (a SymbolTable) become imports."""
+        functions = program_functions(result.ast)
+        local = {f.name for f in functions}
+        exports = {f.name: (str(f.rettype), [[p.type, p.id] for p in f.fmlparams.parameters]) for f in functions}
+        imports = {}
+        if externals is not None:
+            for function in functions:
+                for node in ast_nodes(function.body):
+                    if (isinstance(node, AST.FunctionCall) and node.id not in local
+                            and node.id not in SymbolTable.builtin_method and node.id not in imports):
+                        symbol = externals.get(node.id)
+                        if isinstance(symbol, SymbolTable.FunctionSymbol):
+                            imports[node.id] = signature(symbol)
+        lines = result.ir.splitlines()
+        data = [line for line in lines if line.startswith("data ")]
+        code = [line for line in lines if line and not line.startswith("data ")]
+        return cls(source, source_hash, exports, imports, data, code)
+
+    def export_signature(self, name):
+        rettype, params = self.exports[name]
+        return rettype, tuple(t for t, _ in params)
+
+    def export_symbols(self):
+        for name, (rettype, params) in self.exports.items():
+            parameters = AST.ParametersList([AST.Parameter(t, i) for t, i in params])
+            yield SymbolTable.FunctionSymbol(rettype, name, parameters)
+
+    def to_dict(self):
+        return {"version": VERSION, "source": self.source, "hash": self.source_hash,
+                "exports": self.exports, "imports": {n: [r, list(p)] for n, (r, p) in self.imports.items()},
+                "data": self.data, "code": self.code}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        """The object stored at `path`, or None if it is missing, corrupt or
+        of another version."""
+        try:
+            with open(path) as f:
+                d = json.load(f)
+            if d.get("version") != VERSION:
+                return None
+            imports = {n: (r, tuple(p)) for n, (r, p) in d["imports"].items()}
+            exports = {n: (r, [list(p) for p in params]) for n, (r, params) in d["exports"].items()}
+            return cls(d["source"], d["hash"], exports, imports, d["data"], d["code"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+def link(objects, diagnostics=None):
+    """Resolve the calls between `objects` and return the IR of the whole
+    program, or None when linking failed. Every function must be defined
+    once, main included, and every import must match the signature of
+    its definition. Problems are reported to `diagnostics` (phase "link").
+    Linking is linear in the total number of functions and IR lines."""
+    diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+    errors = len(diagnostics)
+    owners = {}
+    for obj in objects:
+        for name in obj.exports:
+            if name in owners:
+                diagnostics.report("link", "duplicate-function",
+                                   f"function '{name}' is defined in both {owners[name].source} and {obj.source}")
+            else:
+                owners[name] = obj
+    for obj in objects:
+        for name, sig in obj.imports.items():
+            owner = owners.get(name)
+            if owner is None:
+                diagnostics.report("link", "undefined-function",
+                                   f"{obj.source}: function '{name}' is not defined in any file")
+            elif owner.export_signature(name) != sig:
+                diagnostics.report("link", "signature-mismatch",
+                                   f"{obj.source}: calls {format_signature(name, sig)} but {owner.source} "
+                                   f"defines {format_signature(name, owner.export_signature(name))}")
+    if "main" not in owners:
+        diagnostics.report("link", "missing-main", "no file defines main")
+    if len(diagnostics) > errors:
+        return None
+    lines = [line for obj in objects for line in obj.data]
+    lines += [line for obj in objects for line in obj.code]
+    return '\n'.join(lines) + '\n'
+
+
+class Build(object):
+    """Incremental multi-file build into `out_dir`.
+
+    Every source file is compiled to OUT_DIR/<name>.tso and the objects
+    are linked into OUT_DIR/program.ir. A file is recompiled only when its
+    content changed or when a function it calls from another file changed
+    signature or disappeared; every other file is taken from its object.
+    The functions of all files are visible to each other."""
+
+    def __init__(self, out_dir, compiler=None):
+        if compiler is None:
+            from Compiler import Compiler
+            compiler = Compiler()
+        self.out_dir = out_dir
+        self.compiler = compiler
+
+    def object_path(self, root, path):
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+        return os.path.join(self.out_dir, os.path.splitext(relative)[0] + OBJECT_SUFFIX)
+
+    def run(self, sources):
+        """Build the files named by `sources` (see Batch.collect_sources).
+        Returns the summary: the files compiled and up to date, the
+        diagnostics as (file, phase, message), the program IR (None on
+        failure) and the compile and link times."""
+        root, paths = collect_sources(sources)
+        start = time.perf_counter()
+        texts, digests, objects = {}, {}, {}
+        for path in paths:
+            with open(path) as f:
+                texts[path] = f.read()
+            digests[path] = hashlib.sha256(texts[path].encode()).hexdigest()
+            cached = ObjectFile.load(self.object_path(root, path))
+            if cached is not None and cached.source_hash == digests[path] and cached.source == path:
+                objects[path] = cached
+
+        # parse the changed files first: their functions are needed to
+        # check every file that is recompiled
+        parsed = {path: self.compiler.parse(texts[path]) for path in paths if path not in objects}
+        externals = SymbolTable.SymbolTable(None, None)
+        for path in paths:
+            if path in objects:
+                symbols = objects[path].export_symbols()
+            else:
+                symbols = (SymbolTable.FunctionSymbol(f.rettype, f.name, f.fmlparams)
+                           for f in program_functions(parsed[path].ast))
+            for symbol in symbols:
+                externals.put(symbol)
+        for path, obj in list(objects.items()):
+            if any(not isinstance(externals.get(name), SymbolTable.FunctionSymbol)
+                   or signature(externals.get(name)) != sig for name, sig in obj.imports.items()):
+                del objects[path]
+                parsed[path] = self.compiler.parse(texts[path])
+
+        diagnostics = []
+        for path in paths:
+            if path not in parsed:
+                continue
+            result = self.compiler.finish(parsed[path], externals=externals)
+            object_path = self.object_path(root, path)
+            if result.ok:
+                objects[path] = ObjectFile.from_result(path, digests[path], result, externals)
+                objects[path].save(object_path)
+            else:
+                diagnostics += [(path, phase, message) for phase, message in result.errors()]
+                if os.path.exists(object_path):
+                    os.remove(object_path)
+        compile_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ir_text = None
+        program_path = os.path.join(self.out_dir, PROGRAM_NAME)
+        if not diagnostics:
+            link_diagnostics = Diagnostics()
+            ir_text = link([objects[path] for path in paths], link_diagnostics)
+            diagnostics += [("", d.phase, str(d)) for d in link_diagnostics]
+        if ir_text is not None:
+            os.makedirs(self.out_dir, exist_ok=True)
+            with open(program_path, "w") as f:
+                f.write(ir_text)
+        elif os.path.exists(program_path):
+            os.remove(program_path)
+        return {
+            "files": len(paths),
+            "compiled": [path for path in paths if path in parsed],
+            "up_to_date": [path for path in paths if path not in parsed],
+            "diagnostics": diagnostics,
+            "ir": ir_text,
+            "program": program_path if ir_text is not None else None,
+            "compile_seconds": compile_seconds,
+            "link_seconds": time.perf_counter() - start,
+        }
@@ -0,0 +1,38 @@
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+
+class PDFReport(FPDF):
+    def __init__(self):
+        super().__init__()
+        self.add_font("DejaVu", "", "fonts/DejaVuSansMono.ttf")
+        self.set_font("DejaVu", "", 10)
+
+    def header(self):
+        self.set_font("DejaVu", "", 14)
+        self.cell(0, 10, "TSLANG Compilation Report", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        self.ln(5)
+
+    def section_title(self, title):
+        self.set_font("DejaVu", "", 12)
+        self.set_text_color(30, 30, 120)
+        self.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.set_text_color(0, 0, 0)
+
+    def add_code_block(self, code):
+        self.set_font("DejaVu", "", 10)
+        self.multi_cell(0, 6, code)
+        self.ln(2)
+
+    def add_table(self, headers, rows):
+        self.set_font("DejaVu", "", 9)
+        col_widths = [25] * len(headers)
+        for i, header in enumerate(headers):
+            self.set_fill_color(220, 220, 220)
+            self.cell(col_widths[i], 8, header, border=1, align="C", fill=True)
+        self.ln()
+        for row in rows:
+            for i, item in enumerate(row):
+                self.cell(col_widths[i], 6, str(item), border=1)
+            self.ln()
+        self.ln(3)
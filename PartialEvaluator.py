@@ -0,0 +1,103 @@
+import copy
+import time
+
+from CallGraph import program_functions
+from IRGenerator import IRGenerator
+from IRInterpreter import (
+    IRInterpreter, IRRuntimeError, StepLimitExceeded, INT64_MIN, INT64_MAX,
+    MOV, MOVI, ADD, SUB, MUL, DIV, MOD, CMP_LT, CMP_GT, CMP_LE, CMP_GE, CMP_EQ,
+    CALL, RET, JZ_STEPPED, JNZ_STEPPED, JMP_STEPPED,
+)
+from Profiler import OPCODE_NAMES
+
+# Default budgets: IR instructions one folded call may run, and the time
+# all the calls folded in one compilation may take together. There is no
+# default time budget: what it refuses depends on the machine and its
+# load, so the same source would not always compile to the same IR.
+FOLD_STEPS = 10000
+FOLD_SECONDS = None
+# What a folded call may run: register, jump and call instructions, with
+# the jumps counting steps (IRInterpreter max_steps).
+FOLDABLE = {MOV, MOVI, ADD, SUB, MUL, DIV, MOD, CMP_LT, CMP_GT, CMP_LE, CMP_GE, CMP_EQ,
+            CALL, RET, JZ_STEPPED, JNZ_STEPPED, JMP_STEPPED}
+
+
+class PartialEvaluator(object):
+    """Runs calls of pure functions (see Purity) with constant arguments
+    at compile time so that IRGenerator can replace them with their value.
+
+    The pure functions get IR of their own on first use, generated with a
+    copy of the symbol table so that the registers IRGenerator assigns to
+    the symbols of the program being compiled stay as they are. It runs
+    on an IRInterpreter with max_steps, and only when the function and
+    everything it calls use FOLDABLE instructions: any builtin (I/O,
+    vectors) is refused instead of run. A call is refused, and stays a
+    runtime call, when it runs more than `max_steps` IR instructions,
+    fails at run time (division by zero, integer overflow), or, if
+    `max_seconds` is set, when folding has spent that long in this
+    compilation. Calls of the functions in `reasons` (Purity.reasons:
+    impure function -> why) are refused without running them."""
+
+    def __init__(self, ast, symbol_table, pure, reasons=None, max_steps=FOLD_STEPS, max_seconds=FOLD_SECONDS):
+        self.ast = ast
+        self.symbol_table = symbol_table
+        self.pure = set(pure)
+        self.reasons = reasons or {}
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.spent = 0.0
+        self.interpreter = None
+        self.refusals = {}  # proc name -> why it can never be folded, or None
+        self.results = {}  # (name, args) -> (value, None) or (None, reason)
+
+    def evaluate(self, name, args):
+        """(value, None) of name(*args), or (None, why it was refused)."""
+        if name in self.reasons:
+            return None, f"not pure: {self.reasons[name]}"
+        if any(not INT64_MIN <= arg <= INT64_MAX for arg in args):
+            return None, "argument is not a 64-bit int"
+        key = (name, tuple(args))
+        if key not in self.results:
+            self.results[key] = self.run(name, args)
+        return self.results[key]
+
+    def run(self, name, args):
+        if self.max_seconds is not None and self.spent >= self.max_seconds:
+            return None, f"time budget of {self.max_seconds * 1000:g} ms spent"
+        if self.interpreter is None:
+            skip = [f.name for f in program_functions(self.ast) if f.name not in self.pure]
+            ir_text = IRGenerator().generate(self.ast, copy.deepcopy(self.symbol_table), skip=skip)
+            self.interpreter = IRInterpreter(ir_text, stdin=[], max_steps=self.max_steps)
+        proc = self.interpreter.procs[name]
+        reason = self.refusal(proc)
+        if reason:
+            return None, reason
+        start = time.perf_counter()
+        try:
+            value = self.interpreter.execute(proc, args)
+        except StepLimitExceeded:
+            return None, f"step budget of {self.max_steps} spent"
+        except IRRuntimeError as e:
+            return None, f"runtime error: {e}"
+        finally:
+            self.spent += time.perf_counter() - start
+        if not isinstance(value, int) or not INT64_MIN <= value <= INT64_MAX:
+            return None, "result is not a 64-bit int"
+        return value, None
+
+    def refusal(self, proc):
+        """Why `proc` cannot run at compile time: the first instruction of
+        it or of a proc it calls that is not FOLDABLE. None if it can."""
+        if proc.name not in self.refusals:
+            reason = None
+            seen, stack = {proc.name}, [proc]
+            while stack and reason is None:
+                for op, a, b, c in stack.pop().code:
+                    if op not in FOLDABLE:
+                        reason = f"'{OPCODE_NAMES[op]}' is not run at compile time"
+                        break
+                    if op == CALL and b.name not in seen:
+                        seen.add(b.name)
+                        stack.append(b)
+            self.refusals[proc.name] = reason
+        return self.refusals[proc.name]
@@ -0,0 +1,303 @@
+import json
+import re
+
+from IRInterpreter import (
+    IRInterpreter,
+    MOV, MOVI, ADD, SUB, MUL, DIV, MOD, CMP_LT, CMP_GT, CMP_LE, CMP_GE, CMP_EQ,
+    JZ, JNZ, JMP, CALL, RET, LD, ST, IGET, IPUT, MEM, LENGTH, LIST, EXIT, DCOPY, MGET, MPUT,
+    JZ_STEPPED, JNZ_STEPPED, JMP_STEPPED, COUNT, COUNTED,
+)
+
+OPCODE_NAMES = {
+    MOV: 'mov', MOVI: 'mov', ADD: 'add', SUB: 'sub', MUL: 'mul', DIV: 'div', MOD: 'mod',
+    CMP_LT: 'cmp<', CMP_GT: 'cmp>', CMP_LE: 'cmp<=', CMP_GE: 'cmp>=', CMP_EQ: 'cmp=',
+    JZ: 'jz', JNZ: 'jnz', JMP: 'jmp', CALL: 'call', RET: 'ret', LD: 'ld', ST: 'st',
+    IGET: 'call iget', IPUT: 'call iput', MEM: 'call mem', LENGTH: 'call length',
+    LIST: 'call list', EXIT: 'call exit', DCOPY: 'call dcopy', MGET: 'call mget', MPUT: 'call mput',
+    JZ_STEPPED: 'jz', JNZ_STEPPED: 'jnz', JMP_STEPPED: 'jmp',
+}
+BRANCHES = {JZ, JNZ}
+TERMINATORS = {JZ, JNZ, JMP, RET}
+PROFILE_VERSION = 2
+# IRGenerator labels are {KIND}{n}_{function}; the kind says which construct
+# emitted them and n, numbered in source order, which of several on a line.
+LABEL_KIND = re.compile(r'([A-Z]+)(\d+)_')
+
+
+class Profiler(IRInterpreter):
+    """Runs the IR like IRInterpreter while counting how often every
+    instruction executes, how often each conditional jump is taken, how
+    often each proc is entered and how many instructions run under each
+    distinct call stack.
+
+    `source_lines` is IRGenerator.source_lines: the TSLANG line of every
+    line of the IR text, used to map the counts back to the source.
+
+    The procs run as count_code rewrites them, so the plain interpreter
+    never tests whether it is counting.
+    """
+
+    def __init__(self, ir_text, source_lines=None, stdin=None, stdout=None, check_bounds=False):
+        super().__init__(ir_text, stdin=stdin, stdout=stdout, check_bounds=check_bounds)
+        self.source_lines = source_lines or []
+        # the instructions as in the IR, which the counts are indexed by
+        self.code = {name: list(proc.code) for name, proc in self.procs.items()}
+        for proc in self.procs.values():
+            proc.code[:] = count_code(proc.code)
+        self.counts = {name: [0] * len(code) for name, code in self.code.items()}
+        self.taken = {name: [0] * len(code) for name, code in self.code.items()}
+        self.entries = dict.fromkeys(self.procs, 0)
+        self.stacks = {}
+
+    counting = True
+
+    def execute(self, proc, args=()):
+        self.path = []
+        self.mark = 0
+        steps = self.steps
+        try:
+            return super().execute(proc, args)
+        finally:
+            # the instructions since the last call or return: up to the
+            # final ret, an exit or a runtime error
+            self.enter(None, self.steps - steps)
+
+    # execute calls enter and leave for the entry proc and at every
+    # counted call and return
+
+    def enter(self, proc, steps):
+        """`proc` is entered after `steps` instructions of this execute:
+        return its (instruction counts, taken branch counts) lists."""
+        if self.path:
+            path = tuple(self.path)
+            self.stacks[path] = self.stacks.get(path, 0) + steps - self.mark
+        self.mark = steps
+        if proc is None:
+            return None, None
+        self.path.append(proc.name)
+        self.entries[proc.name] += 1
+        return self.counts[proc.name], self.taken[proc.name]
+
+    def leave(self, steps):
+        """The innermost proc returned after `steps` instructions: return
+        the count lists of the proc it returns to."""
+        self.enter(None, steps)
+        self.path.pop()
+        return self.counts[self.path[-1]], self.taken[self.path[-1]]
+
+    # --- mapping back to the IR text and the source --------------------------
+
+    def ir_line(self, name, index):
+        lines = self.program.procs[name].lines
+        return lines[index] if index < len(lines) else None
+
+    def line_of(self, name, index=None):
+        """Source line of instruction `index` of proc `name` (of the proc
+        itself when index is None)."""
+        ir_line = self.program.procs[name].line if index is None else self.ir_line(name, index)
+        if ir_line is None or ir_line > len(self.source_lines):
+            return None
+        return self.source_lines[ir_line - 1]
+
+    def label_counts(self, name):
+        """(kind, number, source line, executions) of every label of proc
+        `name`."""
+        proc = self.program.procs[name]
+        counts = self.counts[name]
+        for label, index in proc.labels.items():
+            match = LABEL_KIND.match(label)
+            ir_line = proc.label_lines[label]
+            if match and ir_line <= len(self.source_lines):
+                yield match.group(1), int(match.group(2)), self.source_lines[ir_line - 1], counts[index]
+
+    def constructs(self, name):
+        """Executions of the then/else arms of the if-else statements of
+        proc `name` and entries/iterations of its loops, by profile_key.
+
+        A construct allocates its labels together (THEN, ELSE, ENDIF), so
+        the k-th THEN and the k-th ELSE of a line by label number belong
+        to its k-th if-else, and likewise BODY and ENDWHILE/ENDFOR."""
+        start = self.line_of(name)
+        if start is None:
+            return {}, {}
+        labels = {}
+        for kind, number, line, count in self.label_counts(name):
+            if kind in ('ENDWHILE', 'ENDFOR'):
+                kind = 'END'
+            if line is not None:
+                labels.setdefault((line, kind), []).append((number, count))
+        ifs, loops = {}, {}
+        for (line, kind), numbered in labels.items():
+            for ordinal, (_, count) in enumerate(sorted(numbered)):
+                key = profile_key(line - start, ordinal)
+                if kind == 'THEN':
+                    ifs.setdefault(key, {})["then"] = count
+                elif kind == 'ELSE':
+                    ifs.setdefault(key, {})["else"] = count
+                elif kind == 'BODY':
+                    loops.setdefault(key, {})["iterations"] = count
+                elif kind == 'END':
+                    loops.setdefault(key, {})["entries"] = count
+        return ({key: arms for key, arms in ifs.items() if len(arms) == 2},
+                {key: trips for key, trips in loops.items() if "iterations" in trips and "entries" in trips})
+
+    def blocks(self, name):
+        """Basic blocks of proc `name` as (start, end, label) index ranges."""
+        code = self.code[name]
+        labels = {}
+        for label, index in self.program.procs[name].labels.items():
+            labels.setdefault(index, label)
+        leaders = {0, *labels}
+        for i, instr in enumerate(code):
+            if instr[0] in TERMINATORS:
+                leaders.add(i + 1)
+        starts = sorted(i for i in leaders if i < len(code))
+        ends = starts[1:] + [len(code)]
+        return [(start, end, labels.get(start)) for start, end in zip(starts, ends)]
+
+    # --- reports -------------------------------------------------------------
+
+    def profile(self):
+        """The collected counts as a JSON-serializable dict."""
+        functions = {}
+        calls = {}
+        call_sites, ifs, loops = {}, {}, {}
+        blocks = []
+        branches = []
+        instructions = []
+        for name, code in self.code.items():
+            counts = self.counts[name]
+            start = self.line_of(name)
+            lines = {}
+            for index, count in enumerate(counts):
+                if not count:
+                    continue
+                op = code[index][0]
+                line = self.line_of(name, index)
+                instructions.append({
+                    "function": name, "index": index, "ir_line": self.ir_line(name, index),
+                    "line": line, "op": OPCODE_NAMES[op], "count": count,
+                })
+                if line is not None:
+                    lines[str(line)] = lines.get(str(line), 0) + count
+                if op == CALL:
+                    callee = code[index][2].name
+                    key = (name, callee, line)
+                    calls[key] = calls.get(key, 0) + count
+                    if line is not None and start is not None:
+                        site = call_sites.setdefault(name, {}).setdefault(str(line - start), {})
+                        site[callee] = site.get(callee, 0) + count
+                elif op in BRANCHES:
+                    branches.append({
+                        "function": name, "line": line, "ir_line": self.ir_line(name, index),
+                        "executed": count, "taken": self.taken[name][index],
+                    })
+            for start, end, label in self.blocks(name):
+                if counts[start]:
+                    blocks.append({
+                        "function": name, "label": label, "ir_line": self.ir_line(name, start),
+                        "line": self.line_of(name, start), "count": counts[start],
+                        "size": end - start, "instructions": sum(counts[start:end]),
+                    })
+            ifs[name], loops[name] = self.constructs(name)
+            functions[name] = {
+                "line": self.line_of(name),
+                "calls": self.entries[name],
+                "instructions": sum(counts),
+                "lines": lines,
+            }
+        blocks.sort(key=lambda b: -b["instructions"])
+        return {
+            "version": PROFILE_VERSION,
+            "instructions": self.steps,
+            "functions": functions,
+            "calls": [{"caller": caller, "callee": callee, "line": line, "count": count}
+                      for (caller, callee, line), count in sorted(calls.items(), key=lambda i: -i[1])],
+            "blocks": blocks,
+            "branches": branches,
+            # keyed by function and line offset from it: read back by ExecutionProfile
+            "call_sites": call_sites,
+            "ifs": {name: arms for name, arms in ifs.items() if arms},
+            "loops": {name: trips for name, trips in loops.items() if trips},
+            "counts": instructions,
+            "memo": self.memo_stats(),
+        }
+
+    def collapsed(self):
+        """Instructions per call stack in the collapsed format read by
+        flamegraph.pl and speedscope: `main;f;g <count>` per line."""
+        return ''.join(f"{';'.join(path)} {count}\n"
+                       for path, count in sorted(self.stacks.items()) if count)
+
+    def save(self, path, collapsed_path=None):
+        """Write the JSON profile to `path` and the collapsed stacks next to
+        it (`path` with a .folded suffix unless `collapsed_path` is given)."""
+        with open(path, 'w') as f:
+            json.dump(self.profile(), f, indent=1)
+        collapsed_path = collapsed_path or (path.rsplit('.', 1)[0] if path.endswith('.json') else path) + '.folded'
+        with open(collapsed_path, 'w') as f:
+            f.write(self.collapsed())
+        return path, collapsed_path
+
+
+def count_code(code):
+    """`code` with a COUNT before every instruction and the COUNTED
+    variants of the jumps, calls and returns. Jumps are retargeted to the
+    COUNT of their target; a counted jump carries its own IR index in c."""
+    counted = []
+    for index, (op, a, b, c) in enumerate(code):
+        counted.append((COUNT, index, 0, 0))
+        if op in (JZ, JNZ):
+            counted.append((COUNTED[op], a, 2 * b, index))
+        elif op == JMP:
+            counted.append((op, 2 * a, b, c))
+        else:
+            counted.append((COUNTED.get(op, op), a, b, c))
+    return counted
+
+
+def profile_key(offset, ordinal):
+    """Key of the `ordinal`-th if-else or loop (in source order) on the
+    line `offset` lines below the start of its function."""
+    return f"{offset}:{ordinal}"
+
+
+class ExecutionProfile(object):
+    """A profile written by Profiler.save, looked up by function name and
+    line offset from the start of the function, so that it survives edits
+    outside the function and edits inside it below the construct.
+    IRGenerator uses it for profile-guided optimization.
+
+    Calls are counted per callee and line; if-else statements and loops
+    per line and ordinal (see profile_key)."""
+
+    def __init__(self, data):
+        if data.get("version") != PROFILE_VERSION:
+            raise ValueError(f"unsupported profile version {data.get('version')!r}")
+        self.call_sites = data.get("call_sites", {})
+        self.ifs = data.get("ifs", {})
+        self.loops = data.get("loops", {})
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def call_count(self, function, offset, callee):
+        return self.call_sites.get(function, {}).get(str(offset), {}).get(callee, 0)
+
+    def arm_counts(self, function, offset, ordinal=0):
+        """(then, else) executions of the if-else at `offset`, or None."""
+        arms = self.ifs.get(function, {}).get(profile_key(offset, ordinal))
+        return (arms["then"], arms["else"]) if arms else None
+
+    def loop_counts(self, function, offset, ordinal=0):
+        """(entries, iterations) of the loop at `offset`, or None."""
+        trips = self.loops.get(function, {}).get(profile_key(offset, ordinal))
+        return (trips["entries"], trips["iterations"]) if trips else None
+
+
+def profile_ir(ir_text, source_lines=None, stdin=None, stdout=None, entry='main'):
+    profiler = Profiler(ir_text, source_lines=source_lines, stdin=stdin, stdout=stdout)
+    profiler.run(entry)
+    return profiler
@@ -0,0 +1,71 @@
+import AST
+from CallGraph import CallGraph
+from IRGenerator import ast_nodes
+from SymbolTable import builtin_method
+
+
+class Purity(object):
+    """Which functions are pure: their result depends only on their
+    arguments and calling them has no other effect, so a call can be
+    replaced by an earlier result for the same arguments.
+
+    A function is pure when it takes and returns only ints, uses no
+    vector (no vector variable or element access), calls no builtin
+    (scan, print, exit, list, length) and calls only pure functions of
+    the program. Calls form cycles, so functions start out pure and lose
+    it until nothing changes; a function whose only callees are itself
+    and other pure functions stays pure. `reasons` maps every other
+    function to why it is not."""
+
+    def __init__(self, ast, graph=None):
+        self.graph = graph if graph is not None else CallGraph(ast)
+        self.reasons = {}
+        self.loops = set()
+        names = {f.name for f in self.graph.functions}
+        for function in self.graph.functions:
+            reason = self.local_reason(function, names)
+            if reason:
+                self.reasons[function.name] = reason
+        callers = {}
+        for caller, callees in self.graph.calls.items():
+            for callee in callees:
+                callers.setdefault(callee, set()).add(caller)
+        stack = list(self.reasons)
+        while stack:
+            callee = stack.pop()
+            for caller in callers.get(callee, ()):
+                if caller not in self.reasons:
+                    self.reasons[caller] = f"calls {callee}"
+                    stack.append(caller)
+        self.pure = {f.name for f in self.graph.functions if f.name not in self.reasons}
+
+    def local_reason(self, function, names):
+        """Why `function` is impure on its own, or None; `names` are the
+        functions of the program."""
+        if str(function.rettype) != "int":
+            return f"returns {function.rettype}"
+        for param in function.fmlparams.parameters:
+            if param.type != "int":
+                return f"takes {param.type} {param.id}"
+        for node in ast_nodes(function.body):
+            if isinstance(node, AST.FunctionCall):
+                if node.id in builtin_method:
+                    return f"calls {node.id}"
+                if node.id not in names:
+                    return f"calls {node.id} of another file"
+            elif isinstance(node, AST.VariableDecl) and node.type != "int":
+                return f"declares {node.type} {node.id}"
+            elif isinstance(node, AST.OperationOnList):
+                return "accesses a vector"
+            elif isinstance(node, (AST.WhileInstruction, AST.ForInstruction)):
+                self.loops.add(function.name)
+        return None
+
+    def memoizable(self, skip=()):
+        """The pure functions worth a memo table, in source order: those
+        that call a function or loop. A call to a straight-line function
+        costs less than looking its arguments up. main runs once, and the
+        functions in `skip` (see CallGraph.unreachable) get no code."""
+        return [f.name for f in self.graph.functions
+                if f.name in self.pure and f.name != "main" and f.name not in skip
+                and (self.graph.calls[f.name] or f.name in self.loops)]
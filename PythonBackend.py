@@ -0,0 +1,473 @@
+import functools
+import sys
+from array import array
+
+import AST
+from ply.lex import LexToken
+from IRInterpreter import (
+    IRRuntimeError, ProgramExit, MEMO_ENTRIES, INT64_MIN, INT64_MAX, c_div, c_mod, int64,
+)
+
+try:
+    import numpy as np
+except ImportError:  # element-wise loops then always run the scalar code
+    np = None
+
+COMPARISONS = {'<', '>', '<=', '>=', '==', '!='}
+ARITHMETIC = {'+', '-', '*'}
+# shorter loops are cheaper as plain Python than as NumPy calls
+VECTOR_MIN_LENGTH = 16
+
+
+class PythonBackend:
+    """Translates the checked AST into Python source, one Python function
+    per TSLANG function, so loops and conditions run as native CPython
+    control flow.
+
+    Identifiers are prefixed (v_ for variables, f_ for functions) so they
+    cannot clash with Python keywords or the runtime helpers. Vectors are
+    array('q'); comparisons yield 0/1 in value position and plain Python
+    truth values in conditions. + - * / raise "integer overflow" when the
+    result leaves 64 bits, like the IR engines.
+
+    With vectorize=True, element-wise for loops (see `elementwise`) also
+    get a NumPy version that runs when NumPy is installed, every vector
+    covers the loop range and the values bound every intermediate result
+    to 64 bits (NumPy would wrap); otherwise the scalar loop runs.
+
+    The functions named in `memoize` (see Purity.memoizable) are wrapped
+    in functools.lru_cache, bounded like the IR memo tables.
+    """
+
+    def __init__(self, vectorize=True, memoize=()):
+        self.vectorize = vectorize
+        self.memoize = set(memoize)
+        self.lines = []
+        self.indent = 0
+        self.temp_counter = 0
+        self.symbol_table = None
+
+    # --- utils ---------------------------------------------------------------
+
+    def line(self, text):
+        self.lines.append("    " * self.indent + text)
+
+    def new_temp(self):
+        self.temp_counter += 1
+        return f"t{self.temp_counter}"
+
+    def suite(self, node):
+        """Emit `node` one level deeper, with `pass` if it produced nothing."""
+        self.indent += 1
+        before = len(self.lines)
+        self.statement(node)
+        if len(self.lines) == before:
+            self.line("pass")
+        self.indent -= 1
+
+    def statement(self, node):
+        if node is None or isinstance(node, list):
+            return
+        if isinstance(node, AST.Node) and hasattr(self, 'visit_' + node.__class__.__name__):
+            node.accept(self)
+        else:
+            self.line(self.expr(node))
+
+    # --- driver --------------------------------------------------------------
+
+    def generate(self, ast, symbol_table):
+        """Return the Python source of the whole program."""
+        self.symbol_table = symbol_table
+        if hasattr(ast, 'accept'):
+            ast.accept(self)
+        return '\n'.join(self.lines) + '\n'
+
+    # --- statements ----------------------------------------------------------
+
+    def visit_Program(self, node, table=None):
+        current = node
+        while current:
+            if current.func:
+                current.func.accept(self)
+            current = current.prog
+
+    def visit_FunctionDef(self, node, table=None):
+        func_symbol = self.symbol_table.get(node.name)
+        scope = getattr(func_symbol, 'scope', None)
+        if scope is None:
+            raise Exception(f"No scope found for function '{node.name}'")
+        outer, self.symbol_table = self.symbol_table, scope
+        params = ', '.join(f"v_{p.id}" for p in node.fmlparams.parameters)
+        if node.name in self.memoize:
+            self.line("@_memo")
+        self.line(f"def f_{node.name}({params}):")
+        self.indent += 1
+        self.statement(node.body)
+        if not self.lines[-1].startswith("    return "):
+            # like the IR, falling off the end returns 0
+            self.line("return 0")
+        self.indent -= 1
+        self.line("")
+        self.symbol_table = outer
+
+    def visit_Body(self, node, table=None):
+        self.statement(node.statement)
+        self.statement(node.body)
+
+    def visit_Block(self, node, table=None):
+        self.statement(node.body)
+
+    def visit_VariableDecl(self, node, table=None):
+        value = self.expr(node.expr) if node.expr else "0"
+        self.line(f"v_{node.id} = {value}")
+
+    def visit_Assignment(self, node, table=None):
+        if isinstance(node.id, AST.OperationOnList):
+            vector = self.expr(node.id.expr)
+            index = self.expr(node.id.index_expr)
+            self.line(f"{vector}[{index}] = {self.expr(node.expr)}")
+            return
+        varname = node.id if isinstance(node.id, str) else node.id.value
+        self.line(f"v_{varname} = {self.expr(node.expr)}")
+
+    def visit_FunctionCall(self, node, table=None):
+        self.line(self.expr(node))
+
+    def visit_ReturnInstruction(self, node, table=None):
+        self.line(f"return {self.expr(node.expr) if node.expr else '0'}")
+
+    def visit_IfOrIfElseInstruction(self, node, table=None):
+        self.line(f"if {self.expr(node.cond, condition=True)}:")
+        self.suite(node.if_statement)
+        if node.else_statement:
+            self.line("else:")
+            self.suite(node.else_statement)
+
+    def visit_WhileInstruction(self, node, table=None):
+        self.line(f"while {self.expr(node.cond, condition=True)}:")
+        self.suite(node.while_statement)
+
+    def visit_ForInstruction(self, node, table=None):
+        var = f"v_{node.id}"
+        start, end = self.expr(node.start_expr), self.expr(node.end_expr)
+        if self.assigns(node.for_statement, node.id):
+            # the body moves the counter itself: keep the IR's test-and-step loop
+            end_temp = self.new_temp()
+            self.line(f"{var} = {start}")
+            self.line(f"{end_temp} = {end}")
+            self.line(f"while {var} < {end_temp}:")
+            self.indent += 1
+            self.statement(node.for_statement)
+            self.line(f"{var} += 1")
+            self.indent -= 1
+            return
+        start_temp, end_temp = self.new_temp(), self.new_temp()
+        self.line(f"{start_temp} = {start}")
+        self.line(f"{end_temp} = {end}")
+        pattern = self.elementwise(node) if self.vectorize else None
+        if pattern:
+            self.vector_loop(node, pattern, start_temp, end_temp)
+            self.line("else:")
+            self.indent += 1
+        self.line(f"for {var} in range({start_temp}, {end_temp}):")
+        self.suite(node.for_statement)
+        if pattern:
+            self.indent -= 1
+        if self.symbol_table.get(node.id) is not None:
+            # the counter outlives the loop; the IR leaves it at max(start, end)
+            self.line(f"{var} = {end_temp} if {end_temp} > {start_temp} else {start_temp}")
+
+    # --- element-wise loops --------------------------------------------------
+
+    def elementwise(self, node):
+        """Recognize `for (i = s to e) v[i] = f(...)` (a map) and
+        `for (i = s to e) acc = acc + f(...)` (a sum reduction), where f
+        only applies + - * to constants, loop-invariant scalars, the
+        counter and vectors indexed by exactly the counter. Every element
+        then depends on its own index only, so the whole range can be
+        computed at once. Returns (kind, target, expr, vectors) or None."""
+        stmt = node.for_statement
+        while isinstance(stmt, (AST.Body, AST.Block)):
+            if isinstance(stmt, AST.Block):
+                stmt = stmt.body
+            elif stmt.body:
+                return None
+            else:
+                stmt = stmt.statement
+        if not isinstance(stmt, AST.Assignment):
+            return None
+        vectors = set()
+        if isinstance(stmt.id, AST.OperationOnList):
+            target = self.indexed_vector(stmt.id, node.id)
+            if target is None or not self.elementwise_expr(stmt.expr, node.id, vectors, None):
+                return None
+            return "map", target, stmt.expr, vectors | {target}
+        acc = stmt.id if isinstance(stmt.id, str) else getattr(stmt.id, 'value', None)
+        expr = stmt.expr
+        if acc in (None, node.id) or not isinstance(expr, AST.BinExpr) or expr.op != '+':
+            return None
+        for mine, other in ((expr.left, expr.right), (expr.right, expr.left)):
+            if (isinstance(mine, LexToken) and mine.type == 'ID' and mine.value == acc
+                    and self.elementwise_expr(other, node.id, vectors, acc) and vectors):
+                return "sum", acc, other, vectors
+        return None
+
+    def indexed_vector(self, node, counter):
+        """Name of the vector in `node` (an OperationOnList) if it is indexed
+        by exactly `counter`."""
+        vector, index = node.expr, node.index_expr
+        if (isinstance(vector, LexToken) and vector.type == 'ID'
+                and isinstance(index, LexToken) and index.type == 'ID' and index.value == counter):
+            return vector.value
+        return None
+
+    def elementwise_expr(self, node, counter, vectors, acc):
+        if isinstance(node, LexToken):
+            return node.type == 'NUMBER' or (node.type == 'ID' and node.value != acc)
+        if isinstance(node, AST.OperationOnList):
+            vector = self.indexed_vector(node, counter)
+            if vector is None or vector == acc:
+                return False
+            vectors.add(vector)
+            return True
+        if isinstance(node, AST.BinExpr) and node.op in ARITHMETIC:
+            return (self.elementwise_expr(node.left, counter, vectors, acc)
+                    and self.elementwise_expr(node.right, counter, vectors, acc))
+        return False
+
+    def vector_loop(self, node, pattern, start, end):
+        kind, target, expr, vectors = pattern
+        names = ', '.join(f"v_{v}" for v in sorted(vectors))
+        bounds = self.bound_expr(expr, node.id, start, end)
+        if kind == "map":
+            fits = f"{bounds} is not None"
+        else:
+            fits = f"_sum_fits(v_{target}, {bounds}, {end} - {start})"
+        self.line(f"if _vectorizable({start}, {end}, {names}) and {fits}:")
+        self.indent += 1
+        value = self.vector_expr(expr, node.id, start, end)
+        if kind == "map":
+            self.line(f"_vec(v_{target})[{start}:{end}] = {value}")
+        else:
+            self.line(f"v_{target} = v_{target} + _sum({value})")
+        self.indent -= 1
+
+    def vector_expr(self, node, counter, start, end):
+        if isinstance(node, LexToken):
+            if node.type == 'ID' and node.value == counter:
+                return f"_np.arange({start}, {end}, dtype=_np.int64)"
+            return self.token(node)
+        if isinstance(node, AST.OperationOnList):
+            return f"_vec(v_{node.expr.value})[{start}:{end}]"
+        left = self.vector_expr(node.left, counter, start, end)
+        right = self.vector_expr(node.right, counter, start, end)
+        return f"({left} {node.op} {right})"
+
+    def bound_expr(self, node, counter, start, end):
+        """Expression of the (low, high) bounds of `node` over the loop
+        range, None if they may leave 64 bits."""
+        if isinstance(node, LexToken):
+            if node.type == 'ID' and node.value == counter:
+                return f"({start}, {end} - 1)"
+            value = self.token(node)
+            return f"({value}, {value})"
+        if isinstance(node, AST.OperationOnList):
+            return f"_span(v_{node.expr.value}, {start}, {end})"
+        left = self.bound_expr(node.left, counter, start, end)
+        right = self.bound_expr(node.right, counter, start, end)
+        return f"_interval('{node.op}', {left}, {right})"
+
+    def assigns(self, node, name):
+        """Whether `name` is assigned anywhere inside `node`."""
+        if isinstance(node, AST.Assignment):
+            target = node.id if isinstance(node.id, str) else getattr(node.id, 'value', None)
+            if target == name:
+                return True
+        if isinstance(node, AST.ForInstruction) and node.id == name:
+            return True
+        if isinstance(node, list):
+            return any(self.assigns(item, name) for item in node)
+        if isinstance(node, AST.Node):
+            return any(self.assigns(value, name) for value in node.__dict__.values()
+                       if isinstance(value, (AST.Node, list)))
+        return False
+
+    # --- expressions ---------------------------------------------------------
+
+    def expr(self, node, condition=False):
+        """Python source for an expression. With condition=True the result
+        only has to be truthy/falsy, so comparisons stay Python bools."""
+        if isinstance(node, LexToken):
+            return self.token(node)
+        if isinstance(node, AST.BinExpr):
+            return self.binary(node, condition)
+        if isinstance(node, AST.FunctionCall):
+            return self.call(node)
+        if isinstance(node, AST.OperationOnList):
+            return f"{self.expr(node.expr)}[{self.expr(node.index_expr)}]"
+        if isinstance(node, AST.TernaryExpr):
+            return (f"({self.expr(node.first_expr)} if {self.expr(node.cond, condition=True)} "
+                    f"else {self.expr(node.second_expr)})")
+        if isinstance(node, AST.ExprList):
+            return f"array('q', [{', '.join(self.expr(e) for e in node.exprs)}])"
+        if isinstance(node, AST.Assignment):
+            if isinstance(node.id, AST.OperationOnList):
+                return (f"_store({self.expr(node.id.expr)}, {self.expr(node.id.index_expr)}, "
+                        f"{self.expr(node.expr)})")
+            varname = node.id if isinstance(node.id, str) else node.id.value
+            return f"(v_{varname} := {self.expr(node.expr)})"
+        return "0"
+
+    def token(self, token):
+        if token.type == 'NUMBER':
+            return str(int(token.value))
+        if token.type in ('STRING', 'MSTRING'):
+            return token.value
+        if token.type == 'BOOL':
+            return "1" if token.value.lower() == 'true' else "0"
+        if token.type == 'ID':
+            return f"v_{token.value}"
+        return "0"
+
+    def binary(self, node, condition):
+        if node.op in ('&&', '||'):
+            keyword = 'and' if node.op == '&&' else 'or'
+            test = (f"({self.expr(node.left, condition=True)} {keyword} "
+                    f"{self.expr(node.right, condition=True)})")
+            return test if condition else f"(1 if {test} else 0)"
+        left, right = self.expr(node.left), self.expr(node.right)
+        if node.op in COMPARISONS:
+            test = f"({left} {node.op} {right})"
+            return test if condition else f"(1 if {test} else 0)"
+        if node.op in ARITHMETIC:
+            # checked inline, like IRInterpreter: bit_length() is far cheaper
+            # than comparing with the bounds or calling int64
+            temp = self.new_temp()
+            return (f"({temp} if ({temp} := {left} {node.op} {right}).bit_length() < 64 "
+                    f"or {temp} == {INT64_MIN} else _overflow())")
+        if node.op == '/':
+            return f"_int64(_div({left}, {right}))"
+        if node.op == '%':
+            return f"_mod({left}, {right})"
+        return "0"
+
+    def call(self, node):
+        args = [self.expr(a) for a in node.args.exprs] if node.args else []
+        if node.id == 'scan':
+            return "_scan()"
+        if node.id == 'print':
+            return f"_print({args[0]})" if args else "None"
+        if node.id == 'length':
+            return f"len({args[0]})"
+        if node.id == 'list':
+            return f"_list({args[0]})"
+        if node.id == 'exit':
+            return f"_exit({args[0]})"
+        return f"f_{node.id}({', '.join(args)})"
+
+
+class PythonProgram(object):
+    """Compiles the Python translation of a program and runs it with the
+    same scan/print/exit behaviour as IRInterpreter."""
+
+    def __init__(self, ast, symbol_table, stdin=None, stdout=None, vectorize=True, memoize=()):
+        self.source = PythonBackend(vectorize=vectorize, memoize=memoize).generate(ast, symbol_table)
+        self.memoize = list(memoize)
+        self.stdin = iter(stdin) if stdin is not None else None
+        self.stdout = stdout if stdout is not None else sys.stdout
+        self.namespace = self.runtime()
+        exec(compile(self.source, '<tslang>', 'exec'), self.namespace)
+
+    def runtime(self):
+        def scan():
+            if self.stdin is None:
+                self.stdin = iter(sys.stdin.read().split())
+            try:
+                return int(next(self.stdin))
+            except StopIteration:
+                raise IRRuntimeError("scan: end of input")
+
+        def write(value):
+            self.stdout.write(f"{value}\n")
+
+        def exit_program(code):
+            raise ProgramExit(code)
+
+        def store(vector, index, value):
+            vector[index] = value
+            return value
+
+        def overflow():
+            raise IRRuntimeError("integer overflow")
+
+        def vectorizable(start, end, *vectors):
+            return (np is not None and 0 <= start and end - start >= VECTOR_MIN_LENGTH
+                    and all(isinstance(v, array) and end <= len(v) for v in vectors))
+
+        def span(vector, start, end):
+            values = np.frombuffer(vector, dtype=np.int64)[start:end]
+            return int(values.min()), int(values.max())
+
+        def interval(op, left, right):
+            if left is None or right is None:
+                return None
+            (a, b), (c, d) = left, right
+            if op == '+':
+                low, high = a + c, b + d
+            elif op == '-':
+                low, high = a - d, b - c
+            else:
+                products = (a * c, a * d, b * c, b * d)
+                low, high = min(products), max(products)
+            return (low, high) if INT64_MIN <= low and high <= INT64_MAX else None
+
+        def sum_fits(acc, bounds, count):
+            # every partial sum, with and without acc, lies in these
+            if bounds is None:
+                return False
+            low, high = count * min(bounds[0], 0), count * max(bounds[1], 0)
+            return INT64_MIN <= min(low, acc + low) and max(high, acc + high) <= INT64_MAX
+
+        return {
+            'array': array,
+            '_scan': scan,
+            '_print': write,
+            '_list': lambda n: array('q', bytes(8 * n)),
+            '_exit': exit_program,
+            '_store': store,
+            '_div': c_div,
+            '_mod': c_mod,
+            '_int64': int64,
+            '_overflow': overflow,
+            '_np': np,
+            '_vectorizable': vectorizable,
+            '_span': span,
+            '_interval': interval,
+            '_sum_fits': sum_fits,
+            '_vec': lambda vector: np.frombuffer(vector, dtype=np.int64),
+            '_sum': lambda values: int(values.sum()),
+            '_memo': functools.lru_cache(maxsize=MEMO_ENTRIES),
+        }
+
+    def memo_stats(self):
+        """Hits, misses, entries and hit rate of every memoized function."""
+        stats = {}
+        for name in self.memoize:
+            info = self.namespace[f"f_{name}"].cache_info()
+            calls = info.hits + info.misses
+            stats[name] = {"hits": info.hits, "misses": info.misses, "entries": info.currsize,
+                           "hit_rate": info.hits / calls if calls else 0.0}
+        return stats
+
+    def run(self, entry='main'):
+        function = self.namespace.get(f"f_{entry}")
+        if function is None:
+            raise IRRuntimeError(f"no function '{entry}' to run")
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 100000))
+        try:
+            return function()
+        except ProgramExit as e:
+            return e.code
+        finally:
+            sys.setrecursionlimit(limit)
@@ -0,0 +1,218 @@
+import json
+import multiprocessing
+import sys
+import time
+
+# tokens listed in a report; the table of a long program dwarfs the rest
+TOKEN_LIMIT = 500
+TOKEN_HEADERS = ["Line", "Column", "Token", "Value"]
+PHASE_NAMES = {"lexical": "Lexical Analysis", "syntax": "Syntax Analysis",
+               "semantic": "Semantic Analysis", "ir": "IR Generation"}
+
+
+class Report(object):
+    """Receives the result of each compiler phase as soon as it completes.
+
+    main() calls source(), then phase() for lexical, syntax, semantic and
+    ir in that order (stopping after lexical errors), then summary() and
+    close(). This base class discards everything (--report none).
+
+    `token_limit` caps the rows of the token table; 0 leaves it out."""
+
+    extension = None
+
+    def __init__(self, path=None, token_limit=TOKEN_LIMIT):
+        self.path = path
+        self.token_limit = token_limit
+        self.start = time.perf_counter()
+
+    def tokens_shown(self, tokens):
+        return tokens[:self.token_limit] if self.token_limit is not None else tokens
+
+    def source(self, filename, source_code):
+        pass
+
+    def phase(self, name, errors, tokens=None, ir=None):
+        """`tokens` ([line, column, type, value] rows) comes with the
+        lexical phase and `ir` with the ir phase."""
+
+    def summary(self, lines):
+        pass
+
+    def close(self):
+        """Finish writing; rendering may continue in the background."""
+
+    def wait(self):
+        """Block until the report is written; returns the path written or None."""
+        return None
+
+
+class StreamReport(Report):
+    """A report written to its file as events arrive, so a reader (or
+    `tail -f`) sees each phase as soon as it finishes."""
+
+    def __init__(self, path, token_limit=TOKEN_LIMIT):
+        super().__init__(path, token_limit)
+        self.stream = sys.stdout if path == "-" else open(path, "w")
+
+    def write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+    def wait(self):
+        return None if self.stream is sys.stdout else self.path
+
+
+class TextReport(StreamReport):
+    extension = ".txt"
+
+    def source(self, filename, source_code):
+        self.write(f"TSLANG Compilation Report\n\n== Source Code: {filename} ==\n{source_code.rstrip()}\n")
+
+    def phase(self, name, errors, tokens=None, ir=None):
+        status = "FAILED" if errors else "PASSED"
+        self.write(f"\n== {PHASE_NAMES[name]}: {status} ==\n")
+        if tokens is not None and self.token_limit != 0:
+            shown = self.tokens_shown(tokens)
+            self.write("".join(f"{line:>5} {column:>4}  {kind:<12} {value}\n"
+                               for line, column, kind, value in shown))
+            if len(shown) < len(tokens):
+                self.write(f"... {len(tokens) - len(shown)} more tokens\n")
+        for error in errors:
+            self.write(f"{error}\n")
+        if ir:
+            self.write(ir)
+
+    def summary(self, lines):
+        self.write("\n== Compilation Summary ==\n" + "".join(f"{line}\n" for line in lines))
+
+
+class JSONReport(StreamReport):
+    """JSON Lines: one object per event, each with the seconds elapsed
+    since the report was created."""
+
+    extension = ".jsonl"
+
+    def event(self, kind, **fields):
+        fields = dict(event=kind, **fields, elapsed=round(time.perf_counter() - self.start, 6))
+        self.write(json.dumps(fields) + "\n")
+
+    def source(self, filename, source_code):
+        self.event("source", file=filename, lines=source_code.count("\n") + 1)
+
+    def phase(self, name, errors, tokens=None, ir=None):
+        fields = {"phase": name, "ok": not errors, "errors": errors}
+        if tokens is not None:
+            fields["token_count"] = len(tokens)
+            if self.token_limit != 0:
+                fields["tokens"] = self.tokens_shown(tokens)
+        if ir is not None:
+            fields["ir"] = ir
+        self.event("phase", **fields)
+
+    def summary(self, lines):
+        self.event("summary", lines=lines)
+
+
+class PDFBackend(Report):
+    """Records the events and renders the PDF in a separate process when
+    closed, so the compiler can report its result (and run the program)
+    while fpdf lays out the pages."""
+
+    extension = ".pdf"
+
+    def __init__(self, path, token_limit=TOKEN_LIMIT):
+        super().__init__(path, token_limit)
+        self.events = []
+        self.process = None
+
+    def source(self, filename, source_code):
+        self.events.append(("source", filename, source_code))
+
+    def phase(self, name, errors, tokens=None, ir=None):
+        if tokens is not None:
+            tokens = (self.tokens_shown(tokens), len(tokens))
+        self.events.append(("phase", name, errors, tokens, ir))
+
+    def summary(self, lines):
+        self.events.append(("summary", lines))
+
+    def close(self):
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        self.process = context.Process(target=render_pdf, args=(self.events, self.path, self.token_limit))
+        self.process.start()
+
+    def wait(self):
+        if self.process is None:
+            return None
+        self.process.join()
+        return self.path if self.process.exitcode == 0 else None
+
+
+def render_pdf(events, path, token_limit=TOKEN_LIMIT):
+    """Lay out recorded PDFBackend events; runs in the render process."""
+    try:
+        from PDFReport import PDFReport
+        pdf = PDFReport()
+        pdf.add_page()
+        for event in events:
+            render_event(pdf, event, token_limit)
+        pdf.output(path)
+    except Exception as e:
+        print(f"Error saving PDF: {e}")
+        sys.exit(1)
+
+
+def render_event(pdf, event, token_limit):
+    kind = event[0]
+    if kind == "source":
+        pdf.section_title("Source Code")
+        pdf.add_code_block(event[2])
+    elif kind == "phase":
+        _, name, errors, tokens, ir = event
+        if name == "lexical":
+            if token_limit != 0:
+                pdf.section_title("Lexical Analysis - Tokens")
+                shown, count = tokens
+                if shown:
+                    pdf.add_table(TOKEN_HEADERS, shown)
+                    if len(shown) < count:
+                        pdf.add_code_block(f"... {count - len(shown)} more tokens")
+                else:
+                    pdf.add_code_block("(no tokens)")
+            title = "Lexical Errors"
+        elif name == "syntax":
+            pdf.section_title("Syntax and Semantic Analysis")
+            title = "Syntax Errors"
+        elif name == "semantic":
+            title = "Semantic Errors"
+        else:
+            pdf.section_title("Intermediate Representation (IR) Generation")
+            if ir:
+                pdf.section_title("Generated IR Code (Machine Code)")
+                pdf.add_code_block(ir)
+            title = "IR Generation Errors"
+        if errors:
+            pdf.section_title(title)
+            for error in errors:
+                pdf.add_code_block(error)
+    elif kind == "summary":
+        pdf.section_title("Compilation Summary")
+        for line in event[1]:
+            pdf.add_code_block(line)
+
+
+BACKENDS = {"pdf": PDFBackend, "json": JSONReport, "text": TextReport, "none": Report}
+
+
+def open_report(kind, path=None, token_limit=TOKEN_LIMIT):
+    """The report backend `kind`, written to `path` (default report.<ext>)."""
+    backend = BACKENDS[kind]
+    if path is None and backend.extension:
+        path = "report" + backend.extension
+    return backend(path, token_limit)
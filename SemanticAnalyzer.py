@@ -1,15 +1,24 @@
 import SymbolTable
 import AST
+from Diagnostics import Diagnostics
 
 
 class semanticChecker:
-    def __init__(self):
+    def __init__(self, diagnostics=None, externals=None, signature_only=()):
         self.cast_var = {
             'number': 'int',
             'string': 'str',
             'mstring': 'mstr'
         }
-        self.errors = []
+        self.diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+        # functions of other files, a SymbolTable looked up after the program's own
+        self.externals = externals
+        # functions whose bodies are not checked (see CallGraph.unreachable)
+        self.signature_only = signature_only
+
+    @property
+    def errors(self):
+        return self.diagnostics.messages("semantic")
 
     def push_builtins_to_table(self, table):
         builtins = [
@@ -31,10 +40,10 @@ class semanticChecker:
             if expr.type == 'ID':
                 var = table.get(expr.value)
                 if not var:
-                    self.handle_error(lineno,
+                    self.handle_error(lineno, "undefined-variable",
                                       f"function '{table.function.name if table.function else 'unknown'}': variable '{expr.value}' is not defined.")
                 elif isinstance(var, SymbolTable.VariableSymbol) and not var.assigned:
-                    self.handle_error(lineno,
+                    self.handle_error(lineno, "unassigned-variable",
                                       f"function '{table.function.name if table.function else 'unknown'}': Variable '{expr.value}' is used before being assigned.")
         elif hasattr(expr, '__dict__'):
             for value in expr.__dict__.values():
@@ -52,11 +61,11 @@ class semanticChecker:
             if expr.type == 'ID':
                 var = table.get(expr.value)
                 if not var:
-                    self.handle_error(expr.lineno,
+                    self.handle_error(expr.lineno, "undefined-variable",
                                       f"function '{table.function.name if table.function else 'unknown'}': variable '{expr.value}' is not defined.")
                     return 'unknown'
                 if isinstance(var, SymbolTable.VariableSymbol) and not var.assigned:
-                    self.handle_error(expr.lineno,
+                    self.handle_error(expr.lineno, "unassigned-variable",
                                       f"function '{table.function.name if table.function else 'unknown'}': Variable '{expr.value}' is used before being assigned.")
                 if isinstance(var, SymbolTable.VectorSymbol):
                     return 'vector'
@@ -72,7 +81,7 @@ class semanticChecker:
             elif expr.type == 'BOOL':
                 return 'bool'
             elif expr.type == 'FLOAT':
-                self.handle_error(expr.lineno,
+                self.handle_error(expr.lineno, "invalid-type",
                                   f"function '{table.function.name if table.function else 'unknown'}': wrong type 'float' found. types must be one of the following 'int', 'string', 'vector'")
                 return 'unknown'
             return self.cast_var.get(expr.type.lower(), 'unknown')
@@ -129,7 +138,7 @@ class semanticChecker:
 
     def visit_Program(self, node, table):
         if table is None:
-            table = SymbolTable.SymbolTable(None, None)
+            table = SymbolTable.SymbolTable(self.externals, None)
         self.push_builtins_to_table(table)
 
         current = node
@@ -157,12 +166,14 @@ class semanticChecker:
         table.function = func_symbol
         for param in node.fmlparams.parameters:
             if not self.is_valid_type(param.type):
-                self.handle_error(node.pos, f"Invalid parameter type '{param.type}'")
+                self.handle_error(node.pos, "invalid-type", f"Invalid parameter type '{param.type}'")
             if param.type == 'vector':
                 table.put(SymbolTable.VectorSymbol(param.id, 0))
             else:
                 table.put(SymbolTable.VariableSymbol(param.type, param.id, True))
 
+        if node.name in self.signature_only:
+            return
         node.body.accept(self, table)
 
     def visit_Body(self, node, table):
@@ -173,7 +184,7 @@ class semanticChecker:
 
     def visit_VariableDecl(self, node, table):
         if not self.is_valid_type(node.type):
-            self.handle_error(node.pos,
+            self.handle_error(node.pos, "invalid-type",
                               f"function '{table.function.name if table.function else 'unknown'}': wrong type '{node.type}'")
             return
         if node.type == 'vector':
@@ -193,7 +204,7 @@ class semanticChecker:
         var = table.get(varname)
 
         if not var:
-            self.handle_error(node.pos,
+            self.handle_error(node.pos, "undefined-variable",
                               f"Variable '{varname}' not defined but used in assignment in function '{table.function.name if table.function else 'unknown'}")
             return
 
@@ -205,11 +216,11 @@ class semanticChecker:
     def visit_FunctionCall(self, node, table):
         func = table.get(node.id)
         if not isinstance(func, SymbolTable.FunctionSymbol):
-            self.handle_error(node.pos,
+            self.handle_error(node.pos, "not-a-function",
                               f"'{node.id}' is not a function.")
             return
         if not func:
-            self.handle_error(node.pos,
+            self.handle_error(node.pos, "undefined-function",
                               f"function '{table.function.name if table.function else 'unknown'}': Function '{node.id}' not defined.")
             return
 
@@ -219,18 +230,18 @@ class semanticChecker:
         if func.name == "print":
             printable_types = {"int", "bool", "str", "mstr"}
             if got != expected:
-                self.handle_error(node.pos, f"function 'print': expects {expected} arguments but got {got}.")
+                self.handle_error(node.pos, "argument-count", f"function 'print': expects {expected} arguments but got {got}.")
             else:
                 for arg in node.args.exprs:
                     self.check_for_undefined_ids(arg, table, node.pos)
                     arg_type = self.extract_expr_type(arg, table)
                     if arg_type not in printable_types:
-                        self.handle_error(node.pos,
+                        self.handle_error(node.pos, "argument-type",
                                           f"function 'print': argument must be printable (int, bool, str, mstr), but got '{arg_type}' instead.")
             return
 
         if expected != got:
-            self.handle_error(node.pos, f"function '{func.name}': expects {expected} arguments but got {got}.")
+            self.handle_error(node.pos, "argument-count", f"function '{func.name}': expects {expected} arguments but got {got}.")
         else:
 
             for i, arg in enumerate(node.args.exprs):
@@ -239,18 +250,18 @@ class semanticChecker:
                 self.check_for_undefined_ids(arg, table, node.pos)
                 arg_type = self.extract_expr_type(arg, table)
                 if arg_type is None or param_type is None:
-                    self.handle_error(node.pos,
+                    self.handle_error(node.pos, "argument-type",
                                       f"function '{func.name}': cannot determine type of argument '{param_name}'")
                 elif isinstance(arg_type, SymbolTable.VectorSymbol):
                     if param_type != 'vector':
-                        self.handle_error(node.pos,
+                        self.handle_error(node.pos, "argument-type",
                                           f"function '{func.name}': expected '{param_name}' to be of type '{param_type}', but got 'vector' instead.")
 
                 arg_type_str = str(arg_type).strip()
 
                 param_type_str = str(param_type).strip()
                 if arg_type_str != param_type_str:
-                    self.handle_error(node.pos,
+                    self.handle_error(node.pos, "argument-type",
 
                                       f"function '{func.name}': expected '{param_name}' to be of type '{param_type_str}', but got '{arg_type_str}' instead.")
 
@@ -259,14 +270,14 @@ class semanticChecker:
         expr_type = self.extract_expr_type(node.expr, table)
         expected = table.function.rettype
         if expr_type != expected:
-            self.handle_error(node.pos,
+            self.handle_error(node.pos, "return-type",
                               f"function '{table.function.name if table.function else 'unknown'}': wrong return type. expected '{expected}' but got '{expr_type}'.")
 
     def visit_IfOrIfElseInstruction(self, node, table):
         self.check_for_undefined_ids(node.cond, table, node.pos)
         cond_type = self.extract_expr_type(node.cond, table)
         if cond_type != 'bool':
-            self.handle_error(node.pos, f"If condition must be boolean")
+            self.handle_error(node.pos, "condition-type", f"If condition must be boolean")
         node.if_statement.accept(self, table)
         if node.else_statement:
             node.else_statement.accept(self, table)
@@ -275,7 +286,7 @@ class semanticChecker:
         self.check_for_undefined_ids(node.cond, table, node.pos)
         cond_type = self.extract_expr_type(node.cond, table)
         if cond_type != 'bool':
-            self.handle_error(node.pos, f"While condition must be boolean")
+            self.handle_error(node.pos, "condition-type", f"While condition must be boolean")
         node.while_statement.accept(self, table)
 
     def visit_DoWhileInstruction(self, node, table):
@@ -283,7 +294,7 @@ class semanticChecker:
         self.check_for_undefined_ids(node.cond, table, node.pos)
         cond_type = self.extract_expr_type(node.cond, table)
         if cond_type != 'bool':
-            self.handle_error(node.pos, f"Do-while condition must be boolean")
+            self.handle_error(node.pos, "condition-type", f"Do-while condition must be boolean")
 
     def visit_ForInstruction(self, node, table):
         self.check_for_undefined_ids(node.start_expr, table, node.pos)
@@ -291,7 +302,7 @@ class semanticChecker:
         start_type = self.extract_expr_type(node.start_expr, table)
         end_type = self.extract_expr_type(node.end_expr, table)
         if start_type != 'int' or end_type != 'int':
-            self.handle_error(node.pos, "Invalid expression type in for loop range. Expected 'int'")
+            self.handle_error(node.pos, "range-type", "Invalid expression type in for loop range. Expected 'int'")
 
         loop_table = SymbolTable.SymbolTable(table, table.function)
         loop_table.put(SymbolTable.VariableSymbol('int', node.id, True))
@@ -310,16 +321,16 @@ class semanticChecker:
         name = node.expr.value if hasattr(node.expr, 'value') else node.expr
         symbol = table.get(name)
         if not symbol:
-            self.handle_error(node.pos,
+            self.handle_error(node.pos, "undefined-variable",
                               f"function '{table.function.name if table.function else 'unknown'}': variable '{name}' is not defined.")
             return
         if not isinstance(symbol, SymbolTable.VectorSymbol):
-            self.handle_error(node.pos,
+            self.handle_error(node.pos, "not-a-vector",
                               f"function '{table.function.name if table.function else 'unknown'}': expected '{name}' to be of type 'vector', but got '{symbol.type}' instead.")
         self.check_for_undefined_ids(node.index_expr, table, node.pos)
         idx_type = self.extract_expr_type(node.index_expr, table)
         if idx_type != 'int':
-            self.handle_error(node.pos,
+            self.handle_error(node.pos, "index-type",
                               f"function '{table.function.name if table.function else 'unknown'}': vector index must be 'int'")
 
     def visit_TernaryExpr(self, node, table):
@@ -328,14 +339,12 @@ class semanticChecker:
         self.check_for_undefined_ids(node.second_expr, table, node.pos)
         cond_type = self.extract_expr_type(node.cond, table)
         if cond_type != 'bool':
-            self.handle_error(node.pos, f"Ternary condition must be boolean")
+            self.handle_error(node.pos, "condition-type", f"Ternary condition must be boolean")
         self.extract_expr_type(node.first_expr, table)
         self.extract_expr_type(node.second_expr, table)
 
-    def handle_error(self, pos, msg):
-        error_msg = f"Semantic error at line {pos}: {msg}"
-        if error_msg not in self.errors:
-            self.errors.append(error_msg)
+    def handle_error(self, pos, code, msg):
+        self.diagnostics.report("semantic", code, msg, pos)
 
     def analyze(self, ast):
         if hasattr(ast, 'accept'):
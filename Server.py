@@ -0,0 +1,245 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import stat
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from Batch import BatchWorker
+
+# asyncio's default line limit is 64 KiB; sources can be larger
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+_worker = None
+
+
+def init_worker():
+    global _worker
+    _worker = BatchWorker()
+
+
+def compile_source(source):
+    """Runs in a worker: returns (diagnostics, ir_text, seconds)."""
+    start = time.perf_counter()
+    diagnostics, ir_text = _worker.diagnose_source(source)
+    return diagnostics, ir_text, time.perf_counter() - start
+
+
+class CompileServer(object):
+    """Keeps the compiler warm in worker processes and serves compile
+    requests over the Unix socket at `path`.
+
+    The protocol is one JSON object per line in each direction. A request
+    is {"id": ..., "source": "..."} or {"id": ..., "op": "ping"}, and every
+    response echoes the id. Responses to one connection may arrive out of
+    order when requests are pipelined:
+
+        {"id": 1, "ok": true, "diagnostics": [{"phase": "semantic", "message": "..."}],
+         "ir": "...", "compile_ms": 1.9, "latency_ms": 2.4}
+
+    compile_ms is the time spent in the worker. latency_ms runs from
+    reading the request to writing the response, so it includes time
+    spent queued for a worker.
+
+    A worker that dies (killed, out of memory) breaks the whole pool, so
+    the pool is replaced and warmed again. The requests that were running
+    on it fail; requests that arrive meanwhile wait for the new pool."""
+
+    def __init__(self, path, jobs=None):
+        self.path = path
+        self.jobs = jobs or os.cpu_count() or 1
+        self.pool = None
+        self.pool_lock = None
+        self.server = None
+        self.requests = 0
+        self.restarts = 0
+
+    async def start_pool(self):
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, mp_context=context, initializer=init_worker)
+        # build the parser in every worker now rather than on the first requests
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, compile_source, "")
+                               for _ in range(self.jobs)))
+
+    async def restart_pool(self, broken):
+        """Replace the pool `broken`, unless another request already did."""
+        async with self.pool_lock:
+            if self.pool is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.restarts += 1
+            await self.start_pool()
+
+    def claim_path(self):
+        """Remove the socket a server that died left at `path`. Anything
+        else there, or a server still answering on it, is an error."""
+        try:
+            mode = os.lstat(self.path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError(f"{self.path} exists and is not a socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except ConnectionRefusedError:
+            os.remove(self.path)
+            return
+        finally:
+            probe.close()
+        raise OSError(f"a compile server is already listening on {self.path}")
+
+    async def start(self):
+        self.claim_path()
+        self.pool_lock = asyncio.Lock()
+        await self.start_pool()
+        self.server = await asyncio.start_unix_server(self.handle, self.path, limit=MAX_REQUEST_BYTES)
+
+    async def serve_forever(self):
+        """Serve until SIGINT or SIGTERM, then shut the workers down."""
+        await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+        # only a server that started owns the socket at path
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    async def handle(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self.respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def respond(self, line, writer, lock):
+        start = time.perf_counter()
+        response = await self.process(line)
+        response["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        async with lock:
+            try:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def process(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+        except ValueError as e:
+            return {"id": None, "ok": False, "error": f"bad request: {e}"}
+        response = {"id": request.get("id")}
+        op = request.get("op", "compile")
+        if op == "ping":
+            response.update(ok=True, requests=self.requests, jobs=self.jobs, restarts=self.restarts)
+        elif op == "compile" and isinstance(request.get("source"), str):
+            self.requests += 1
+            try:
+                diagnostics, ir_text, seconds = await self.run_compile(request["source"])
+            except BrokenProcessPool:
+                response.update(ok=False, error="compile failed: the worker process died; workers were restarted")
+                return response
+            except Exception as e:
+                response.update(ok=False, error=f"compile failed: {e}")
+                return response
+            response.update(ok=not diagnostics,
+                            diagnostics=[{"phase": p, "message": m} for p, m in diagnostics],
+                            ir=ir_text, compile_ms=round(seconds * 1000, 3))
+        else:
+            response.update(ok=False, error=f"bad request: unknown op '{op}' or missing source")
+        return response
+
+    async def run_compile(self, source):
+        """compile_source(source) on the pool. A pool that was already broken
+        when the request arrived is restarted and the request resubmitted;
+        one that breaks while running it is restarted and the error raised,
+        as the source may be what killed the worker."""
+        loop = asyncio.get_running_loop()
+        for _ in range(2):
+            async with self.pool_lock:
+                pool = self.pool
+            try:
+                future = loop.run_in_executor(pool, compile_source, source)
+            except BrokenProcessPool:
+                await self.restart_pool(pool)
+                continue
+            try:
+                return await future
+            except BrokenProcessPool:
+                await self.restart_pool(pool)
+                raise
+        raise BrokenProcessPool("the worker pool broke again while restarting")
+
+
+def serve(path, jobs=None):
+    """Run a CompileServer on `path` until interrupted."""
+    asyncio.run(CompileServer(path, jobs).serve_forever())
+
+
+class CompileClient(object):
+    """Blocking client for one CompileServer connection."""
+
+    def __init__(self, path, timeout=None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(path)
+        self.file = self.socket.makefile("rb")
+        self.next_id = 0
+
+    def request(self, request):
+        self.next_id += 1
+        request = dict(request, id=self.next_id)
+        self.socket.sendall(json.dumps(request).encode() + b"\n")
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("compile server closed the connection")
+        return json.loads(line)
+
+    def compile(self, source):
+        return self.request({"source": source})
+
+    def ping(self):
+        return self.request({"op": "ping"})
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import sys
+import time
+
+from Batch import BatchWorker
+
+POLL_INTERVAL = 0.2
+# a burst of saves (editor swap files, formatters) settles within this long
+DEBOUNCE_SECONDS = 0.1
+MAX_CACHED_RESULTS = 1024
+
+
+class Watcher(object):
+    """Recompiles source files when their content changes.
+
+    `scan` returns (root, paths) and is called on every poll, so files
+    added to a watched directory are picked up. Files are polled with
+    os.stat; a changed mtime or size only triggers a recompile when the
+    content hash differs from the last compiled version. Results are kept
+    in memory by content hash, so undoing an edit is answered from the
+    cache. With out_dir, every recompile rewrites that file's .ir and
+    .diag as in batch mode."""
+
+    def __init__(self, scan, out_dir=None, interval=POLL_INTERVAL, debounce=DEBOUNCE_SECONDS, stdout=None):
+        self.scan = scan
+        self.out_dir = out_dir
+        self.interval = interval
+        self.debounce = debounce
+        self.stdout = stdout if stdout is not None else sys.stdout
+        self.worker = None
+        self.stats = {}    # path -> (mtime_ns, size) at the last poll
+        self.hashes = {}   # path -> digest of the content last compiled
+        self.results = {}  # digest -> (diagnostics, ir_text)
+
+    def poll(self):
+        """Paths whose stat changed since the last poll; forgets removed files."""
+        root, paths = self.scan()
+        if self.worker is None or self.worker.root != root:
+            self.worker = BatchWorker(root, self.out_dir)
+        changed = set()
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key = (st.st_mtime_ns, st.st_size)
+            if self.stats.get(path) != key:
+                self.stats[path] = key
+                changed.add(path)
+        for path in set(self.stats) - set(paths):
+            del self.stats[path]
+            self.hashes.pop(path, None)
+            if self.out_dir is not None:
+                for suffix in (".ir", ".diag"):
+                    if os.path.exists(self.worker.output_path(path, suffix)):
+                        os.remove(self.worker.output_path(path, suffix))
+            self.write(f"[{time.strftime('%H:%M:%S')}] {path}: removed\n")
+        return changed
+
+    def settle(self, changed):
+        """Wait until no file has changed for `debounce` seconds."""
+        while True:
+            time.sleep(self.debounce)
+            more = self.poll()
+            if not more:
+                return changed
+            changed |= more
+
+    def rebuild(self, paths, quiet=False):
+        """Recompile the files among `paths` whose content changed; returns
+        how many were recompiled. With quiet, only failures are reported."""
+        rebuilt = 0
+        for path in sorted(paths):
+            start = time.perf_counter()
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+            except OSError:
+                continue
+            digest = hashlib.sha256(content).hexdigest()
+            if self.hashes.get(path) == digest:
+                continue
+            self.hashes[path] = digest
+            result = self.results.get(digest)
+            cached = result is not None
+            if not cached:
+                try:
+                    result = self.worker.diagnose_source(content.decode("utf-8"))
+                except UnicodeDecodeError as e:
+                    result = ([("read", str(e))], "")
+                if len(self.results) >= MAX_CACHED_RESULTS:
+                    del self.results[next(iter(self.results))]
+                self.results[digest] = result
+            if self.out_dir is not None:
+                self.worker.write_outputs(path, *result)
+            if result[0] or not quiet:
+                self.report(path, result, time.perf_counter() - start, cached)
+            rebuilt += 1
+        return rebuilt
+
+    def report(self, path, result, seconds, cached):
+        diagnostics, _ = result
+        status = "PASSED" if not diagnostics else f"FAILED ({len(diagnostics)} diagnostics)"
+        note = ", cached" if cached else ""
+        lines = [f"[{time.strftime('%H:%M:%S')}] {path}: {status} in {seconds * 1000:.1f} ms{note}\n"]
+        lines += [f"    {phase}: {message}\n" for phase, message in diagnostics]
+        self.write("".join(lines))
+
+    def write(self, text):
+        self.stdout.write(text)
+        self.stdout.flush()
+
+    def run(self, cycles=None):
+        """Build everything, then poll for changes (forever, or `cycles` times)."""
+        start = time.perf_counter()
+        count = self.rebuild(self.poll(), quiet=True)
+        self.write(f"Built {count} files in {(time.perf_counter() - start) * 1000:.1f} ms; watching for changes\n")
+        while cycles is None or cycles > 0:
+            time.sleep(self.interval)
+            changed = self.poll()
+            if changed:
+                self.rebuild(self.settle(changed))
+            if cycles is not None:
+                cycles -= 1
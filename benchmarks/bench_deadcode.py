@@ -0,0 +1,82 @@
+"""Measure what eliminating functions main never calls saves.
+
+Builds programs from a generated program (see generate.py) plus a
+growing number of generated library functions that nothing calls, and
+compiles each with Compiler three ways: keeping every function, with
+dead-function elimination (the default: no IR for dead functions) and
+with --fast (dead functions are not checked beyond their signatures).
+Prints the best time of REPEAT runs of the semantic and IR phases, the
+only ones elimination changes, for each mode, and the time saved
+against keeping everything next to the compiler's own estimate
+(CompilationResult.saved_seconds). The call graph is built outside
+those phases, so its cost is shown separately.
+
+    python benchmarks/bench_deadcode.py [--live 10] [--repeat 5]
+"""
+import argparse
+import re
+import time
+
+import common
+from CallGraph import CallGraph
+from Compiler import Compiler
+from Instrumentation import Instrumentation
+from generate import generate_program
+
+DEAD = [0, 10, 30, 90]
+MODES = [
+    ("keep", Compiler(eliminate_dead=False)),
+    ("eliminate", Compiler()),
+    ("fast", Compiler(fast=True)),
+]
+
+
+def library(functions, seed):
+    """`functions` generated functions named lib0, lib1, ... and no main."""
+    text = generate_program(functions=functions, comments=0, seed=seed)
+    text = text[:text.index("funk main")]
+    return re.sub(r"\bf(\d+)\(", r"lib\1(", text)
+
+
+def best(compiler, source, repeat):
+    """Fastest semantic + IR seconds over `repeat` compilations, and the
+    last result."""
+    times, result = [], None
+    for _ in range(repeat):
+        instrumentation = Instrumentation()
+        result = compiler.compile(source, instrumentation)
+        times.append(sum(r["wall_seconds"] for r in instrumentation.phases if r["name"] in ("semantic", "ir")))
+    if not result.ok:
+        raise RuntimeError(f"program does not compile: {result.errors()[:3]}")
+    return min(times), result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--live", type=int, default=10, help="functions reachable from main")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    live = generate_program(functions=args.live, comments=0, seed=1)
+    print(f"{'dead':>6}{'mode':>11}{'eliminated':>12}{'sem+IR (ms)':>13}{'saved (ms)':>12}{'estimated (ms)':>16}")
+    for dead in DEAD:
+        source = (library(dead, seed=2) if dead else "") + live
+        ast = Compiler().parse(source).ast
+        graph_seconds = min(timed(lambda: CallGraph(ast)) for _ in range(args.repeat))
+        kept = None
+        for name, compiler in MODES:
+            seconds, result = best(compiler, source, args.repeat)
+            kept = seconds if kept is None else kept
+            print(f"{dead:>6}{name:>11}{len(result.eliminated):>12}{seconds * 1000:>13.1f}"
+                  f"{(kept - seconds) * 1000:>12.1f}{result.saved_seconds * 1000:>16.1f}")
+        print(f"{'':>6}{'call graph':>11}{'':>12}{graph_seconds * 1000:>13.1f}")
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
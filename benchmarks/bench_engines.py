@@ -0,0 +1,88 @@
+"""Compare the execution engines on the benchmark programs.
+
+Each program is first run on IRInterpreter, which counts the IR
+instructions executed; every engine is then timed (best of --repeat runs),
+its output checked against the interpreter's, and its speed reported in
+IR instructions per second (for the Python backend: IR instructions of
+the same program divided by its run time).
+
+With --memory every engine runs once more under tracemalloc and the peak
+memory it allocated through Python is reported. Vectors are the bulk of
+it on large-vector programs such as prefix_sums: a Heap word takes 8
+bytes where a list element takes a pointer plus an int object. The C
+engine's heap is malloc'ed outside Python and is not traced.
+
+    python benchmarks/bench_engines.py [--repeat N] [--memory] [program ...]
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import common
+from IRInterpreter import IRInterpreter
+
+
+def run_engine(name, compiled, stdin=()):
+    """Returns (seconds, exit code, output); setup is not timed."""
+    out = io.StringIO()
+    engine = common.ENGINES[name](*compiled, stdin=list(stdin), stdout=out)
+    start = time.perf_counter()
+    code = engine.run()
+    return time.perf_counter() - start, code, out.getvalue()
+
+
+def peak_memory(name, compiled):
+    """Peak bytes traced while running the engine (setup not included)."""
+    engine = common.ENGINES[name](*compiled, stdin=[], stdout=io.StringIO())
+    tracemalloc.start()
+    try:
+        engine.run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_program(path, engines, repeat, memory=False):
+    compiled = common.compile_file(path)
+    reference = IRInterpreter(compiled[2], stdin=[], stdout=io.StringIO())
+    expected_code = reference.run()
+    expected_output = reference.stdout.getvalue()
+    steps = reference.steps
+    rows = []
+    for name in engines:
+        best = None
+        for _ in range(repeat):
+            seconds, code, output = run_engine(name, compiled)
+            if (code, output) != (expected_code, expected_output):
+                raise RuntimeError(f"{name} disagrees with the interpreter on {path}")
+            best = seconds if best is None else min(best, seconds)
+        peak = peak_memory(name, compiled) if memory and name != "c" else None
+        rows.append((name, best, steps / best, peak))
+    return steps, rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("programs", nargs="*", help="program names (default: all)")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--engines", default=",".join(common.ENGINES))
+    arg_parser.add_argument("--memory", action="store_true", help="also report peak traced memory")
+    args = arg_parser.parse_args()
+    engines = args.engines.split(",")
+
+    print(f"{'program':<16}{'IR instrs':>12}  {'engine':<12}{'seconds':>9}{'Minstr/s':>10}{'speedup':>9}"
+          + (f"{'peak MiB':>10}" if args.memory else ""))
+    for path in common.program_paths(args.programs):
+        name = path.rsplit("/", 1)[-1][:-4]
+        steps, rows = bench_program(path, engines, args.repeat, args.memory)
+        baseline = rows[0][1]
+        for engine, seconds, ips, peak in rows:
+            memory = "" if not args.memory else f"{peak / 2 ** 20:>10.1f}" if peak is not None else f"{'-':>10}"
+            print(f"{name:<16}{steps:>12}  {engine:<12}{seconds:>9.4f}{ips / 1e6:>10.2f}{baseline / seconds:>8.2f}x"
+                  + memory)
+            name, steps = "", ""
+
+
+if __name__ == "__main__":
+    main()
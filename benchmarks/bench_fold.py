@@ -0,0 +1,128 @@
+"""Measure what evaluating calls with constant arguments at compile time saves.
+
+Compiles each program twice, with folding off (the default) and on
+(Compiler(fold_steps=FOLD_STEPS), see PartialEvaluator), checks that
+both print the same on every engine and prints how many calls were
+folded, the best compile time of each, and the best run time of each on
+every engine.
+The programs call pure functions with constant arguments inside loops,
+one of them too long to fold within the step budget. The python engine
+translates the AST, not the IR, so folding leaves it unchanged.
+
+    python benchmarks/bench_fold.py [--repeat 3] [--engines interpreter,closure]
+"""
+import argparse
+import io
+import time
+
+import common
+from Compiler import Compiler
+from PartialEvaluator import FOLD_STEPS
+
+PROGRAMS = {
+    "constants": """
+funk square(x as int) <int> {
+    return x * x;
+}
+
+funk sum_to(n as int) <int> {
+    s :: int = 0;
+    for (i = 1 to n) s = s + i;
+    return s;
+}
+
+funk main() <int> {
+    total :: int = 0;
+    for (i = 0 to 2000) total = total + sum_to(100) + square(12) - square(3 + 4);
+    print(total);
+    return 0;
+}
+""",
+    "binomials": """
+funk fact(n as int) <int> {
+    if [[ n <= 1 ]] return 1;
+    return n * fact(n - 1);
+}
+
+funk binom(n as int, k as int) <int> {
+    return fact(n) / (fact(k) * fact(n - k));
+}
+
+funk main() <int> {
+    total :: int = 0;
+    for (i = 0 to 1000) total = total + binom(20, 10) - binom(20, 9) + binom(12, 6);
+    print(total);
+    return 0;
+}
+""",
+    "over budget": """
+funk fib(n as int) <int> {
+    if [[ n < 2 ]] return n;
+    return fib(n - 1) + fib(n - 2);
+}
+
+funk main() <int> {
+    print(fib(10) + fib(22));
+    return 0;
+}
+""",
+}
+
+MODES = [("plain", Compiler()), ("folded", Compiler(fold_steps=FOLD_STEPS))]
+
+
+def best_compile(compiler, source, repeat):
+    """Fastest compilation seconds over `repeat` runs, and the last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = compiler.compile(source)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    if not result.ok:
+        raise RuntimeError(f"program does not compile: {result.errors()[:3]}")
+    return best, result
+
+
+def best_run(engine, result, repeat):
+    """(best seconds, exit code and output)."""
+    best, outcome = None, None
+    for _ in range(repeat):
+        out = io.StringIO()
+        program = common.ENGINES[engine](result.ast, result.symbol_table, result.ir, stdin=[], stdout=out)
+        start = time.perf_counter()
+        code = program.run()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+        outcome = (code, out.getvalue())
+    return best, outcome
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--engines", default="interpreter,closure,python,c")
+    args = arg_parser.parse_args()
+    engines = args.engines.split(",")
+
+    print(f"{'program':<13}{'folded':>8}{'compile (ms)':>14}{'+ fold (ms)':>13}"
+          f"{'engine':>13}{'plain (s)':>11}{'folded (s)':>12}{'speedup':>9}")
+    for name, source in PROGRAMS.items():
+        (plain_compile, plain), (fold_compile, folded) = (best_compile(c, source, args.repeat) for _, c in MODES)
+        count = f"{sum(1 for f in folded.folded if f['reason'] is None)}/{len(folded.folded)}"
+        row = f"{name:<13}{count:>8}{plain_compile * 1000:>14.1f}{(fold_compile - plain_compile) * 1000:>13.1f}"
+        for engine in engines:
+            plain_seconds, expected = best_run(engine, plain, args.repeat)
+            fold_seconds, got = best_run(engine, folded, args.repeat)
+            if got != expected:
+                raise RuntimeError(f"{engine}: folded {name} prints {got!r}, expected {expected!r}")
+            print(f"{row}{engine:>13}{plain_seconds:>11.4f}{fold_seconds:>12.4f}"
+                  f"{plain_seconds / fold_seconds:>8.1f}x")
+            row = " " * 48
+        for call in folded.folded:
+            if call["reason"] is not None:
+                print(f"  kept line {call['line']}: {call['call']} ({call['reason']})")
+
+
+if __name__ == "__main__":
+    main()
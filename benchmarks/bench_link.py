@@ -0,0 +1,106 @@
+"""Time incremental multi-file builds and the linker.
+
+Splits a generated program (see generate.py) into one file per group of
+FUNCTIONS_PER_FILE functions and builds it with Linker.Build: a clean
+build, a rebuild with nothing changed, and a rebuild after editing one
+function body. The single-file compile of the same program is shown for
+comparison. Then it links the objects of programs with a growing number
+of files and prints the link time per object and the growth exponent of
+the link time (1 is linear).
+
+    python benchmarks/bench_link.py [--files 40] [--repeat 5]
+"""
+import argparse
+import math
+import os
+import re
+import tempfile
+import time
+
+import common
+from Compiler import Compiler
+from Linker import Build, ObjectFile, link
+from generate import generate_program
+
+FUNCTIONS_PER_FILE = 2
+LINK_FILES = [10, 20, 40, 80, 160, 320]
+
+
+def write_program(directory, files, seed=0):
+    """Write a generated program split into `files` files; returns the
+    source directory and the single-file text."""
+    text = generate_program(functions=files * FUNCTIONS_PER_FILE - 1, statements=8, comments=0, seed=seed)
+    chunks = re.split(r"(?m)^(?=funk )", text)
+    chunks = [c for c in chunks if c.strip()]
+    source_dir = os.path.join(directory, "src")
+    os.makedirs(source_dir, exist_ok=True)
+    for i in range(files):
+        with open(os.path.join(source_dir, f"part{i:04}.txt"), "w") as f:
+            f.write("".join(chunks[i * FUNCTIONS_PER_FILE:(i + 1) * FUNCTIONS_PER_FILE]))
+    return source_dir, text
+
+
+def timed(function):
+    start = time.perf_counter()
+    value = function()
+    return time.perf_counter() - start, value
+
+
+def check(summary):
+    if summary["program"] is None:
+        raise RuntimeError(f"build failed: {summary['diagnostics'][:3]}")
+    return summary
+
+
+def bench_rebuild(files):
+    with tempfile.TemporaryDirectory() as directory:
+        source_dir, text = write_program(directory, files)
+        build = Build(os.path.join(directory, "build"))
+        single, _ = timed(lambda: Compiler().compile(text))
+        clean, _ = timed(lambda: check(build.run(source_dir)))
+        unchanged, _ = timed(lambda: check(build.run(source_dir)))
+        path = os.path.join(source_dir, f"part{files // 2:04}.txt")
+        with open(path) as f:
+            edited = f.read().replace("return s;", "return s + 1;", 1)
+        with open(path, "w") as f:
+            f.write(edited)
+        one, summary = timed(lambda: check(build.run(source_dir)))
+    print(f"{files} files, {files * FUNCTIONS_PER_FILE} functions")
+    print(f"{'single-file compile':<28}{single:>8.3f}s")
+    print(f"{'clean build':<28}{clean:>8.3f}s")
+    print(f"{'rebuild, nothing changed':<28}{unchanged:>8.3f}s")
+    print(f"{'rebuild, one file edited':<28}{one:>8.3f}s  ({len(summary['compiled'])} recompiled)")
+
+
+def bench_link(repeat):
+    print(f"\n{'files':>6}{'IR lines':>10}{'link (ms)':>11}{'per object (us)':>17}")
+    points = []
+    for files in LINK_FILES:
+        with tempfile.TemporaryDirectory() as directory:
+            source_dir, _ = write_program(directory, files)
+            build_dir = os.path.join(directory, "build")
+            check(Build(build_dir).run(source_dir))
+            objects = [ObjectFile.load(os.path.join(build_dir, name))
+                       for name in sorted(os.listdir(build_dir)) if name.endswith(".tso")]
+        seconds = min(timed(lambda: link(objects))[0] for _ in range(repeat))
+        lines = sum(len(o.data) + len(o.code) for o in objects)
+        points.append((files, seconds))
+        print(f"{files:>6}{lines:>10}{seconds * 1000:>11.2f}{seconds / files * 1e6:>17.1f}")
+    xs = [math.log(f) for f, _ in points]
+    ys = [math.log(s) for _, s in points]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    slope = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+    print(f"link time exponent: {slope:.2f}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--files", type=int, default=40)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+    bench_rebuild(args.files)
+    bench_link(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
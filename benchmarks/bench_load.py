@@ -0,0 +1,88 @@
+"""Compare the time to load a compiled program from IR text and from a
+binary bytecode module.
+
+A program with many functions is generated, compiled once, and written
+both as IR text and as a .tslb module. Loading the text means reading it,
+running parse_ir and decode_program; loading the module means
+Bytecode.load. Both must yield the same procs.
+
+    python benchmarks/bench_load.py [--functions N] [--repeat R]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import common
+import Bytecode
+from IRInterpreter import parse_ir, decode_program
+
+FUNCTION = """funk f{i}(a as int, b as int) <int> {{
+    s :: int = 0;
+    for (k = 0 to a) begin
+        if [[ k > b && (k < 10 || a == b) ]] s = s + k * {i}; else s = s - k;
+        while [[ s > 100 ]] s = s - b;
+    end
+    v :: vector = [1, 2, 3, a, b];
+    print("f{i}");
+    return s + v[3] + f{previous}(a, b);
+}}"""
+
+
+def generate_program(functions):
+    parts = [FUNCTION.format(i=i, previous=max(i - 1, 0)) for i in range(functions)]
+    parts.append("funk main() <int> { return f0(1, 2); }")
+    return "\n".join(parts)
+
+
+def load_text(path):
+    with open(path) as f:
+        procs, _ = decode_program(parse_ir(f.read()))
+    return procs
+
+
+def signature(procs):
+    """Comparable form of decoded procs (callees are DecodedProc objects)."""
+    return [(name, proc.nregs, [tuple(getattr(x, "name", x) for x in instruction) for instruction in proc.code])
+            for name, proc in procs.items()]
+
+
+def best_of(repeat, load, path):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        procs = load(path)
+        times.append(time.perf_counter() - start)
+    return min(times), procs
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--functions", type=int, default=2000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    _, _, ir_text = common.compile_source(generate_program(args.functions))
+    with tempfile.TemporaryDirectory() as directory:
+        text_path = os.path.join(directory, "program.ir")
+        module_path = os.path.join(directory, "program" + Bytecode.SUFFIX)
+        with open(text_path, "w") as f:
+            f.write(ir_text)
+        Bytecode.write_module(ir_text, module_path)
+
+        text_seconds, text_procs = best_of(args.repeat, load_text, text_path)
+        module_seconds, module = best_of(args.repeat, Bytecode.load, module_path)
+        if signature(text_procs) != signature(module.procs):
+            raise RuntimeError("the bytecode module decodes differently from the IR text")
+        text_size, module_size = os.path.getsize(text_path), os.path.getsize(module_path)
+
+    instructions = sum(len(p.code) for p in text_procs.values())
+    print(f"{args.functions + 1} procs, {instructions} instructions")
+    print(f"{'format':<10}{'bytes':>12}{'load (s)':>12}")
+    print(f"{'IR text':<10}{text_size:>12}{text_seconds:>12.4f}")
+    print(f"{'bytecode':<10}{module_size:>12}{module_seconds:>12.4f}")
+    print(f"bytecode loads {text_seconds / module_seconds:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
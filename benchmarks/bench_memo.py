@@ -0,0 +1,111 @@
+"""Measure what memoizing pure functions saves on recursive programs.
+
+Compiles each program twice, plain and with its pure functions memoized
+(see Purity and Compiler(memoize=True)), runs both on every engine and
+prints the best run time of each (setup, such as building the C library,
+is not timed), the speedup and the hit rate of the memo tables. Besides
+the recursive benchmark programs it runs collatz, whose memoized function
+is never called twice with the same argument, to show what a lookup that
+never hits costs.
+
+    python benchmarks/bench_memo.py [--repeat 3] [--engines interpreter,closure]
+"""
+import argparse
+import io
+import os
+import time
+
+import common
+from Compiler import Compiler
+
+PROGRAMS = {
+    "fib": None,
+    "ackermann": None,
+    "collatz": None,
+    "binomial": """
+funk binom(n as int, k as int) <int> {
+    if [[ k == 0 ]] return 1;
+    if [[ k == n ]] return 1;
+    return binom(n - 1, k - 1) + binom(n - 1, k);
+}
+
+funk main() <int> {
+    print(binom(20, 10));
+    return 0;
+}
+""",
+    "partitions": """
+funk parts(n as int, k as int) <int> {
+    if [[ n == 0 ]] return 1;
+    if [[ n < 0 ]] return 0;
+    if [[ k == 0 ]] return 0;
+    return parts(n - k, k) + parts(n, k - 1);
+}
+
+funk main() <int> {
+    print(parts(45, 45));
+    return 0;
+}
+""",
+}
+
+
+def source_of(name):
+    if PROGRAMS[name] is not None:
+        return PROGRAMS[name]
+    with open(os.path.join(common.PROGRAMS, name + ".txt")) as f:
+        return f.read()
+
+
+def compile_program(source, memoize):
+    result = Compiler(memoize=memoize).compile(source)
+    if not result.ok:
+        raise RuntimeError(f"program does not compile: {result.errors()[:3]}")
+    return result
+
+
+def best_run(engine, result, repeat):
+    """(best seconds, exit code and output, memo stats of the last run)."""
+    best, outcome, stats = None, None, {}
+    for _ in range(repeat):
+        out = io.StringIO()
+        program = common.ENGINES[engine](result.ast, result.symbol_table, result.ir,
+                                          memoize=result.memoized, stdin=[], stdout=out)
+        start = time.perf_counter()
+        code = program.run()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+        outcome = (code, out.getvalue())
+        stats = program.memo_stats() if hasattr(program, "memo_stats") else {}
+    return best, outcome, stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--engines", default="interpreter,closure,python,c")
+    args = arg_parser.parse_args()
+    engines = args.engines.split(",")
+
+    print(f"{'program':<12}{'memoized':<12}{'engine':<13}{'plain (s)':>10}{'memo (s)':>10}"
+          f"{'speedup':>9}{'hits':>9}{'misses':>8}{'hit rate':>10}")
+    for name in PROGRAMS:
+        source = source_of(name)
+        plain, memoized = compile_program(source, False), compile_program(source, True)
+        label = ",".join(memoized.memoized)
+        for engine in engines:
+            plain_seconds, expected, _ = best_run(engine, plain, args.repeat)
+            memo_seconds, got, stats = best_run(engine, memoized, args.repeat)
+            if got != expected:
+                raise RuntimeError(f"{engine}: memoized {name} prints {got!r}, expected {expected!r}")
+            hits = sum(s["hits"] for s in stats.values())
+            misses = sum(s["misses"] for s in stats.values())
+            rate = f"{hits / (hits + misses):.1%}" if hits + misses else "-"
+            print(f"{name:<12}{label:<12}{engine:<13}{plain_seconds:>10.4f}{memo_seconds:>10.4f}"
+                  f"{plain_seconds / memo_seconds:>8.1f}x{hits if stats else '-':>9}"
+                  f"{misses if stats else '-':>8}{rate if stats else '-':>10}")
+            name, label = "", ""
+
+
+if __name__ == "__main__":
+    main()
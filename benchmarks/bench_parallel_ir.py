@@ -0,0 +1,57 @@
+"""Measure how per-function IR generation scales with worker processes.
+
+Generates a program (see generate.py) and times IRGenerator.generate on
+it with jobs=1 and on a process pool of each worker count, checking
+that every run produces the IR of jobs=1 byte for byte. Prints the best
+time of each, the speedup over jobs=1 and the parallel efficiency
+(speedup / workers). The speedup is bounded by the CPUs available (shown
+in the header) and by forking the pool, which the time includes.
+
+    python benchmarks/bench_parallel_ir.py [--functions 400] [--statements 20] [--jobs 1,2,4,8] [--repeat 3]
+"""
+import argparse
+import os
+import time
+
+import common
+from IRGenerator import IRGenerator
+from generate import generate_program
+
+
+def best_generate(ast, symbol_table, jobs, repeat):
+    """(fastest seconds over `repeat` runs, IR text)."""
+    best, ir_text = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ir_text = IRGenerator().generate(ast, symbol_table, jobs=jobs)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, ir_text
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--functions", type=int, default=400)
+    arg_parser.add_argument("--statements", type=int, default=20)
+    arg_parser.add_argument("--jobs", default="1,2,4,8")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    source = generate_program(functions=args.functions, statements=args.statements, seed=0)
+    ast, symbol_table = common.check_source(source)
+    serial, expected = best_generate(ast, symbol_table, 1, args.repeat)
+    print(f"{args.functions + 1} functions, {len(expected.splitlines())} IR lines, {os.cpu_count()} CPUs")
+    print(f"{'jobs':>5}{'seconds':>10}{'speedup':>9}{'efficiency':>12}")
+    print(f"{1:>5}{serial:>10.3f}{1:>8.2f}x{1:>12.0%}")
+    for jobs in (int(j) for j in args.jobs.split(",")):
+        if jobs <= 1:
+            continue
+        seconds, ir_text = best_generate(ast, symbol_table, jobs, args.repeat)
+        if ir_text != expected:
+            raise RuntimeError(f"jobs={jobs} generates different IR than jobs=1")
+        speedup = serial / seconds
+        print(f"{jobs:>5}{seconds:>10.3f}{speedup:>8.2f}x{speedup / jobs:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare dynamic IR instruction counts with and without profile-guided
+optimization.
+
+Each program is compiled, run once under Profiler (with its .in file as
+input) to collect a profile, then recompiled with that profile. Both
+builds run on IRInterpreter; their output must match, and the number of
+IR instructions executed and the run time of each are reported.
+
+    python benchmarks/bench_pgo.py [program ...]
+"""
+import argparse
+import io
+import time
+
+import common
+from IRInterpreter import IRInterpreter
+from Profiler import Profiler, ExecutionProfile
+
+
+def run(ir_text, stdin):
+    """Returns (instructions executed, seconds, exit code, output)."""
+    interpreter = IRInterpreter(ir_text, stdin=list(stdin), stdout=io.StringIO())
+    start = time.perf_counter()
+    code = interpreter.run()
+    seconds = time.perf_counter() - start
+    return interpreter.steps, seconds, code, interpreter.stdout.getvalue()
+
+
+def bench_program(path):
+    with open(path) as f:
+        ast, symbol_table = common.check_source(f.read())
+    stdin = common.program_input(path)
+    ir_text, source_lines = common.generate_ir(ast, symbol_table)
+    profiler = Profiler(ir_text, source_lines=source_lines, stdin=list(stdin), stdout=io.StringIO())
+    profiler.run()
+    profile = ExecutionProfile(profiler.profile())
+    pgo_text, _ = common.generate_ir(ast, symbol_table, profile=profile)
+    before, after = run(ir_text, stdin), run(pgo_text, stdin)
+    if before[2:] != after[2:]:
+        raise RuntimeError(f"the PGO build of {path} disagrees with the plain build")
+    return before[:2], after[:2]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("programs", nargs="*", help="program names (default: all)")
+    args = arg_parser.parse_args()
+
+    print(f"{'program':<16}{'IR instrs':>12}{'with PGO':>12}{'saved':>8}{'seconds':>10}{'with PGO':>10}")
+    paths = common.program_paths(args.programs, common.CORPUS) + common.program_paths(args.programs)
+    for path in paths:
+        name = path.rsplit("/", 1)[-1][:-4]
+        (steps, seconds), (pgo_steps, pgo_seconds) = bench_program(path)
+        saved = 1 - pgo_steps / steps if steps else 0
+        print(f"{name:<16}{steps:>12}{pgo_steps:>12}{saved:>8.1%}{seconds:>10.4f}{pgo_seconds:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Time every compiler phase on generated programs of growing size.
+
+Each axis scales one parameter of generate.py while the others stay at
+BASE. For every scale the program is compiled REPEAT times with
+Instrumentation, and the fastest time of each phase is kept. The phases
+are preprocess (remove_comments), lexical, syntax (PLY parser), semantic
+(semanticChecker) and ir (IRGenerator).
+
+Per axis the script prints the times and a growth exponent for each
+phase. The exponent is the least-squares slope of log(time) against
+log(size) across the scales, where size is source bytes for preprocess
+and tokens for every later phase. About 1 is linear; exponents
+above SUPERLINEAR are marked with "!". Results are compared with the
+stored baseline, benchmarks/baselines/phases.json, which --save-baseline
+rewrites.
+
+    python benchmarks/bench_phases.py [--axes functions,depth] [--repeat 5]
+                                       [--output curves.json] [--save-baseline]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+
+import common
+from Batch import BatchWorker
+from Instrumentation import Instrumentation
+from generate import generate_program
+
+PHASES = ["preprocess", "lexical", "syntax", "semantic", "ir"]
+BASE = dict(functions=10, statements=10, depth=2, nesting=1, vector_size=8,
+            strings=0.1, comments=0.1, comment_nesting=2)
+AXES = {
+    "functions": [5, 10, 20, 40, 80],
+    "statements": [5, 10, 20, 40, 80],
+    "depth": [1, 2, 3, 4, 5, 6],
+    "nesting": [0, 1, 2, 4, 8],
+    "vector_size": [8, 64, 256, 1024, 4096],
+    "strings": [0.0, 0.25, 0.5, 1.0],
+    "comments": [0.0, 0.25, 0.5, 1.0],
+    "comment_nesting": [0, 2, 4, 8, 16],
+}
+SUPERLINEAR = 1.2
+BASELINE = os.path.join(common.ROOT, "benchmarks", "baselines", "phases.json")
+
+
+def measure(worker, source, repeat):
+    """Fastest seconds of every phase over `repeat` compilations, plus counts."""
+    best, counts = {}, {}
+    for _ in range(repeat):
+        instrumentation = Instrumentation()
+        diagnostics, _ = worker.diagnose_source(source, instrumentation)
+        if diagnostics:
+            raise RuntimeError(f"generated program does not compile: {diagnostics[:3]}")
+        for record in instrumentation.phases:
+            name = record["name"]
+            best[name] = min(best.get(name, math.inf), record["wall_seconds"])
+            counts.update(record["counts"])
+    return best, counts
+
+
+def exponent(points, phase):
+    """Least-squares slope of log(time) against log(size), or None when
+    the axis does not at least double the size. Size is source bytes for
+    preprocess and tokens for the phases after it."""
+    size = "bytes" if phase == "preprocess" else "tokens"
+    points = [p for p in points if p["phases"].get(phase)]
+    if len(points) < 2 or points[-1][size] < 2 * points[0][size]:
+        return None
+    xs = [math.log(p[size]) for p in points]
+    ys = [math.log(p["phases"][phase]) for p in points]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+
+def run_axis(worker, axis, repeat):
+    points = []
+    for value in AXES[axis]:
+        source = generate_program(**dict(BASE, **{axis: value}))
+        phases, counts = measure(worker, source, repeat)
+        points.append({"value": value, "bytes": len(source), "tokens": counts.get("tokens"), "phases": phases})
+    return points
+
+
+def report_axis(axis, points, baseline):
+    print(f"\n{axis}")
+    header = f"{'value':>8}{'bytes':>10}{'tokens':>9}" + "".join(f"{p:>12}" for p in PHASES) + f"{'total':>10}"
+    print(header + ("  vs baseline" if baseline else ""))
+    base_points = {p["value"]: p for p in baseline or []}
+    for point in points:
+        total = sum(point["phases"].values())
+        line = f"{point['value']:>8}{point['bytes']:>10}{point['tokens']:>9}" + \
+               "".join(f"{point['phases'][p] * 1000:>10.2f}ms" for p in PHASES) + f"{total * 1000:>8.1f}ms"
+        if point["value"] in base_points:
+            line += f"  {total / sum(base_points[point['value']]['phases'].values()):>10.2f}x"
+        print(line)
+    slopes = []
+    for phase in PHASES:
+        slope = exponent(points, phase)
+        slopes.append("       n/a" if slope is None else f"{slope:>9.2f}{'!' if slope > SUPERLINEAR else ' '}")
+    print(f"{'exponent':>27}" + "".join(f"{s:>12}" for s in slopes))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--axes", help=f"comma-separated subset of: {', '.join(AXES)}")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--baseline", default=BASELINE, help="baseline file to compare with")
+    arg_parser.add_argument("--save-baseline", action="store_true",
+                            help="store these results as the baseline instead of comparing")
+    arg_parser.add_argument("--output", metavar="PATH", help="also write the scaling curves as JSON")
+    args = arg_parser.parse_args()
+    axes = args.axes.split(",") if args.axes else list(AXES)
+    unknown = [a for a in axes if a not in AXES]
+    if unknown:
+        arg_parser.error(f"unknown axes: {', '.join(unknown)}")
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["axes"]
+
+    worker = BatchWorker()
+    results = {}
+    for axis in axes:
+        results[axis] = run_axis(worker, axis, args.repeat)
+        report_axis(axis, results[axis], baseline.get(axis))
+
+    if args.output:
+        save_results(args.output, results)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        save_results(args.baseline, results)
+        print(f"\n✓ Baseline saved to {args.baseline}")
+
+
+def save_results(path, results):
+    with open(path, "w") as f:
+        json.dump({"python": platform.python_version(), "base": BASE, "axes": results}, f, indent=1)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Time `main.py` end to end with each report backend.
+
+Runs `python main.py FILE --report BACKEND` on a generated program (or
+the given file) and reports two times for each backend. "result" is when
+the compilation summary has been printed. "total" is when the process
+exits, with the report written. Each configuration is run REPEAT times
+and the best is kept.
+
+    python benchmarks/bench_report.py [--functions N] [--repeat R] [FILE]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import common
+from bench_load import generate_program
+
+CONFIGURATIONS = [
+    ("pdf, all tokens", ["--report", "pdf", "--max-tokens", str(10 ** 9)]),
+    ("pdf", ["--report", "pdf"]),
+    ("pdf, no tokens", ["--report", "pdf", "--max-tokens", "0"]),
+    ("text", ["--report", "text"]),
+    ("json", ["--report", "json"]),
+    ("none", ["--report", "none"]),
+]
+
+
+def run(path, options, report_file):
+    command = [sys.executable, "-u", os.path.join(common.ROOT, "main.py"), path, *options]
+    if report_file:
+        command += ["--report-file", report_file]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=common.ROOT, stdout=subprocess.PIPE, text=True)
+    result = None
+    for line in process.stdout:
+        if line.startswith("IR Generation:"):
+            result = time.perf_counter() - start
+    process.wait()
+    total = time.perf_counter() - start
+    if process.returncode or result is None:
+        raise RuntimeError(f"{' '.join(command)} failed")
+    return result, total
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("file", nargs="?", help="program to compile (default: a generated one)")
+    arg_parser.add_argument("--functions", type=int, default=40)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.file
+        if path is None:
+            path = os.path.join(directory, "program.txt")
+            with open(path, "w") as f:
+                f.write(generate_program(args.functions))
+        with open(path) as f:
+            lines = f.read().count("\n") + 1
+        print(f"{path}: {lines} lines")
+        print(f"{'report':<18}{'result (s)':>12}{'total (s)':>12}")
+        for name, options in CONFIGURATIONS:
+            report_file = None if "none" in options else os.path.join(directory, "report")
+            result, total = min(run(path, options, report_file) for _ in range(args.repeat))
+            print(f"{name:<18}{result:>12.3f}{total:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Load-test the compile server.
+
+Starts `main.py --serve` on a temporary socket (or uses --socket), then
+runs CLIENTS concurrent connections, each sending REQUESTS compile
+requests for the benchmark programs one after another. Reports
+throughput and the round-trip and server-side latency percentiles.
+
+    python benchmarks/bench_server.py [--clients 8] [--requests 50] [--jobs N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import common
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def client(path, sources, requests, latencies):
+    reader, writer = await asyncio.open_unix_connection(path, limit=16 * 1024 * 1024)
+    try:
+        for i in range(requests):
+            start = time.perf_counter()
+            writer.write(json.dumps({"id": i, "source": sources[i % len(sources)]}).encode() + b"\n")
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            if not response["ok"]:
+                raise RuntimeError(f"compile failed: {response.get('error') or response['diagnostics']}")
+            latencies.append(((time.perf_counter() - start) * 1000, response["latency_ms"]))
+    finally:
+        writer.close()
+
+
+async def load_test(path, sources, clients, requests):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(path, sources[i:] + sources[:i], requests, latencies)
+                           for i in range(clients)))
+    return time.perf_counter() - start, latencies
+
+
+def wait_for_socket(path, process, timeout=30):
+    deadline = time.time() + timeout
+    while not os.path.exists(path):
+        if process.poll() is not None or time.time() > deadline:
+            raise RuntimeError("the compile server did not start")
+        time.sleep(0.05)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--clients", type=int, default=8)
+    arg_parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    arg_parser.add_argument("--jobs", type=int, help="server workers (default: one per CPU)")
+    arg_parser.add_argument("--socket", help="use a server already listening on this socket")
+    args = arg_parser.parse_args()
+
+    sources = []
+    for path in common.program_paths(None, common.CORPUS) + common.program_paths():
+        with open(path) as f:
+            sources.append(f.read())
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, server = args.socket, None
+        if path is None:
+            path = os.path.join(directory, "compile.sock")
+            command = [sys.executable, os.path.join(common.ROOT, "main.py"), "--serve", path]
+            if args.jobs:
+                command += ["-j", str(args.jobs)]
+            server = subprocess.Popen(command, cwd=common.ROOT, stdout=subprocess.DEVNULL)
+            wait_for_socket(path, server)
+        try:
+            seconds, latencies = asyncio.run(load_test(path, sources, args.clients, args.requests))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    total = len(latencies)
+    print(f"{total} requests from {args.clients} clients in {seconds:.2f}s: {total / seconds:.1f} requests/s")
+    print(f"{'latency (ms)':<14}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}")
+    for name, column in (("round trip", 0), ("server", 1)):
+        values = [latency[column] for latency in latencies]
+        print(f"{name:<14}" + "".join(f"{percentile(values, q):>8.1f}" for q in (0.5, 0.9, 0.99, 1.0)))
+
+
+if __name__ == "__main__":
+    main()
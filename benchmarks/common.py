@@ -0,0 +1,63 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROGRAMS = os.path.join(ROOT, "benchmarks", "programs")
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from lexer import remove_comments  # noqa: E402
+from main import ENGINES, generate_ir_code  # noqa: E402,F401
+from Compiler import parse_program  # noqa: E402
+from SemanticAnalyzer import semanticChecker  # noqa: E402
+
+CORPUS = os.path.join(ROOT, "benchmarks", "corpus")
+
+
+def program_paths(names=None, directory=PROGRAMS):
+    files = sorted(f for f in os.listdir(directory) if f.endswith(".txt"))
+    if names:
+        files = [f for f in files if os.path.splitext(f)[0] in names]
+    return [os.path.join(directory, f) for f in files]
+
+
+def program_input(path):
+    """Integers fed to scan(): the matching .in file, if any."""
+    input_path = path[:-4] + ".in"
+    if not os.path.exists(input_path):
+        return []
+    with open(input_path) as f:
+        return f.read().split()
+
+
+def check_source(source):
+    """Parse and check `source`; returns (ast, symbol_table)."""
+    ast, syntax_errors = parse_program(remove_comments(source))
+    if ast is None or syntax_errors:
+        raise RuntimeError(f"syntax errors: {syntax_errors}")
+    checker = semanticChecker()
+    symbol_table = checker.analyze(ast)
+    if checker.errors:
+        raise RuntimeError(f"semantic errors: {checker.errors}")
+    return ast, symbol_table
+
+
+def generate_ir(ast, symbol_table, profile=None, memoize=(), evaluator=None):
+    """Returns (ir_text, source_lines)."""
+    ir_text, ir_errors, source_lines, _ = generate_ir_code(ast, symbol_table, profile=profile, memoize=memoize,
+                                                           evaluator=evaluator)
+    if ir_errors:
+        raise RuntimeError(f"IR errors: {ir_errors}")
+    return ir_text, source_lines
+
+
+def compile_source(source):
+    """Run the whole pipeline and return (ast, symbol_table, ir_text)."""
+    ast, symbol_table = check_source(source)
+    ir_text, _ = generate_ir(ast, symbol_table)
+    return ast, symbol_table, ir_text
+
+
+def compile_file(path):
+    with open(path) as f:
+        return compile_source(f.read())
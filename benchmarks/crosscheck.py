@@ -0,0 +1,80 @@
+"""Check that every execution engine agrees with the IR interpreter.
+
+Runs the programs in benchmarks/corpus and benchmarks/programs (with the
+matching .in file as input) on each engine and compares exit codes and
+output with IRInterpreter, which defines the IR semantics. With
+--memoize every engine, the interpreter included, runs the program with
+its pure functions memoized (see Purity) and must still match the plain
+interpreter. With --fold the calls of pure functions with constant
+arguments are evaluated at compile time (see PartialEvaluator).
+
+    python benchmarks/crosscheck.py [--engines a,b] [--memoize] [--fold]
+"""
+import argparse
+import io
+import sys
+
+import common
+from CBackend import CBackendError
+from Purity import Purity
+from PartialEvaluator import PartialEvaluator
+
+# raised by engines for programs using features they cannot represent
+UNSUPPORTED = (CBackendError,)
+
+
+def run(name, compiled, stdin, memoize=()):
+    out = io.StringIO()
+    try:
+        engine = common.ENGINES[name](*compiled, memoize=memoize, stdin=list(stdin), stdout=out)
+    except UNSUPPORTED as e:
+        return None, str(e)
+    try:
+        code = engine.run()
+    except Exception as e:
+        return f"error: {e}", out.getvalue()
+    return code, out.getvalue()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--engines")
+    arg_parser.add_argument("--memoize", action="store_true")
+    arg_parser.add_argument("--fold", action="store_true")
+    args = arg_parser.parse_args()
+    engines = (args.engines.split(",") if args.engines else
+               [n for n in common.ENGINES if args.memoize or args.fold or n != "interpreter"])
+
+    passed = failures = skipped = 0
+    paths = common.program_paths(directory=common.CORPUS) + common.program_paths()
+    for path in paths:
+        compiled = common.compile_file(path)
+        stdin = common.program_input(path)
+        expected = run("interpreter", compiled, stdin)
+        memoize = ()
+        if args.memoize or args.fold:
+            ast, symbol_table, _ = compiled
+            purity = Purity(ast)
+            memoize = purity.memoizable() if args.memoize else ()
+            evaluator = PartialEvaluator(ast, symbol_table, purity.pure, purity.reasons) if args.fold else None
+            ir_text, _ = common.generate_ir(ast, symbol_table, memoize=memoize, evaluator=evaluator)
+            compiled = ast, symbol_table, ir_text
+        for name in engines:
+            got = run(name, compiled, stdin, memoize)
+            relative = path[len(common.ROOT) + 1:]
+            if got[0] is None:
+                skipped += 1
+                print(f"skip {name:<12} {relative} ({got[1]})")
+            elif got == expected:
+                passed += 1
+                print(f"ok   {name:<12} {relative}")
+            else:
+                failures += 1
+                print(f"FAIL {name:<12} {relative}")
+                print(f"     expected {expected!r}\n     got      {got!r}")
+    print(f"{passed} passed, {failures} failed, {skipped} skipped")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
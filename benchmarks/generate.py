@@ -0,0 +1,176 @@
+"""Generate valid, deterministic TSLANG programs scaled along several axes.
+
+    python benchmarks/generate.py --functions 50 --statements 20 > program.txt
+
+Every knob of generate_program is a command-line option. Programs pass
+semantic analysis but are meant to be compiled rather than run: loops are
+bounded by the parameters, and calls only go to earlier functions, so
+execution time is not controlled.
+"""
+import argparse
+import random
+
+DEFAULTS = dict(functions=10, statements=10, depth=2, nesting=1, vector_size=8,
+                strings=0.1, comments=0.1, comment_nesting=2, seed=0)
+WORDS = ["alpha", "beta", "gamma", "delta", "tslang", "vector", "while", "funk", "</", "/>", "#"]
+
+
+class ProgramGenerator(object):
+    """Builds one program; see generate_program for the parameters."""
+
+    def __init__(self, functions, statements, depth, nesting, vector_size,
+                 strings, comments, comment_nesting, seed):
+        self.functions = functions
+        self.statements = statements
+        self.depth = depth
+        self.nesting = nesting
+        self.vector_size = vector_size
+        self.strings = strings
+        self.comments = comments
+        self.comment_nesting = comment_nesting
+        self.random = random.Random(seed)
+        self.names = 0
+
+    def fresh(self, prefix):
+        self.names += 1
+        return f"{prefix}{self.names}"
+
+    # --- expressions ---------------------------------------------------------
+
+    def leaf(self, scope):
+        kind = self.random.randrange(5)
+        if kind == 0:
+            return str(self.random.randrange(100))
+        if kind == 1 and scope["vector"]:
+            return f"{scope['vector']}[{self.random.randrange(max(self.vector_size, 1))}]"
+        if kind == 2 and scope["callee"]:
+            return f"{scope['callee']}({self.random.choice(scope['ints'])}, {self.random.randrange(10)})"
+        return self.random.choice(scope["ints"])
+
+    def expr(self, scope, depth):
+        """An int expression with `depth` levels of binary operators."""
+        if depth <= 0:
+            return self.leaf(scope)
+        op = self.random.choice("+-*")
+        return f"({self.expr(scope, depth - 1)} {op} {self.expr(scope, depth - 1)})"
+
+    def condition(self, scope):
+        left = f"{self.expr(scope, self.depth // 2)} {self.random.choice(['<', '>', '==', '!=', '<=', '>='])} " \
+               f"{self.random.randrange(50)}"
+        if self.random.random() < 0.3:
+            return f"{left} && {scope['ints'][0]} > 0"
+        return left
+
+    # --- statements ----------------------------------------------------------
+
+    def string(self):
+        words = self.random.choices(WORDS, k=self.random.randrange(2, 8))
+        return '"' + " ".join(words) + '"'
+
+    def comment(self, level=0):
+        words = " ".join(self.random.choices(WORDS[:6], k=4))
+        if level >= self.comment_nesting:
+            return f"</ {words} />"
+        return f"</ {words} {self.comment(level + 1)} {words} />"
+
+    def simple(self, scope):
+        """One statement without nested statements; may declare a variable."""
+        if self.random.random() < self.strings:
+            if self.random.random() < 0.5:
+                return [f"print({self.string()});"]
+            name = self.fresh("t")
+            return [f"{name} :: str = {self.string()};", f"print({name});"]
+        kind = self.random.randrange(4)
+        if kind == 0:
+            name = self.fresh("x")
+            line = f"{name} :: int = {self.expr(scope, self.depth)};"
+            scope["ints"].append(name)
+            return [line]
+        if kind == 1 and scope["vector"]:
+            index = self.random.randrange(max(self.vector_size, 1))
+            return [f"{scope['vector']}[{index}] = {self.expr(scope, self.depth)};"]
+        if kind == 2:
+            return [f"print({self.expr(scope, self.depth)});"]
+        return [f"s = s + {self.expr(scope, self.depth)};"]
+
+    def nested(self, scope, levels):
+        """A statement wrapping `levels` of if/while/for around a block."""
+        if levels <= 0:
+            # variables declared in a block are not visible after it
+            inner = dict(scope, ints=list(scope["ints"]))
+            return ["begin"] + ["    " + line for line in self.simple(inner) + self.simple(inner)] + ["end"]
+        body = self.nested(scope, levels - 1)
+        kind = self.random.randrange(3)
+        if kind == 0:
+            head = f"if [[ {self.condition(scope)} ]]"
+            if self.random.random() < 0.5:
+                other = self.nested(scope, levels - 1)
+                return [head] + ["    " + line for line in body] + ["else"] + ["    " + line for line in other]
+        elif kind == 1:
+            # decrementing a fresh counter keeps the loop finite; the block
+            # keeps the declaration and the loop a single statement
+            counter = self.fresh("w")
+            body = ["begin"] + ["    " + line for line in body] + [f"    {counter} = {counter} - 1;", "end"]
+            loop = [f"{counter} :: int = {self.random.randrange(1, 4)};",
+                    f"while [[ {counter} > 0 ]]"] + ["    " + line for line in body]
+            return ["begin"] + ["    " + line for line in loop] + ["end"]
+        else:
+            head = f"for ({self.fresh('k')} = 0 to {self.random.randrange(1, 4)})"
+        return [head] + ["    " + line for line in body]
+
+    def function(self, index):
+        name = f"f{index}"
+        scope = {"ints": ["a", "b", "s"], "vector": None, "callee": f"f{index - 1}" if index else None}
+        lines = ["s :: int = a;"]
+        if self.vector_size:
+            scope["vector"] = "v"
+            items = [str(self.random.randrange(100)) if i % 4 else "a" for i in range(self.vector_size)]
+            lines.append(f"v :: vector = [{', '.join(items)}];")
+        for i in range(self.statements):
+            if self.random.random() < self.comments:
+                lines.append(self.comment())
+            if self.nesting and i % 3 == 2:
+                lines.extend(self.nested(scope, self.nesting))
+            else:
+                lines.extend(self.simple(scope))
+        lines.append("return s;")
+        body = "".join(f"    {line}\n" for line in lines)
+        return f"funk {name}(a as int, b as int) <int> {{\n{body}}}\n"
+
+    def program(self):
+        parts = [self.comment() + "\n"] if self.comments else []
+        parts += [self.function(i) for i in range(self.functions)]
+        call = f"    print(f{self.functions - 1}(3, 4));\n" if self.functions else ""
+        parts.append(f"funk main() <int> {{\n{call}    return 0;\n}}\n")
+        return "\n".join(parts)
+
+
+def generate_program(**options):
+    """A valid TSLANG program. Options (defaults in DEFAULTS):
+
+    functions        number of funk definitions besides main
+    statements       top-level statements per function body
+    depth            levels of binary operators in each expression
+    nesting          if/while/for levels around every third statement
+    vector_size      elements of the vector literal in each function
+    strings          fraction of statements that print or declare a string
+    comments         fraction of statements preceded by a comment
+    comment_nesting  levels of </ /> nested inside each comment
+    seed             random seed; equal options give equal programs
+    """
+    unknown = set(options) - set(DEFAULTS)
+    if unknown:
+        raise TypeError(f"unknown generator options: {', '.join(sorted(unknown))}")
+    return ProgramGenerator(**dict(DEFAULTS, **options)).program()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for name, default in DEFAULTS.items():
+        arg_parser.add_argument("--" + name.replace("_", "-"), type=type(default), default=default)
+    args = arg_parser.parse_args()
+    print(generate_program(**vars(args)), end="")
+
+
+if __name__ == "__main__":
+    main()
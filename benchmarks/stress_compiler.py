@@ -0,0 +1,85 @@
+"""Check that concurrent Compiler.compile calls give the same results as serial ones.
+
+Compiles the corpus, the benchmark programs, generated programs and a few
+programs with lexical, syntax and semantic errors once serially, then
+ROUNDS times each, shuffled, on a pool of THREADS threads sharing one
+Compiler. Every result must equal the serial one: tokens, diagnostics,
+AST size, symbols, IR and IR source lines. Also reports the throughput of
+both runs; the GIL keeps the threaded run from being faster, this is a
+correctness check.
+
+    python benchmarks/stress_compiler.py [--threads 8] [--rounds 20] [--max-errors N]
+"""
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import common
+from Compiler import Compiler
+from IRGenerator import ast_nodes
+from generate import generate_program
+
+BAD_SOURCES = {
+    "lexical": "funk main() <int> {\n    x :: int = 3 @a;\n    y :: int = ~;\n    return 0; ^\n}\n",
+    "syntax": "funk main() <int> {\n    x :: int = 3 +;\n    return 0;\n}\n",
+    "eof": "funk main() <int> {\n    return 0;\n",
+    "semantic": "funk main() <int> {\n" + "".join(f"    v{i} = {i};\n" for i in range(50)) +
+                "    print(zz);\n    return 0;\n}\n",
+}
+
+
+def sources():
+    named = {}
+    for path in common.program_paths(directory=common.CORPUS) + common.program_paths():
+        with open(path) as f:
+            named[path] = f.read()
+    for seed in range(8):
+        named[f"generated-{seed}"] = generate_program(seed=seed, functions=4 + seed, nesting=seed % 3,
+                                                      depth=1 + seed % 4, strings=0.3, comments=0.3)
+    named.update(BAD_SOURCES)
+    return named
+
+
+def fingerprint(result):
+    tokens = [(t.type, t.value, t.lineno, t.column) for t in result.tokens]
+    symbols = sorted(result.symbol_table.table) if result.symbol_table is not None else None
+    nodes = sum(1 for _ in ast_nodes(result.ast)) if result.ast is not None else None
+    return (tokens, result.diagnostics.to_list(), nodes, symbols, result.ir, list(result.source_lines))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--threads", type=int, default=8)
+    arg_parser.add_argument("--rounds", type=int, default=20)
+    arg_parser.add_argument("--max-errors", type=int, default=0)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    compiler = Compiler(max_errors=args.max_errors)
+    named = sources()
+    start = time.perf_counter()
+    expected = {name: fingerprint(compiler.compile(source)) for name, source in named.items()}
+    serial = time.perf_counter() - start
+
+    jobs = list(named) * args.rounds
+    random.Random(args.seed).shuffle(jobs)
+    # switch threads often so that shared state would be caught mid-phase
+    sys.setswitchinterval(1e-5)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda name: fingerprint(compiler.compile(named[name])), jobs))
+    threaded = time.perf_counter() - start
+
+    mismatches = sorted({name for name, result in zip(jobs, results) if result != expected[name]})
+    for name in mismatches:
+        print(f"MISMATCH {name}")
+    print(f"{len(named)} sources: serial {len(named) / serial:.1f} compiles/s, "
+          f"{args.threads} threads {len(jobs) / threaded:.1f} compiles/s over {len(jobs)} compiles")
+    print(f"{len(jobs) - sum(name in mismatches for name in jobs)} of {len(jobs)} results identical to serial runs")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -146,11 +146,18 @@ def t_whitespace(t):
     pass
 
 
+def lexical_error(t, code, message, length):
+    """Skip `length` characters and report them."""
+    t.lexer.errors.append(f"{message} at line {t.lineno}")
+    t.lexer.skip(length)
+    if t.lexer.diagnostics is not None:
+        t.lexer.diagnostics.report("lexical", code, message, t.lineno, find_column(t.lexer.lexdata, t))
+
+
 def t_error(t):
     # collect, don't print
     if not t.value:
-        t.lexer.errors.append(f"Lexer error: empty token at line {t.lineno}")
-        t.lexer.skip(1)
+        lexical_error(t, "empty-token", "Lexer error: empty token", 1)
         return
     ch = t.value[0]
     error_patterns = {
@@ -168,35 +175,44 @@ def t_error(t):
         if t.value.startswith('"""'):
             match = re.match(r'"""[^"]*', t.value)
             if match:
-                t.lexer.errors.append(f"Unclosed multi-line string at line {t.lineno}")
-                t.lexer.skip(len(match.group(0)))
+                lexical_error(t, "unclosed-string", "Unclosed multi-line string", len(match.group(0)))
                 return
         else:
             match = re.match(rf'{re.escape(ch)}[^{re.escape(ch)}\\]*(?:\\.[^{re.escape(ch)}\\]*)*', t.value)
             if match:
-                t.lexer.errors.append(f"Unclosed string at line {t.lineno}")
-                t.lexer.skip(len(match.group(0)))
+                lexical_error(t, "unclosed-string", "Unclosed string", len(match.group(0)))
                 return
     for first_char, pattern in error_patterns.items():
         if t.value.startswith(first_char):
             match = re.match(pattern, t.value)
             if match:
-                t.lexer.errors.append(f"Illegal token '{match.group(0)}' at line {t.lineno}")
-                t.lexer.skip(len(match.group(0)))
+                lexical_error(t, "illegal-token", f"Illegal token '{match.group(0)}'", len(match.group(0)))
                 return
-    t.lexer.errors.append(f"Illegal character '{ch}' at line {t.lineno}")
-    t.lexer.skip(1)
+    lexical_error(t, "illegal-character", f"Illegal character '{ch}'", 1)
 
 
 lexer = lex.lex()
 lexer.column = 1
 lexer.errors = []  # collect errors here
+lexer.diagnostics = None  # and report them here, when set
 
 
-def reset_lexer_state():
+def reset_lexer_state(diagnostics=None):
     lexer.lineno = 1
     lexer.column = 1
     lexer.errors.clear()
+    lexer.diagnostics = diagnostics
+
+
+def new_lexer(diagnostics=None):
+    """A lexer sharing the rules of `lexer` but with its own input,
+    position and errors, so that threads can lex at the same time."""
+    instance = lexer.clone()
+    instance.lineno = 1
+    instance.column = 1
+    instance.errors = []
+    instance.diagnostics = diagnostics
+    return instance
 
 
 def find_column(input_text, token):
@@ -208,16 +224,22 @@ def find_column(input_text, token):
     return column
 
 
-def tokenize(input_text, *, preprocessed=False):
+def tokenize(input_text, *, preprocessed=False, diagnostics=None, instance=None):
+    """Returns (tokens, error messages); errors are also reported to
+    `diagnostics` (a Diagnostics.Diagnostics), if given. `instance` is a
+    lexer from new_lexer(), which reports to its own diagnostics; by
+    default the module's `lexer` is reset and used."""
     text = input_text if preprocessed else remove_comments(input_text)
-    reset_lexer_state()
-    lexer.input(text)
+    if instance is None:
+        reset_lexer_state(diagnostics)
+        instance = lexer
+    instance.input(text)
     tokens_list = []
     while True:
-        tok = lexer.token()
+        tok = instance.token()
         if not tok:
             break
         tok.column = find_column(text, tok)
-        lexer.column += len(str(tok.value))
+        instance.column += len(str(tok.value))
         tokens_list.append(tok)
-    return tokens_list, list(lexer.errors)
+    return tokens_list, list(instance.errors)
@@ -1,92 +1,168 @@
 import sys
+import argparse
+import contextlib
 from tabulate import tabulate  # optional
-from lexer import lexer as LEXER, tokenize, remove_comments, reset_lexer_state
-import parser
-from SemanticAnalyzer import semanticChecker
 from IRGenerator import IRGenerator
-from fpdf import FPDF
-import io
-import contextlib
-from fpdf.enums import XPos, YPos
-
-class PDFReport(FPDF):
-    def __init__(self):
-        super().__init__()
-        self.add_font("DejaVu", "", "fonts/DejaVuSansMono.ttf")
-        self.set_font("DejaVu", "", 10)
-
-    def header(self):
-        self.set_font("DejaVu", "", 14)
-        self.cell(0, 10, "TSLANG Compilation Report", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
-        self.ln(5)
-
-    def section_title(self, title):
-        self.set_font("DejaVu", "", 12)
-        self.set_text_color(30, 30, 120)
-        self.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-        self.set_text_color(0, 0, 0)
-
-    def add_code_block(self, code):
-        self.set_font("DejaVu", "", 10)
-        self.multi_cell(0, 6, code)
-        self.ln(2)
-
-    def add_table(self, headers, rows):
-        self.set_font("DejaVu", "", 9)
-        col_widths = [25] * len(headers)
-        for i, header in enumerate(headers):
-            self.set_fill_color(220, 220, 220)
-            self.cell(col_widths[i], 8, header, border=1, align="C", fill=True)
-        self.ln()
-        for row in rows:
-            for i, item in enumerate(row):
-                self.cell(col_widths[i], 6, str(item), border=1)
-            self.ln()
-        self.ln(3)
-
-def capture_parsing_output(processed_text):
-    syntax_errors = []
-    semantic_errors = []
-    ast = None
-    output_buffer = io.StringIO()
-
-    reset_lexer_state()
-    try:
-        with contextlib.redirect_stdout(output_buffer):
-            ast = parser.parser.parse(processed_text, lexer=LEXER, tracking=True)
-    except Exception as e:
-        syntax_errors.append(f"Parser exception: {str(e)}")
-
-    captured = output_buffer.getvalue().split('\n')
-    for line in captured:
-        line = line.strip()
-        if not line:
-            continue
-        if 'Syntax error' in line:
-            syntax_errors.append(line)
-        elif 'Semantic error' in line or 'Type mismatch' in line:
-            semantic_errors.append(line)
-
-    success = ast is not None
-    return ast, syntax_errors, semantic_errors, success
-
-def generate_ir_code(ast, symbol_table):
+from IRInterpreter import IRInterpreter
+from ClosureEngine import ClosureEngine
+from Profiler import Profiler, ExecutionProfile
+from PythonBackend import PythonProgram
+from CBackend import CProgram, build_executable
+import Bytecode
+from Report import BACKENDS, TOKEN_LIMIT, open_report
+from Instrumentation import Instrumentation
+from Compiler import Compiler
+from PartialEvaluator import FOLD_STEPS
+
+def generate_ir_code(ast, symbol_table, jobs=1, profile=None, skip=(), memoize=(), evaluator=None):
+    """Returns (ir_text, errors, source_lines, folded); source_lines holds
+    the TSLANG line of every IR line (see IRGenerator.source_lines). The
+    functions named in `skip` get no IR; those in `memoize` get memo
+    tables. With a PartialEvaluator, calls with constant arguments are
+    folded and `folded` records them (see IRGenerator.generate)."""
     ir_instructions = []
     ir_errors = []
+    source_lines = []
+    folded = []
     try:
         if ast:
             ir_generator = IRGenerator()
             ir_generator.symbol_table = symbol_table
-            ir_instructions = ir_generator.generate(ast, symbol_table)
+            ir_instructions = ir_generator.generate(ast, symbol_table, jobs=jobs, profile=profile, skip=skip,
+                                                    memoize=memoize, evaluator=evaluator)
+            source_lines = ir_generator.source_lines
+            folded = ir_generator.folded
         else:
             ir_errors.append("Cannot generate IR: AST is None")
     except Exception as e:
         ir_errors.append(f"IR Generation exception: {str(e)}")
-    return ir_instructions, ir_errors
+    return ir_instructions, ir_errors, source_lines, folded
+
+# name -> factory(ast, symbol_table, ir_text, memoize=, stdin=, stdout=)
+# returning an object whose run() executes main and returns its exit code;
+# the IR engines find the memoized functions in the IR itself
+ENGINES = {
+    "interpreter": lambda ast, table, ir, memoize=(), **io: IRInterpreter(ir, **io),
+    "closure": lambda ast, table, ir, memoize=(), **io: ClosureEngine(ir, **io),
+    "python": lambda ast, table, ir, memoize=(), **io: PythonProgram(ast, table, memoize=memoize, **io),
+    "python-scalar": lambda ast, table, ir, memoize=(), **io: PythonProgram(ast, table, vectorize=False,
+                                                                             memoize=memoize, **io),
+    "c": lambda ast, table, ir, memoize=(), **io: CProgram(ir, **io),
+}
+
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description="TSLANG compiler")
+    arg_parser.add_argument("filename", nargs="?", default="input/sample_code.txt")
+    arg_parser.add_argument("-j", "--jobs", type=int,
+                            help="generate the IR of one file's functions on this many worker processes "
+                                 "(default: 1); with --batch or --serve, compile files on this many "
+                                 "(default: one per CPU)")
+    arg_parser.add_argument("--build", metavar="SOURCES",
+                            help="compile a multi-file program (a directory or a file list) to objects "
+                                 "in --out-dir, recompiling only what changed, and link them")
+    arg_parser.add_argument("--batch", metavar="SOURCES",
+                            help="compile every .txt file in the directory SOURCES, or every file "
+                                 "listed in the file SOURCES, on a process pool")
+    arg_parser.add_argument("--out-dir", default="build",
+                            help="directory for the per-file .ir and .diag outputs of --batch")
+    arg_parser.add_argument("--run", action="store_true",
+                            help="execute the generated IR after compiling")
+    arg_parser.add_argument("--engine", choices=sorted(ENGINES), default="interpreter",
+                            help="execution engine used by --run")
+    arg_parser.add_argument("--native", metavar="OUTPUT",
+                            help="build a native executable from the IR with the system C compiler")
+    arg_parser.add_argument("--pgo", metavar="PROFILE",
+                            help="optimize the IR with a profile written by --exec-profile")
+    arg_parser.add_argument("--exec-profile", metavar="PROFILE",
+                            help="run the IR with execution counting and write a JSON profile "
+                                 "plus a collapsed-stack (.folded) file")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="recompile filename (or the --batch sources) whenever it changes")
+    arg_parser.add_argument("--serve", metavar="SOCKET",
+                            help="run a compile server on the Unix socket SOCKET (workers: -j)")
+    arg_parser.add_argument("--connect", metavar="SOCKET",
+                            help="compile filename on the compile server at SOCKET and print "
+                                 "its diagnostics and IR")
+    arg_parser.add_argument("--report", choices=sorted(BACKENDS), default="pdf",
+                            help="compilation report format; a PDF is rendered in a background process")
+    arg_parser.add_argument("--report-file", metavar="PATH",
+                            help="where to write the report (default: report.pdf/.jsonl/.txt, - for stdout)")
+    arg_parser.add_argument("--max-tokens", type=int, default=TOKEN_LIMIT,
+                            help="rows of the token table in the report; 0 leaves the table out")
+    arg_parser.add_argument("--keep-unreachable", action="store_true",
+                            help="generate IR for functions main never calls, too")
+    arg_parser.add_argument("--fast", action="store_true",
+                            help="check only the signatures of functions main never calls, not their bodies")
+    arg_parser.add_argument("--memoize", action="store_true",
+                            help="keep the results of pure functions in bounded memo tables")
+    arg_parser.add_argument("--fold", action="store_true",
+                            help="evaluate calls of pure functions with constant arguments at compile time")
+    arg_parser.add_argument("--fold-steps", type=int, default=FOLD_STEPS, metavar="N",
+                            help=f"with --fold, fold only calls that take at most N IR instructions "
+                                 f"(default: {FOLD_STEPS})")
+    arg_parser.add_argument("--fold-ms", type=float, default=None, metavar="MS",
+                            help="with --fold, also limit the time all compile-time calls of a compilation "
+                                 "may take; which calls fold then depends on the machine (default: no limit)")
+    arg_parser.add_argument("--max-errors", type=int, default=0, metavar="N",
+                            help="stop compiling after N errors (default: no limit)")
+    arg_parser.add_argument("--profile", metavar="PATH",
+                            help="record wall/CPU time, peak traced memory and counts of every "
+                                 "compiler phase and write them as JSON to PATH (- for stdout)")
+    arg_parser.add_argument("--bytecode", metavar="OUTPUT",
+                            help="also write the IR as a binary bytecode module (.tslb)")
+    arg_parser.add_argument("--disassemble", action="store_true",
+                            help="print the IR of a .tslb module given as filename")
+    return arg_parser.parse_args(argv)
+
 
 def main():
-    filename = sys.argv[1] if len(sys.argv) > 1 else "input/sample_code.txt"
+    args = parse_args()
+    filename = args.filename
+
+    if args.serve:
+        from Server import CompileServer, serve
+        try:
+            CompileServer(args.serve).claim_path()
+        except OSError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"Serving compile requests on {args.serve}")
+        serve(args.serve, args.jobs)
+        return
+    if args.connect:
+        compile_remote(args.connect, filename)
+        return
+
+    if args.watch:
+        watch(filename, args.batch, args.out_dir)
+        return
+
+    if args.batch:
+        batch_compile(args.batch, args.out_dir, args.jobs, args.max_errors)
+        return
 
+    if args.build:
+        build_program(args.build, args.out_dir, args)
+        return
+
+    if filename.endswith(Bytecode.SUFFIX):
+        run_module(filename, args)
+        return
+
+    if args.profile == "-":
+        # stdout carries only the JSON phase profile, so that it can be
+        # piped; the summary, messages and program output go to stderr
+        profile_stream = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            compile_file(filename, args, profile_stream)
+        return
+    compile_file(filename, args)
+
+
+def compile_file(filename, args, profile_stream=None):
+    """Compile one source file and build, run or profile it as `args` say.
+    With --profile -, the JSON profile is written to `profile_stream`."""
     try:
         with open(filename, 'r') as f:
             source_code = f.read()
@@ -97,38 +173,37 @@ def main():
         print(f"Error reading file: {e}")
         return
 
-    processed = remove_comments(source_code)
+    try:
+        report = open_report(args.report, args.report_file, args.max_tokens)
+    except OSError as e:
+        print(f"Error opening report: {e}")
+        return
+    report.source(filename, source_code)
+    try:
+        profile = ExecutionProfile.load(args.pgo) if args.pgo else None
+    except (OSError, ValueError) as e:
+        print(f"Error loading execution profile: {e}")
+        return
 
-    pdf = PDFReport()
-    pdf.add_page()
-    pdf.section_title("Source Code")
-    pdf.add_code_block(source_code)
+    instrumentation = Instrumentation(trace_memory=True, enabled=bool(args.profile))
+    compiler = Compiler(max_errors=args.max_errors, profile=profile, eliminate_dead=not args.keep_unreachable,
+                        fast=args.fast, memoize=args.memoize, fold_steps=args.fold_steps if args.fold else 0,
+                        fold_seconds=None if args.fold_ms is None else args.fold_ms / 1000, jobs=args.jobs or 1)
+    result = compiler.compile(source_code, instrumentation)
+    diagnostics = result.diagnostics
 
     # ---- Lexical Analysis ----
-    try:
-        tokens_list, lex_errors = tokenize(processed, preprocessed=True)
-    except Exception as e:
-        lex_errors = [f"Lexical analysis exception: {e}"]
-        tokens_list = []
-
-    pdf.section_title("Lexical Analysis - Tokens")
-    token_data = [[t.lineno, t.column, t.type, t.value] for t in tokens_list]
-    if token_data:
-        pdf.add_table(["Line", "Column", "Token", "Value"], token_data)
-    else:
-        pdf.add_code_block("(no tokens)")
+    lex_errors = diagnostics.messages("lexical")
+    token_data = [[t.lineno, t.column, t.type, t.value] for t in result.tokens]
+    report.phase("lexical", lex_errors, tokens=token_data)
 
     if lex_errors:
-        pdf.section_title("Lexical Errors")
-        for err in lex_errors:
-            pdf.add_code_block(err)
-
         # ---- Summary (fail-fast) ----
+        print_truncation(diagnostics)
         print("Syntax Analysis: FAILED (skipped due to lexical errors)")
         print("Semantic Analysis: FAILED (skipped due to lexical errors)")
         print("IR Generation: FAILED (skipped due to lexical errors)")
 
-        pdf.section_title("Compilation Summary")
         summary = [
             f"File: {filename}",
             "Lexical Analysis: FAILED",
@@ -136,90 +211,258 @@ def main():
             "Semantic Analysis: FAILED",
             "IR Generation: FAILED",
         ]
-        for line in summary:
-            pdf.add_code_block(line)
+        report.summary(summary)
+        report.close()
+        if args.profile:
+            save_phase_profile(instrumentation, args.profile, filename, profile_stream)
+        finish_report(report)
+        return  # STOP PIPELINE HERE
+
+    # ---- Parsing, Semantic Analysis, IR Generation ----
+    syntax_errors = diagnostics.messages("syntax")
+    report.phase("syntax", syntax_errors)
+    semantic_errors = diagnostics.messages("semantic")
+    report.phase("semantic", semantic_errors)
+    ir_instructions = result.ir
+    ir_errors = diagnostics.messages("ir")
+    if not ir_instructions and not ir_errors:
+        ir_errors = ["IR skipped due to earlier errors"]
+    ir_code_text = "".join(line.strip() + "\n" for line in ir_instructions.split("\n") if line.strip())
+    report.phase("ir", ir_errors, ir=ir_code_text)
+
+    # ---- Summary ----
+    print_truncation(diagnostics)
+    summary = [
+        f"File: {filename}",
+        f"Lexical Analysis: PASSED",
+        f"Syntax Analysis: {'PASSED' if not syntax_errors else 'FAILED'}",
+        f"Semantic Analysis: {'PASSED' if not semantic_errors else 'FAILED'}",
+        f"IR Generation: {'PASSED' if not ir_errors else 'FAILED'}",
+    ]
+    dead = result.eliminated
+    if dead and not ir_errors:
+        # the skipped functions are assumed to cost as much per AST node as the others
+        summary.append(f"Dead functions: eliminated {len(dead)} of {len(result.functions)} "
+                       f"({', '.join(dead)}), about {result.saved_seconds * 1000:.1f} ms saved")
+    if args.memoize and not ir_errors:
+        summary.append(f"Memoized: {', '.join(result.memoized) or 'none'} "
+                       f"(pure: {', '.join(result.pure) or 'none'})")
+    if result.folded and not ir_errors:
+        summary.extend(fold_summary(result.folded))
+    for line in summary:
+        print(line)
+    report.summary(summary)
+    if args.profile:
+        save_phase_profile(instrumentation, args.profile, filename, profile_stream)
+    # a PDF keeps rendering in the background while the program is built and run
+    report.close()
 
+    if args.native and ir_instructions and not ir_errors:
         try:
-            pdf.output("report.pdf")
-            print("✓ Compilation report saved to report.pdf")
+            build_executable(ir_instructions, args.native)
+            print(f"✓ Native executable saved to {args.native}")
         except Exception as e:
-            print(f"Error saving PDF: {e}")
-        return  # STOP PIPELINE HERE
+            print(f"Error building native executable: {e}")
 
+    if args.bytecode and ir_instructions and not ir_errors:
+        try:
+            Bytecode.write_module(ir_instructions, args.bytecode)
+            print(f"✓ Bytecode module saved to {args.bytecode}")
+        except Exception as e:
+            print(f"Error writing bytecode: {e}")
 
-    # ---- Parsing ----
-    pdf.section_title("Syntax and Semantic Analysis")
-    ast, syntax_errors, semantic_errors, parse_ok = capture_parsing_output(processed)
+    if args.exec_profile and ir_instructions and not ir_errors:
+        profile_program(ir_instructions, result.source_lines, args.exec_profile)
+    elif args.run and ir_instructions and not ir_errors:
+        run_program(result.ast, result.symbol_table, ir_instructions, args.engine, result.memoized)
 
-    if syntax_errors:
-        pdf.section_title("Syntax Errors")
-        for err in syntax_errors:
-            pdf.add_code_block(err)
+    finish_report(report)
 
 
-    # ---- Semantic Analysis ----
-    symbol_table = None
-    if ast:
-        try:
-            checker = semanticChecker()
-            symbol_table = checker.analyze(ast)
-            if checker.errors:
-                semantic_errors.extend(checker.errors)
-        except Exception as e:
-            semantic_errors.append(f"Semantic analysis exception: {e}")
+def fold_summary(folded, limit=10):
+    """Summary lines for the calls evaluated at compile time."""
+    done = [f for f in folded if f["value"] is not None]
+    left = [f for f in folded if f["value"] is None]
+    lines = [f"Folded calls: {len(done)} of {len(folded)} with constant arguments"]
+    lines += [f"  line {f['line']}: {f['call']} = {f['value']}" for f in done[:limit]]
+    lines += [f"  line {f['line']}: {f['call']} kept ({f['reason']})" for f in left[:limit]]
+    if len(done) > limit or len(left) > limit:
+        lines.append(f"  ... {max(len(done) - limit, 0) + max(len(left) - limit, 0)} more")
+    return lines
 
-    if semantic_errors:
-        pdf.section_title("Semantic Errors")
-        for err in semantic_errors:
-            pdf.add_code_block(err)
 
+def print_truncation(diagnostics):
+    if diagnostics.truncated:
+        print(f"Stopped after {len(diagnostics)} errors (--max-errors)")
 
-    # ---- IR Generation ----
-    pdf.section_title("Intermediate Representation (IR) Generation")
-    ir_instructions = []
-    ir_errors = []
 
-    if ast and not semantic_errors and not syntax_errors:
-        try:
-            ir_instructions, ir_errors = generate_ir_code(ast, symbol_table)
-            if ir_instructions:
-                pdf.section_title("Generated IR Code (Machine Code)")
-                if isinstance(ir_instructions, str):
-                    instruction_lines = [line.strip() for line in ir_instructions.strip().split('\n') if line.strip()]
-                else:
-                    instruction_lines = ir_instructions
-                ir_code_text = ""
-                for instruction in instruction_lines:
-                    ir_code_text += instruction + "\n"
-                pdf.add_code_block(ir_code_text)
-        except Exception as e:
-            ir_errors.append(f"IR Generation failed: {str(e)}")
+def save_phase_profile(instrumentation, path, filename, stream=None):
+    instrumentation.stop()
+    rows = [[p["name"], f"{p['wall_seconds'] * 1000:.2f}", f"{p['cpu_seconds'] * 1000:.2f}",
+             f"{p['peak_bytes'] / 1024:.1f}", ", ".join(f"{k}={v}" for k, v in p["counts"].items())]
+            for p in instrumentation.phases]
+    print(tabulate(rows, headers=["Phase", "Wall (ms)", "CPU (ms)", "Peak (KiB)", "Counts"]))
+    try:
+        instrumentation.save(path, stream=stream, file=filename)
+        if path != "-":
+            print(f"✓ Phase profile saved to {path}")
+    except OSError as e:
+        print(f"Error saving phase profile: {e}")
+
+
+def finish_report(report):
+    path = report.wait()
+    if path:
+        print(f"✓ Compilation report saved to {path}")
+
+
+def run_program(ast, symbol_table, ir_text, engine="interpreter", memoize=()):
+    try:
+        program = ENGINES[engine](ast, symbol_table, ir_text, memoize=memoize)
+        exit_code = program.run()
+    except Exception as e:
+        print(f"Runtime error: {e}")
+        return
+    print(f"Program exited with code {exit_code}")
+    print_memo_stats(program)
+
+
+def print_memo_stats(program):
+    """Hit rates of the memo tables of `program`; the C engine keeps no
+    counts."""
+    stats = program.memo_stats() if hasattr(program, "memo_stats") else {}
+    for name, s in stats.items():
+        print(f"Memo {name}: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.1%}), "
+              f"{s['entries']} entries")
+
+
+def batch_compile(sources, out_dir, jobs=None, max_errors=0, limit=20):
+    from Batch import compile_batch
+    try:
+        summary = compile_batch(sources, out_dir, jobs, max_errors)
+    except OSError as e:
+        print(f"Error reading sources: {e}")
+        return
+    failed = [r for r in summary["results"] if not r["ok"]]
+    if failed:
+        print(tabulate([[r["file"], r["diagnostics"]] for r in failed[:limit]],
+                       headers=["Failed file", "Diagnostics"]))
+        if len(failed) > limit:
+            print(f"... and {len(failed) - limit} more")
+    print(f"Compiled {summary['files']} files ({summary['passed']} passed, {summary['failed']} failed) "
+          f"on {summary['jobs']} workers in {summary['seconds']:.2f}s: "
+          f"{summary['files_per_second']:.1f} files/s")
+    print(f"✓ IR and diagnostics saved to {out_dir}/")
+
+
+def build_program(sources, out_dir, args):
+    from Linker import Build
+    try:
+        summary = Build(out_dir, Compiler(args.max_errors)).run(sources)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error reading sources: {e}")
+        return
+    for path, phase, message in summary["diagnostics"]:
+        print(f"{path}: {message}" if path else f"Link error: {message}")
+    print(f"Compiled {len(summary['compiled'])} of {summary['files']} files "
+          f"({len(summary['up_to_date'])} up to date) in {summary['compile_seconds']:.2f}s, "
+          f"linked in {summary['link_seconds'] * 1000:.1f}ms")
+    if summary["program"] is None:
+        print("Build FAILED")
+        return
+    print(f"✓ Objects and program IR saved to {out_dir}/")
+    if args.run:
+        run_without_source(summary["ir"], args.engine, "linked IR")
+
+
+def watch(filename, sources=None, out_dir=None):
+    """Recompile on change until interrupted; writes .ir/.diag outputs only
+    when watching --batch sources."""
+    import os
+    from Batch import collect_sources
+    from Watch import Watcher
+    if sources:
+        watcher = Watcher(lambda: collect_sources(sources), out_dir)
     else:
-        ir_errors.append("IR skipped due to earlier errors")
+        watcher = Watcher(lambda: (os.path.dirname(filename), [filename]))
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error reading sources: {e}")
 
-    if ir_errors:
-        pdf.section_title("IR Generation Errors")
-        for err in ir_errors:
-            pdf.add_code_block(err)
 
-    # ---- Summary ----
-    pdf.section_title("Compilation Summary")
-    summary = [
-        f"File: {filename}",
-        f"Lexical Analysis: PASSED",
-        f"Syntax Analysis: {'PASSED' if not syntax_errors else 'FAILED'}",
-        f"Semantic Analysis: {'PASSED' if not semantic_errors else 'FAILED'}",
-        f"IR Generation: {'PASSED' if not ir_errors else 'FAILED'}",
-    ]
-    for line in summary:
-        pdf.add_code_block(line)
-        print(line)
+def compile_remote(socket_path, filename):
+    from Server import CompileClient
+    try:
+        with open(filename) as f:
+            source_code = f.read()
+        with CompileClient(socket_path) as client:
+            response = client.compile(source_code)
+    except OSError as e:
+        print(f"Error: {e}")
+        return
+    if "error" in response:
+        print(f"Error: {response['error']}")
+        return
+    for d in response["diagnostics"]:
+        print(f"{d['phase']}: {d['message']}")
+    print(response["ir"], end="")
+    print(f"Compiled {filename}: {'PASSED' if response['ok'] else 'FAILED'} "
+          f"(compile {response['compile_ms']:.1f} ms, latency {response['latency_ms']:.1f} ms)")
+
+
+def run_module(path, args):
+    """Disassemble and/or run a precompiled .tslb module; there is no
+    source, so only the IR engines can execute it."""
+    try:
+        module = Bytecode.load(path)
+    except (OSError, Bytecode.BytecodeError) as e:
+        print(f"Error loading bytecode: {e}")
+        return
+    if args.disassemble:
+        print(Bytecode.disassemble(module), end="")
+    if args.run:
+        run_without_source(module, args.engine, "bytecode")
+
+
+def run_without_source(program, engine, kind):
+    """Run IR text or a bytecode module on one of the IR engines."""
+    if engine not in ("interpreter", "closure"):
+        print(f"Error: the {engine} engine needs the source program, not {kind}")
+        return
+    try:
+        engine = ENGINES[engine](None, None, program)
+        exit_code = engine.run()
+    except Exception as e:
+        print(f"Runtime error: {e}")
+        return
+    print(f"Program exited with code {exit_code}")
+    print_memo_stats(engine)
+
 
+def profile_program(ir_text, source_lines, output, limit=10):
+    try:
+        profiler = Profiler(ir_text, source_lines=source_lines)
+        exit_code = profiler.run()
+    except Exception as e:
+        print(f"Runtime error: {e}")
+        return
+    print(f"Program exited with code {exit_code}")
+    print_memo_stats(profiler)
+    profile = profiler.profile()
+    functions = sorted(profile["functions"].items(), key=lambda f: -f[1]["instructions"])
+    print(tabulate([[name, f["line"], f["calls"], f["instructions"]] for name, f in functions[:limit]],
+                   headers=["Function", "Line", "Calls", "Instructions"]))
+    print(tabulate([[b["function"], b["label"] or "", b["line"], b["count"], b["instructions"]]
+                    for b in profile["blocks"][:limit]],
+                   headers=["Function", "Block", "Line", "Executions", "Instructions"]))
     try:
-        pdf.output("report.pdf")
-        print("✓ Compilation report saved to report.pdf")
+        paths = profiler.save(output)
+        print(f"✓ Execution profile saved to {paths[0]} and {paths[1]}")
     except Exception as e:
-        print(f"Error saving PDF: {e}")
+        print(f"Error saving profile: {e}")
 
 if __name__ == "__main__":
     main()
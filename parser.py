@@ -1,7 +1,8 @@
+import copy
+
 import ply.yacc as yacc
 import AST
-from lexer import tokens, lexer as the_lexer, remove_comments
-from SemanticAnalyzer import semanticChecker
+from lexer import tokens, lexer as the_lexer, remove_comments, find_column
 
 precedence = (
     ('left', 'OR'),
@@ -256,20 +257,29 @@ def p_builtin_methods(p):
         p[0] = AST.FunctionCall(id=p[1], args=p[3], pos=p.lineno(1))
 
 
+def report_syntax_error(p, lexer):
+    """Report the unexpected token `p` (None at the end of the input) to
+    the diagnostics of `lexer`, if it has any."""
+    if p is None:
+        if lexer.diagnostics is not None:
+            lexer.diagnostics.report("syntax", "unexpected-eof", "unexpected end of input", lexer.lineno)
+        return
+    diagnostics = p.lexer.diagnostics
+    if diagnostics is not None:
+        diagnostics.report("syntax", "unexpected-token", f"unexpected {p.type} '{p.value}'",
+                           p.lineno, find_column(p.lexer.lexdata, p))
+
+
 def p_error(p: yacc.YaccProduction):
-    pass
+    report_syntax_error(p, the_lexer)
 
 
 parser = yacc.yacc(start='prog', debug=True)
 
-# Read input
-with open("input/sample_code.txt", "r") as file:
-    source = file.read()
-
-# Parse
-result = parser.parse(source, tracking=True)
 
-# Run semantic analysis
-if result:
-    checker = semanticChecker()
-    checker.analyze(result)
+def new_parser(lexer):
+    """A parser sharing the tables of `parser` but not its parse state, to
+    parse the input of `lexer` (see lexer.new_lexer) on one thread."""
+    instance = copy.copy(parser)
+    instance.errorfunc = lambda p: report_syntax_error(p, lexer)
+    return instance
@@ -0,0 +1,51 @@
+import functools
+import io
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import common  # noqa: E402  (puts ROOT on sys.path)
+from CBackend import CBackendError  # noqa: E402
+
+PROGRAMS = common.program_paths(directory=common.CORPUS) + common.program_paths()
+HAVE_CC = shutil.which(os.environ.get("CC", "cc")) is not None
+
+
+def program_id(path):
+    return os.path.relpath(path, os.path.join(ROOT, "benchmarks"))
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def run(engine, compiled, stdin=(), memoize=()):
+    """(exit code, output) of running `compiled` (ast, symbol_table, ir)
+    on `engine`; skips the test where the engine cannot run it."""
+    if engine == "c" and not HAVE_CC:
+        pytest.skip("no C compiler")
+    out = io.StringIO()
+    try:
+        program = common.ENGINES[engine](*compiled, memoize=memoize, stdin=list(stdin), stdout=out)
+    except CBackendError as e:
+        pytest.skip(str(e))
+    return program.run(), out.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def expected(path):
+    """What the program at `path` does on IRInterpreter, compiled plainly."""
+    return run("interpreter", common.compile_file(path), common.program_input(path))
+
+
+@pytest.fixture(params=PROGRAMS, ids=program_id)
+def program(request):
+    """(path, (ast, symbol_table, ir), stdin) of a corpus program."""
+    path = request.param
+    return path, common.compile_file(path), common.program_input(path)
@@ -0,0 +1,45 @@
+import pytest
+
+import Bytecode
+import common
+from Bytecode import BytecodeError
+from conftest import expected, run
+
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_module_runs_like_ir(program, engine, tmp_path):
+    path, (ast, symbol_table, ir_text), stdin = program
+    module = Bytecode.load(Bytecode.write_module(ir_text, str(tmp_path / "program.tslb")))
+    assert run(engine, (ast, symbol_table, module), stdin) == expected(path)
+
+
+def test_disassembly_round_trips(program):
+    path, (ast, symbol_table, ir_text), stdin = program
+    data = Bytecode.assemble(ir_text)
+    text = Bytecode.disassemble(Bytecode.load_bytes(data))
+    assert Bytecode.assemble(text) == data
+    assert run("interpreter", (ast, symbol_table, text), stdin) == expected(path)
+
+
+@pytest.fixture
+def module_bytes():
+    return Bytecode.assemble(common.compile_file(common.program_paths(["fib"])[0])[2])
+
+
+def test_rejects_other_files(module_bytes):
+    with pytest.raises(BytecodeError, match="not a TSLANG bytecode module"):
+        Bytecode.load_bytes(b"XXXX" + module_bytes[4:])
+    with pytest.raises(BytecodeError, match="truncated bytecode header"):
+        Bytecode.load_bytes(module_bytes[:8])
+
+
+def test_rejects_truncated_module(module_bytes):
+    with pytest.raises(BytecodeError, match="truncated bytecode module"):
+        Bytecode.load_bytes(module_bytes[:len(module_bytes) // 2])
+
+
+def test_rejects_empty_file(tmp_path):
+    path = tmp_path / "empty.tslb"
+    path.write_bytes(b"")
+    with pytest.raises(BytecodeError, match="empty bytecode module"):
+        Bytecode.load(str(path))
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+import common
+from CBackend import CBackendError, CProgram, check_private
+from IRInterpreter import IRRuntimeError
+from conftest import HAVE_CC, run
+
+needs_cc = pytest.mark.skipif(not HAVE_CC, reason="no C compiler")
+
+DEEP = """
+funk down(n as int) <int> {
+    if [[ n == 0 ]] return 0;
+    return (down(n - 1) + n) / 2 + 1;
+}
+
+funk main() <int> {
+    print(down(scan()));
+    return 0;
+}
+"""
+
+
+@pytest.fixture
+def private_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return tmp_path / "tslator"
+
+
+OVERFLOW = """
+funk main() <int> {
+    big :: int = 9223372036854775807;
+    small :: int = 0 - big - 1;
+    d :: int = 0 - 1;
+    v :: vector = [0];
+    %s
+    return 0;
+}
+"""
+
+
+# every engine stops with the same error where the result leaves 64 bits
+@pytest.mark.parametrize("engine", list(common.ENGINES))
+@pytest.mark.parametrize("statement", [
+    "print(big + 1);",
+    "print(small - 1);",
+    "print(small * 2);",
+    "print(small / d);",
+    "v[0] = big + big;",
+])
+def test_overflow_is_an_error_on_every_engine(engine, statement):
+    compiled = common.compile_source(OVERFLOW % statement)
+    with pytest.raises(IRRuntimeError, match="^integer overflow$"):
+        run(engine, compiled)
+
+
+@pytest.mark.parametrize("engine", list(common.ENGINES))
+def test_results_at_the_limits_agree(engine):
+    compiled = common.compile_source(OVERFLOW % """
+    print(small);
+    print(big - 1 + 1);
+    print(small / 1);
+    print(big / d);
+    v[0] = small;
+    print(v[0]);
+""")
+    assert run(engine, compiled) == (
+        0, "-9223372036854775808\n9223372036854775807\n-9223372036854775808\n-9223372036854775807\n"
+           "-9223372036854775808\n")
+
+
+@needs_cc
+def test_deep_recursion_fails_cleanly():
+    compiled = common.compile_source(DEEP)
+    assert run("c", compiled, ["1000"]) == run("interpreter", compiled, ["1000"])
+    with pytest.raises(IRRuntimeError, match="maximum recursion depth exceeded"):
+        run("c", compiled, ["100000000"])
+
+
+@needs_cc
+def test_cache_is_private(private_cache):
+    _, _, ir_text = common.compile_source(DEEP)
+    CProgram(ir_text, stdin=["3"])
+    assert os.stat(private_cache).st_mode & 0o777 == 0o700
+    [name] = os.listdir(private_cache)
+    assert name.startswith("tsl_") and name.endswith(".so")
+
+
+@needs_cc
+def test_refuses_shared_object_others_can_write(private_cache):
+    _, _, ir_text = common.compile_source(DEEP)
+    CProgram(ir_text, stdin=["3"])
+    [name] = os.listdir(private_cache)
+    os.chmod(private_cache / name, 0o777)
+    with pytest.raises(CBackendError, match="writable by other users"):
+        CProgram(ir_text, stdin=["3"])
+
+
+def test_refuses_cache_others_can_write(private_cache):
+    private_cache.mkdir(mode=0o700)
+    os.chmod(private_cache, 0o777)
+    with pytest.raises(CBackendError, match="writable by other users"):
+        check_private(str(private_cache))
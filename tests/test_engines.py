@@ -0,0 +1,41 @@
+"""Every engine must agree with IRInterpreter, which defines the IR
+semantics, on the crosscheck corpus (see benchmarks/crosscheck.py)."""
+import sys
+
+import pytest
+
+import common
+from ClosureEngine import ClosureEngine
+from conftest import expected, run
+
+
+@pytest.mark.parametrize("engine", [name for name in common.ENGINES if name != "interpreter"])
+def test_engine_matches_interpreter(program, engine):
+    path, compiled, stdin = program
+    assert run(engine, compiled, stdin) == expected(path)
+
+
+DEEP = """
+funk depth(n as int) <int> {
+    if [[ n == 0 ]] return 0;
+    return depth(n - 1) + 1;
+}
+
+funk main() <int> {
+    print(depth(20000));
+    return 0;
+}
+"""
+
+
+@pytest.mark.parametrize("engine", ["closure", "python", "python-scalar"])
+def test_recursion_limit_is_restored(engine):
+    limit = sys.getrecursionlimit()
+    assert run(engine, common.compile_source(DEEP)) == (0, "20000\n")
+    assert sys.getrecursionlimit() == limit
+
+
+def test_closure_engine_executes_with_arguments():
+    compiled = common.compile_source(DEEP)
+    engine = ClosureEngine(compiled[2])
+    assert engine.execute(engine.procs["depth"], (7,)) == 7
@@ -0,0 +1,88 @@
+"""--fold must not change what a program does."""
+import pytest
+
+import common
+from Compiler import Compiler
+from PartialEvaluator import PartialEvaluator, FOLD_STEPS
+from Purity import Purity
+from conftest import expected, run
+
+
+@pytest.mark.parametrize("engine", list(common.ENGINES))
+def test_fold(program, engine):
+    path, (ast, symbol_table, _), stdin = program
+    purity = Purity(ast)
+    evaluator = PartialEvaluator(ast, symbol_table, purity.pure, purity.reasons)
+    ir_text, _ = common.generate_ir(ast, symbol_table, evaluator=evaluator)
+    assert run(engine, (ast, symbol_table, ir_text), stdin) == expected(path)
+
+
+FOLD = """
+funk square(x as int) <int> {
+    return x * x;
+}
+
+funk offset(n as int) <int> {
+    a :: int = n + 2;
+    b :: int = square(3) + a;
+    return a * square(4) + b;
+}
+
+funk fib(n as int) <int> {
+    if [[ n < 2 ]] return n;
+    return fib(n - 1) + fib(n - 2);
+}
+
+funk noisy(x as int) <int> {
+    print(x);
+    return x;
+}
+
+funk main() <int> {
+    n :: int = scan();
+    print(offset(n));
+    print(offset(2));
+    print(square(3037000499));
+    if [[ n < 0 ]] print(square(3037000500));
+    print(fib(10) + fib(25));
+    print(noisy(4));
+    return 0;
+}
+"""
+
+
+def folded_calls(result):
+    return {f["call"]: f["value"] if f["reason"] is None else f["reason"] for f in result.folded}
+
+
+def test_fold_results():
+    calls = folded_calls(Compiler(fold_steps=FOLD_STEPS).compile(FOLD))
+    assert calls["square(3)"] == 9
+    assert calls["offset(2)"] == 77
+    assert calls["square(3037000499)"] == 3037000499 ** 2
+    assert calls["fib(10)"] == 55
+    assert calls["square(3037000500)"] == "runtime error: integer overflow"
+    assert calls["fib(25)"] == "step budget of 10000 spent"
+    assert calls["noisy(4)"].startswith("not pure")
+
+
+def test_fold_is_off_by_default():
+    plain, folded = Compiler().compile(FOLD), Compiler(fold_steps=FOLD_STEPS).compile(FOLD)
+    assert plain.ok and plain.folded == []
+    # offset(n) and offset(2) in main, of which --fold evaluates the second
+    assert plain.ir.count("call offset,") == 2
+    assert folded.ir.count("call offset,") == 1
+
+
+def test_fold_keeps_program_output():
+    plain, folded = Compiler().compile(FOLD), Compiler(fold_steps=FOLD_STEPS).compile(FOLD)
+    assert plain.folded == [] and folded.folded
+    compiled = [(r.ast, r.symbol_table, r.ir) for r in (plain, folded)]
+    assert run("interpreter", compiled[0], ["5"]) == run("interpreter", compiled[1], ["5"])
+    assert run("interpreter", compiled[1], ["5"])[1].startswith("128\n77\n")
+
+
+def test_fold_is_deterministic():
+    results = [Compiler(fold_steps=FOLD_STEPS).compile(FOLD) for _ in range(3)]
+    assert len({r.ir for r in results}) == 1
+    assert len({repr(r.folded) for r in results}) == 1
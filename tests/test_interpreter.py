@@ -0,0 +1,52 @@
+import pytest
+
+import common
+from IRInterpreter import IRInterpreter, IRRuntimeError
+from conftest import run
+
+LIMITS = """
+funk main() <int> {
+    big :: int = 9223372036854775807;
+    small :: int = 0 - big - 1;
+    v :: vector = [0];
+    %s
+    return 0;
+}
+"""
+
+
+@pytest.mark.parametrize("statement", [
+    "print(big + 1);",
+    "print(small - 1);",
+    "print(small * 2);",
+    "print(3037000500 * 3037000500);",
+    "print(small / (0 - 1));",
+    # the store used to fail instead, on the vector's 'q' format
+    "v[0] = big + big;",
+])
+def test_overflow_is_an_error_at_the_arithmetic(statement):
+    compiled = common.compile_source(LIMITS % statement)
+    with pytest.raises(IRRuntimeError, match="^integer overflow$"):
+        run("interpreter", compiled)
+
+
+def test_results_at_the_limits():
+    compiled = common.compile_source(LIMITS % """
+    print(small);
+    print(big - 1 + 1);
+    print(small / 1);
+    print(3037000499 * 3037000499);
+    v[0] = small;
+    print(v[0]);
+""")
+    assert run("interpreter", compiled) == (
+        0, "-9223372036854775808\n9223372036854775807\n-9223372036854775808\n9223372030926249001\n"
+           "-9223372036854775808\n")
+
+
+def test_errors():
+    compiled = common.compile_source(LIMITS % "print(big / (small - small));")
+    with pytest.raises(IRRuntimeError, match="division by zero"):
+        run("interpreter", compiled)
+    with pytest.raises(IRRuntimeError, match="no proc 'start' to run"):
+        IRInterpreter(compiled[2]).run("start")
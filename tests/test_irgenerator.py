@@ -0,0 +1,225 @@
+"""IR-level checks of IRGenerator's optimizations."""
+import pytest
+
+import common
+from IRGenerator import IRGenerator
+from conftest import run
+from generate import generate_program
+
+
+def compile_procs(source):
+    """(compiled, {proc name: [instruction, ...]}) for `source`."""
+    compiled = common.compile_source(source)
+    procs, name = {}, None
+    for line in compiled[2].splitlines():
+        if line.startswith("proc "):
+            name = line[5:]
+            procs[name] = []
+        elif name is not None and line and not line.endswith(":"):
+            procs[name].append(line)
+    return compiled, procs
+
+
+def count(code, op):
+    return sum(1 for instruction in code if instruction.split(" ", 1)[0] == op)
+
+
+# --- local value numbering ---------------------------------------------------
+
+def test_repeated_expression_is_computed_once():
+    compiled, procs = compile_procs("""
+funk f(a as int, b as int) <int> {
+    x :: int = a * b + 1;
+    y :: int = b * a + 1;
+    return x + y;
+}
+
+funk main() <int> {
+    print(f(6, 7));
+    return 0;
+}
+""")
+    assert count(procs["f"], "mul") == 1
+    assert count(procs["f"], "add") == 2
+    assert run("interpreter", compiled) == (0, "86\n")
+
+
+def test_redefined_variable_drops_its_values():
+    # a key computed again after a kill is listed twice; killing b must
+    # drop it once without failing
+    compiled, procs = compile_procs("""
+funk f(a as int, b as int) <int> {
+    x :: int = a * b;
+    a = a + 1;
+    y :: int = a * b;
+    b = b + 1;
+    z :: int = a * b;
+    return x + y + z;
+}
+
+funk main() <int> {
+    print(f(2, 3));
+    return 0;
+}
+""")
+    assert count(procs["f"], "mul") == 3
+    assert run("interpreter", compiled) == (0, "27\n")
+
+
+VECTOR_LOADS = """
+funk keep(v as vector) <int> {
+    return length(v);
+}
+
+funk f(v as vector, i as int) <int> {
+    x :: int = v[i];
+    %s
+    y :: int = v[i];
+    return x * 10 + y;
+}
+
+funk main() <int> {
+    v :: vector = [1, 2, 3];
+    print(f(v, 1));
+    return 0;
+}
+"""
+
+
+def test_load_survives_calls_that_do_not_write_memory():
+    compiled, procs = compile_procs(VECTOR_LOADS % "print(length(v));")
+    assert count(procs["f"], "ld") == 1
+    assert run("interpreter", compiled) == (0, "3\n22\n")
+
+
+def test_store_drops_loaded_values():
+    compiled, procs = compile_procs(VECTOR_LOADS % "v[0] = 7;")
+    assert count(procs["f"], "ld") == 2
+    assert run("interpreter", compiled) == (0, "22\n")
+    compiled, procs = compile_procs(VECTOR_LOADS % "v[i] = 7;")
+    assert count(procs["f"], "ld") == 2
+    assert run("interpreter", compiled) == (0, "27\n")
+
+
+def test_call_drops_loaded_values():
+    compiled, procs = compile_procs(VECTOR_LOADS % "k :: int = keep(v);")
+    assert count(procs["f"], "ld") == 2
+    assert run("interpreter", compiled) == (0, "22\n")
+
+
+# --- short-circuit && and || -------------------------------------------------
+
+NOISY = """
+funk noisy(x as int) <int> {
+    print(x);
+    return x;
+}
+"""
+
+
+def test_right_side_is_not_evaluated():
+    compiled = common.compile_source(NOISY + """
+funk main() <int> {
+    a :: int = scan();
+    if [[ a > 5 && noisy(1) > 0 ]] print(10);
+    if [[ a < 5 || noisy(2) > 0 ]] print(20);
+    b :: bool = a > 5 && noisy(3) > 0;
+    c :: bool = a < 5 || noisy(4) > 0;
+    if [[ b ]] print(30);
+    if [[ c ]] print(40);
+    return 0;
+}
+""")
+    assert run("interpreter", compiled, ["1"]) == (0, "20\n40\n")
+    # the right side runs, once, only when the left one does not decide
+    assert run("interpreter", compiled, ["9"]) == (0, "1\n10\n2\n20\n3\n4\n30\n40\n")
+
+
+NESTED = NOISY + """
+funk main() <int> {
+    n :: int = scan();
+    for (i = 0 to n) begin
+        if [[ (i > 1 && noisy(i) > 2) || (i == 0 && noisy(100 + i) == 100) ]] print(1000 + i);
+        else print(2000 + i);
+    end
+    k :: int = n;
+    while [[ k > 0 && (noisy(k) != 3 || k > 5) ]] k = k - 1;
+    return k;
+}
+"""
+
+
+@pytest.mark.parametrize("engine", list(common.ENGINES))
+def test_nested_conditions(engine):
+    compiled = common.compile_source(NESTED)
+    expected = "100 1000 2001 2 2002 3 1003 4 1004 5 4 3".replace(" ", "\n") + "\n"
+    assert run(engine, compiled, ["5"]) == (3, expected)
+
+
+# --- constant vector literals --------------------------------------------------
+
+LITERALS = """
+funk main() <int> {
+    n :: int = scan();
+    total :: int = 0;
+    for (i = 0 to n) begin
+        v :: vector = [1, 2, 3];
+        v[0] = v[0] + i;
+        v[0] = v[0] * 10;
+        total = total + v[0] + v[2];
+    end
+    print(total);
+    a :: vector = [1, 2, 3];
+    b :: vector = [1, 2, 3];
+    a[0] = 9;
+    print(a[0] * 10 + b[0]);
+    w :: vector = [n, 2, n + 3];
+    w[1] = w[1] + w[0];
+    print(w[0] + w[1] * 10 + w[2] * 100);
+    return 0;
+}
+"""
+
+
+def dcopies(code):
+    return [instruction for instruction in code if instruction.startswith("call dcopy,")]
+
+
+def test_constant_literals_are_data_blocks():
+    compiled, procs = compile_procs(LITERALS)
+    data = [line for line in compiled[2].splitlines() if line.startswith("data ")]
+    # one block per literal: v, a and b, but not w, which has variables
+    assert len(data) == 3 and all(line.endswith(", 1, 2, 3") for line in data)
+    assert len(dcopies(procs["main"])) == 3
+
+
+def test_literal_with_variables_is_stored_element_by_element():
+    compiled, procs = compile_procs("""
+funk main() <int> {
+    n :: int = scan();
+    w :: vector = [n, 2, n + 3];
+    print(w[0] + w[1] * 10 + w[2] * 100);
+    return 0;
+}
+""")
+    assert "data " not in compiled[2] and not dcopies(procs["main"])
+    assert count(procs["main"], "st") == 3
+    assert run("interpreter", compiled, ["4"]) == (0, "724\n")
+
+
+@pytest.mark.parametrize("engine", list(common.ENGINES))
+def test_literal_copies_are_fresh(engine):
+    # a literal in a loop gets a new copy each iteration, and two equal
+    # literals do not share one
+    compiled = common.compile_source(LITERALS)
+    assert run(engine, compiled, ["4"]) == (0, "112\n91\n764\n")
+
+
+# --- parallel generation -------------------------------------------------------
+
+def test_parallel_generation_is_identical():
+    source = generate_program(functions=60, statements=10, seed=3)
+    serial, parallel = IRGenerator(), IRGenerator()
+    serial_text = serial.generate(*common.check_source(source), jobs=1)
+    assert parallel.generate(*common.check_source(source), jobs=4) == serial_text
+    assert parallel.source_lines == serial.source_lines
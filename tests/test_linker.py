@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+import common
+from Diagnostics import Diagnostics
+from Linker import Build, ObjectFile, OBJECT_SUFFIX, link
+from conftest import run
+
+FILES = {
+    "main.txt": """
+funk main() <int> {
+    n :: int = scan();
+    print(total(n));
+    print(twice(n));
+    return 0;
+}
+""",
+    "total.txt": """
+funk total(n as int) <int> {
+    s :: int = 0;
+    for (i = 0 to n) s = s + twice(i);
+    return s;
+}
+""",
+    "twice.txt": """
+funk twice(x as int) <int> {
+    return x * 2;
+}
+""",
+}
+
+
+def write(directory, files):
+    directory.mkdir(exist_ok=True)
+    for name, text in files.items():
+        (directory / name).write_text(text)
+    return str(directory)
+
+
+def objects(build_dir):
+    return {name[:-len(OBJECT_SUFFIX)]: ObjectFile.load(os.path.join(build_dir, name))
+            for name in sorted(os.listdir(build_dir)) if name.endswith(OBJECT_SUFFIX)}
+
+
+@pytest.fixture
+def build(tmp_path):
+    return Build(str(tmp_path / "build"))
+
+
+def test_build_runs_like_one_file(tmp_path, build):
+    summary = build.run(write(tmp_path / "src", FILES))
+    assert summary["diagnostics"] == []
+    assert len(summary["compiled"]) == 3
+    with open(summary["program"]) as f:
+        linked = f.read()
+    single = common.compile_source("".join(FILES.values()))
+    assert run("interpreter", (None, None, linked), ["10"]) == run("interpreter", single, ["10"]) == (0, "90\n20\n")
+
+
+def test_rebuild_recompiles_only_what_changed(tmp_path, build):
+    source_dir = write(tmp_path / "src", FILES)
+    build.run(source_dir)
+    summary = build.run(source_dir)
+    assert summary["compiled"] == [] and len(summary["up_to_date"]) == 3
+
+    write(tmp_path / "src", {"twice.txt": FILES["twice.txt"].replace("x * 2", "x * 3")})
+    summary = build.run(source_dir)
+    assert [os.path.basename(path) for path in summary["compiled"]] == ["twice.txt"]
+    assert run("interpreter", (None, None, summary["ir"]), ["10"]) == (0, "135\n30\n")
+
+
+def test_signature_change_recompiles_callers(tmp_path, build):
+    source_dir = write(tmp_path / "src", FILES)
+    build.run(source_dir)
+    write(tmp_path / "src", {"twice.txt": FILES["twice.txt"].replace("x as int", "x as int, y as int")})
+    summary = build.run(source_dir)
+    assert sorted(os.path.basename(path) for path in summary["compiled"]) == ["main.txt", "total.txt", "twice.txt"]
+    assert summary["program"] is None
+    assert {phase for _, phase, _ in summary["diagnostics"]} == {"semantic"}
+
+
+def test_duplicate_function(tmp_path, build):
+    files = dict(FILES, **{"again.txt": FILES["twice.txt"]})
+    summary = build.run(write(tmp_path / "src", files))
+    assert summary["program"] is None
+    [(_, phase, message)] = summary["diagnostics"]
+    assert phase == "link" and "function 'twice' is defined in both" in message
+
+
+def link_codes(objects):
+    diagnostics = Diagnostics()
+    assert link(objects, diagnostics) is None
+    return {d.code for d in diagnostics}
+
+
+def test_link_errors(tmp_path, build):
+    build.run(write(tmp_path / "src", FILES))
+    built = objects(build.out_dir)
+    assert link_codes([built["main"], built["total"]]) == {"undefined-function"}
+    assert link_codes([built["total"], built["twice"]]) == {"missing-main"}
+
+    other = Build(str(tmp_path / "other"))
+    other.run(write(tmp_path / "other_src", {
+        "main.txt": FILES["main.txt"].replace("twice(n)", "twice(n, n)"),
+        "total.txt": FILES["total.txt"].replace("twice(i)", "twice(i, i)"),
+        "twice.txt": FILES["twice.txt"].replace("x as int", "x as int, y as int"),
+    }))
+    assert link_codes([built["main"], built["total"], objects(other.out_dir)["twice"]]) == {"signature-mismatch"}
@@ -0,0 +1,27 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+FIB = os.path.join(ROOT, "benchmarks", "programs", "fib.txt")
+
+
+def main(*args, cwd):
+    return subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), *args],
+                          capture_output=True, text=True, cwd=cwd)
+
+
+def test_profile_to_stdout_is_only_json(tmp_path):
+    result = main(FIB, "--run", "--report", "none", "--profile", "-", cwd=tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert "phases" in json.loads(result.stdout)
+    assert "17711" in result.stderr
+
+
+def test_run_prints_program_output(tmp_path):
+    result = main(FIB, "--run", "--report", "none", cwd=tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert "17711" in result.stdout
+    assert os.listdir(tmp_path) == []
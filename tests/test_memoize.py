@@ -0,0 +1,14 @@
+"""--memoize must not change what a program does."""
+import pytest
+
+import common
+from Purity import Purity
+from conftest import expected, run
+
+
+@pytest.mark.parametrize("engine", list(common.ENGINES))
+def test_memoize(program, engine):
+    path, (ast, symbol_table, _), stdin = program
+    memoize = Purity(ast).memoizable()
+    ir_text, _ = common.generate_ir(ast, symbol_table, memoize=memoize)
+    assert run(engine, (ast, symbol_table, ir_text), stdin, memoize) == expected(path)
@@ -0,0 +1,49 @@
+"""Profile-guided IR must run like the plain IR, and no slower."""
+import functools
+import io
+
+import pytest
+
+import common
+from IRInterpreter import IRInterpreter
+from Profiler import Profiler, ExecutionProfile
+from conftest import expected, read, run
+
+
+@functools.lru_cache(maxsize=None)
+def collect_profile(source, stdin):
+    ast, symbol_table = common.check_source(source)
+    ir_text, source_lines = common.generate_ir(ast, symbol_table)
+    profiler = Profiler(ir_text, source_lines=source_lines, stdin=list(stdin), stdout=io.StringIO())
+    profiler.run()
+    return ExecutionProfile(profiler.profile())
+
+
+def steps(ir_text, stdin):
+    interpreter = IRInterpreter(ir_text, stdin=list(stdin), stdout=io.StringIO())
+    interpreter.run()
+    return interpreter.steps
+
+
+@pytest.mark.parametrize("engine", list(common.ENGINES))
+def test_pgo(program, engine):
+    path, (ast, symbol_table, _), stdin = program
+    pgo_text, _ = common.generate_ir(ast, symbol_table, profile=collect_profile(read(path), tuple(stdin)))
+    assert run(engine, (ast, symbol_table, pgo_text), stdin) == expected(path)
+
+
+def test_pgo_runs_fewer_instructions(program):
+    path, (ast, symbol_table, ir_text), stdin = program
+    pgo_text, _ = common.generate_ir(ast, symbol_table, profile=collect_profile(read(path), tuple(stdin)))
+    assert steps(pgo_text, stdin) <= steps(ir_text, stdin)
+
+
+def test_pgo_profile_survives_lines_inserted_above(program):
+    # profiles are keyed by the offset within the function, not the line
+    path, _, stdin = program
+    moved = "\n\n\n" + read(path)
+    ast, symbol_table = common.check_source(moved)
+    stale, _ = common.generate_ir(ast, symbol_table, profile=collect_profile(read(path), tuple(stdin)))
+    ast, symbol_table = common.check_source(moved)
+    fresh, _ = common.generate_ir(ast, symbol_table, profile=collect_profile(moved, tuple(stdin)))
+    assert stale == fresh
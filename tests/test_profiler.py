@@ -0,0 +1,59 @@
+import io
+
+import common
+from IRInterpreter import IRInterpreter, COUNT
+from Profiler import Profiler
+
+LOOP = """
+funk step(x as int) <int> {
+    if [[ x > 2 ]] return x - 2;
+    return x + 1;
+}
+
+funk main() <int> {
+    n :: int = scan();
+    total :: int = 0;
+    for (i = 0 to n) begin
+        total = total + step(i);
+    end
+    print(total);
+    exit(total);
+    return 0;
+}
+"""
+
+
+def profile(source, stdin):
+    ast, symbol_table = common.check_source(source)
+    ir_text, source_lines = common.generate_ir(ast, symbol_table)
+    profiler = Profiler(ir_text, source_lines=source_lines, stdin=stdin, stdout=io.StringIO())
+    code = profiler.run()
+    return profiler, ir_text, code
+
+
+def test_counts_match_the_interpreter():
+    profiler, ir_text, code = profile(LOOP, ["6"])
+    interpreter = IRInterpreter(ir_text, stdin=["6"], stdout=io.StringIO())
+    assert code == interpreter.run() == 12
+    data = profiler.profile()
+    assert data["instructions"] == profiler.steps == interpreter.steps
+    assert sum(f["instructions"] for f in data["functions"].values()) == interpreter.steps
+    assert data["functions"]["step"]["calls"] == 6
+    assert data["functions"]["main"]["calls"] == 1
+    [branch] = [b for b in data["branches"] if b["function"] == "step"]
+    # the condition holds for i = 3, 4 and 5 only
+    assert branch["executed"] == 6 and branch["taken"] == 3
+    assert profiler.collapsed().splitlines()[-1].startswith("main;step ")
+
+
+def test_only_the_profiler_runs_counting_code():
+    profiler, ir_text, _ = profile(LOOP, ["2"])
+    interpreter = IRInterpreter(ir_text)
+    assert not any(op == COUNT for proc in interpreter.procs.values() for op, *_ in proc.code)
+    assert all(len(proc.code) == 2 * len(profiler.code[name]) for name, proc in profiler.procs.items())
+
+
+def test_execute_with_arguments():
+    profiler, _, _ = profile(LOOP, ["0"])
+    assert profiler.execute(profiler.procs["step"], (5,)) == 3
+    assert profiler.counts["step"][0] == 1
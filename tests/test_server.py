@@ -0,0 +1,51 @@
+import asyncio
+import os
+import socket
+
+import pytest
+
+from Server import CompileClient, CompileServer
+
+
+def bound_socket(path, listen):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(path))
+    if listen:
+        sock.listen()
+    return sock
+
+
+def test_refuses_a_path_that_is_not_a_socket(tmp_path):
+    path = tmp_path / "server.sock"
+    path.write_text("keep me")
+    with pytest.raises(FileExistsError, match="is not a socket"):
+        asyncio.run(CompileServer(str(path), jobs=1).start())
+    assert path.read_text() == "keep me"
+
+
+def test_refuses_a_socket_another_server_answers_on(tmp_path):
+    path = tmp_path / "server.sock"
+    with bound_socket(path, listen=True):
+        with pytest.raises(OSError, match="already listening"):
+            asyncio.run(CompileServer(str(path), jobs=1).start())
+        assert path.is_socket()
+
+
+def test_replaces_a_stale_socket(tmp_path):
+    path = tmp_path / "server.sock"
+    bound_socket(path, listen=False).close()
+    assert path.is_socket()
+
+    async def serve():
+        server = CompileServer(str(path), jobs=1)
+        await server.start()
+        try:
+            def ping():
+                with CompileClient(str(path), timeout=30) as client:
+                    return client.ping()
+            return await asyncio.get_running_loop().run_in_executor(None, ping)
+        finally:
+            server.close()
+
+    assert asyncio.run(serve())["ok"]
+    assert not os.path.exists(path)
@@ -0,0 +1,67 @@
+"""The NumPy loops of the Python backend must do what the scalar loops
+do, including raising on overflow where NumPy would wrap."""
+import io
+
+import pytest
+
+import common
+from IRInterpreter import IRRuntimeError
+from PythonBackend import PythonProgram, np
+
+pytestmark = pytest.mark.skipif(np is None, reason="NumPy is not installed")
+
+LOOPS = """
+funk main() <int> {
+    n :: int = scan();
+    k :: int = scan();
+    a :: vector = list(n);
+    b :: vector = list(n);
+    for (i = 0 to n) a[i] = i * k;
+    for (i = 0 to n) b[i] = a[i] + a[i] - k;
+    s :: int = scan();
+    for (i = 0 to n) s = s + b[i];
+    print(b[n - 1]);
+    print(s);
+    return 0;
+}
+"""
+
+
+def run(vectorize, stdin):
+    """(output, NumPy loops run) of LOOPS on the Python backend."""
+    ast, symbol_table, _ = common.compile_source(LOOPS)
+    out = io.StringIO()
+    program = PythonProgram(ast, symbol_table, stdin=stdin, stdout=out, vectorize=vectorize)
+    vectorized = []
+    vec = program.namespace['_vec']
+    program.namespace['_vec'] = lambda vector: vectorized.append(vector) or vec(vector)
+    program.run()
+    return out.getvalue(), bool(vectorized)
+
+
+# with k, b[i] = (2i - 1)k for i < 100 and the sum of b is 9800k
+@pytest.mark.parametrize("stdin", [
+    ["100", "7", "0"],
+    ["100", str(-(2 ** 63 // 9900)), "0"],
+    # the bounds give the sum no more room than this
+    ["100", str(2 ** 63 // 20000), str(-2 ** 63 + 100 * (2 ** 63 // 20000))],
+])
+def test_large_values_run_vectorized(stdin):
+    output, vectorized = run(True, stdin)
+    assert vectorized
+    assert (output, False) == run(False, stdin)
+
+
+@pytest.mark.parametrize("stdin", [
+    # i * k overflows for the last i
+    ["100", str(2 ** 63 // 97), "0"],
+    # a[i] + a[i] overflows, though a[i] + a[i] - k would fit
+    ["100", str(2 ** 64 // 395), "0"],
+    # the sum overflows
+    ["100", str(2 ** 63 // 9000), "0"],
+    ["100", "7", str(2 ** 63 - 100)],
+])
+def test_overflow_raises_like_the_scalar_loop(stdin):
+    for vectorize in (True, False):
+        with pytest.raises(IRRuntimeError, match="^integer overflow$"):
+            run(vectorize, stdin)